@@ -0,0 +1,32 @@
+# app/api/admin.py
+from fastapi import APIRouter
+from app.db.cache import resource_cache
+from app.db.counters import counters
+from app.db.profiler import slow_queries
+from app.db.write_buffer import observation_writes
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.get("/cache")
+async def cache_stats():
+    """Resource cache hit, miss and eviction counters"""
+    return resource_cache.stats()
+
+@router.get("/counters")
+async def counter_stats():
+    """Ids issued, ids leased, refill latency and ids leased but never issued per counter"""
+    return counters.stats()
+
+@router.get("/write-buffer")
+async def write_buffer_stats():
+    """Queue depth and flush counters of the Observation write buffer; flush size and latency histograms are in /metrics"""
+    return observation_writes.stats()
+
+@router.get("/slow-queries")
+async def slow_query_report():
+    """Shapes of slow query resolver commands with their explain summaries, the most total time first"""
+    return slow_queries.report()
+
+@router.delete("/slow-queries", status_code=204)
+async def clear_slow_queries():
+    slow_queries.clear()
\ No newline at end of file
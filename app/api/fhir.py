@@ -0,0 +1,138 @@
+# app/api/fhir.py
+import os
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Body, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from app.config.database import get_database
+from app.core.constants import RESOURCE_COLLECTIONS
+from app.db.bulk import import_ndjson, ingest_bundle, ndjson_lines
+from app.db.export import create_export_job, delete_export_job, export_file_path
+from app.fhir.utils.helpers import operation_outcome
+
+FHIR_JSON = "application/fhir+json"
+FHIR_NDJSON = "application/fhir+ndjson"
+
+# _outputFormat values the Bulk Data spec requires servers to accept
+NDJSON_FORMATS = (FHIR_NDJSON, "application/ndjson", "ndjson")
+
+router = APIRouter(prefix="/fhir", tags=["fhir"])
+
+@router.post("")
+async def process_bundle(bundle: Dict[str, Any] = Body(...)):
+    """FHIR batch/transaction interaction"""
+    db = await get_database()
+    try:
+        result = await ingest_bundle(db, bundle)
+    except ValueError as e:
+        return JSONResponse(operation_outcome(str(e)), status_code=400, media_type=FHIR_JSON)
+    return JSONResponse(result, media_type=FHIR_JSON)
+
+@router.post("/$import")
+async def import_resources(request: Request):
+    """Create the resources of an NDJSON request body, gzip encoded or not"""
+    db = await get_database()
+    compressed = request.headers.get("content-encoding", "").lower() == "gzip"
+    report = await import_ndjson(db, ndjson_lines(request.stream(), compressed))
+    return JSONResponse(report.to_dict())
+
+@router.get("/$export")
+async def export_kickoff(
+    request: Request,
+    type: Optional[str] = Query(None, alias="_type"),
+    since: Optional[str] = Query(None, alias="_since"),
+    output_format: str = Query(FHIR_NDJSON, alias="_outputFormat")
+):
+    """Bulk Data system export kick-off; files are gzip encoded if the request accepts gzip"""
+    resource_types = type.split(",") if type else list(RESOURCE_COLLECTIONS)
+    unsupported = [t for t in resource_types if t not in RESOURCE_COLLECTIONS]
+    if unsupported:
+        return JSONResponse(
+            operation_outcome(f"Unsupported resource type {unsupported[0]}", code="not-supported"),
+            status_code=400,
+            media_type=FHIR_JSON
+        )
+    if output_format not in NDJSON_FORMATS:
+        return JSONResponse(
+            operation_outcome(f"Unsupported _outputFormat {output_format}", code="not-supported"),
+            status_code=400,
+            media_type=FHIR_JSON
+        )
+
+    db = await get_database()
+    try:
+        job = await create_export_job(
+            db,
+            resource_types,
+            since,
+            compressed="gzip" in request.headers.get("accept-encoding", ""),
+            request_url=str(request.url)
+        )
+    except ValueError as e:
+        return JSONResponse(operation_outcome(str(e)), status_code=400, media_type=FHIR_JSON)
+    return Response(
+        status_code=202,
+        headers={"Content-Location": str(request.url_for("export_status", job_id=job["_id"]))}
+    )
+
+@router.get("/$export-status/{job_id}", name="export_status")
+async def export_status(request: Request, job_id: str):
+    """Progress of an export job, or its manifest once complete"""
+    db = await get_database()
+    job = await db.export_jobs.find_one({"_id": job_id})
+    if job is None:
+        return JSONResponse(
+            operation_outcome(f"Export {job_id} not found", code="not-found"),
+            status_code=404,
+            media_type=FHIR_JSON
+        )
+    if job["status"] == "failed":
+        return JSONResponse(
+            operation_outcome(job["error"] or "Export failed", code="exception"),
+            status_code=500,
+            media_type=FHIR_JSON
+        )
+    if job["status"] == "in-progress":
+        progress = ", ".join(f"{output['type']}: {output['count']}" for output in job["outputs"])
+        return Response(status_code=202, headers={"X-Progress": progress, "Retry-After": "5"})
+
+    return JSONResponse({
+        "transactionTime": job["transactionTime"],
+        "request": job["request"],
+        "requiresAccessToken": False,
+        "output": [
+            {
+                "type": output["type"],
+                "url": str(request.url_for("export_file", job_id=job_id, resource_type=output["type"])),
+                "count": output["count"]
+            }
+            for output in job["outputs"] if output["count"]
+        ],
+        "error": []
+    })
+
+@router.delete("/$export-status/{job_id}")
+async def export_delete(job_id: str):
+    """Cancel an export job and delete its files"""
+    db = await get_database()
+    if not await delete_export_job(db, job_id):
+        return JSONResponse(
+            operation_outcome(f"Export {job_id} not found", code="not-found"),
+            status_code=404,
+            media_type=FHIR_JSON
+        )
+    return Response(status_code=202)
+
+@router.get("/$export-file/{job_id}/{resource_type}", name="export_file")
+async def export_file(job_id: str, resource_type: str):
+    """One NDJSON output file of a completed export"""
+    db = await get_database()
+    job = await db.export_jobs.find_one({"_id": job_id, "status": "completed"})
+    path = job and export_file_path(job_id, resource_type, job["compressed"])
+    if not path or not os.path.exists(path):
+        return JSONResponse(
+            operation_outcome(f"No {resource_type} output for export {job_id}", code="not-found"),
+            status_code=404,
+            media_type=FHIR_JSON
+        )
+    headers = {"Content-Encoding": "gzip"} if job["compressed"] else None
+    return FileResponse(path, media_type=FHIR_NDJSON, headers=headers)
@@ -0,0 +1,53 @@
+# app/cli.py
+import argparse
+import asyncio
+import json
+from typing import AsyncIterator, List
+from app.config.database import close_database, get_database
+from app.db.bulk import ImportReport, import_ndjson, ndjson_lines
+
+# Bytes read from an input file at a time
+READ_SIZE = 1 << 20
+
+async def read_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, READ_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+def print_progress(report: ImportReport) -> None:
+    rate = report.imported / report.seconds if report.seconds else 0
+    print(f"{report.lines} lines read, {report.imported} imported, {report.failed} failed, {rate:.0f} rows/sec")
+
+async def import_files(paths: List[str]) -> int:
+    db = await get_database()
+    failed = 0
+    try:
+        for path in paths:
+            print(f"Importing {path}")
+            lines = ndjson_lines(read_file(path), compressed=path.endswith(".gz"))
+            report = await import_ndjson(db, lines, progress=print_progress)
+            summary = report.to_dict()
+            for error in summary.pop("errors"):
+                print(f"{path}:{error['line']}: {error['diagnostics']}")
+            print(json.dumps(summary))
+            failed += report.failed
+    finally:
+        await close_database()
+    return failed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="FHIR server administration")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="import NDJSON files, gzip compressed if named *.gz")
+    import_parser.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        failed = asyncio.run(import_files(args.paths))
+        raise SystemExit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.read_preferences import Primary, SecondaryPreferred
 from .settings import get_settings
 from typing import Optional
 
@@ -7,15 +9,75 @@ settings = get_settings()
 class Database:
     client: Optional[AsyncIOMotorClient] = None
     db: Optional[AsyncIOMotorDatabase] = None
-    
+    read_db: Optional[AsyncIOMotorDatabase] = None
+    transactions: Optional[bool] = None
+    # Set once the pool is open and hot indexes are in memory
+    ready: bool = False
+
+def _create_client() -> AsyncIOMotorClient:
+    listeners = []
+    # The slow-query profiler sees commands through the metrics listener
+    if settings.MONGODB_COMMAND_METRICS_ENABLED or settings.SLOW_QUERY_PROFILER_ENABLED:
+        # Imported here as app.db modules import this one
+        from app.db.monitoring import CommandMetrics
+        listeners.append(CommandMetrics())
+    return AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+        connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+        compressors=settings.MONGODB_COMPRESSORS,
+        event_listeners=listeners
+    )
+
 async def get_database() -> AsyncIOMotorDatabase:
     if not Database.client:
-        Database.client = AsyncIOMotorClient(settings.MONGODB_URL)
+        Database.client = _create_client()
         Database.db = Database.client[settings.DATABASE_NAME]
     return Database.db
 
+async def get_read_database() -> AsyncIOMotorDatabase:
+    """The database for search, history and analytics reads.
+
+    Prefers secondaries when MONGODB_SECONDARY_READS is set, so these reads
+    may lag the latest writes. Point reads and anything cached stay on
+    get_database().
+    """
+    if Database.read_db is None or Database.read_db.client is not Database.client:
+        db = await get_database()
+        if settings.MONGODB_SECONDARY_READS:
+            staleness = settings.MONGODB_MAX_STALENESS_SECONDS
+            preference = SecondaryPreferred(max_staleness=-1 if staleness is None else staleness)
+        else:
+            preference = Primary()
+        Database.read_db = db.client.get_database(db.name, read_preference=preference)
+    return Database.read_db
+
+async def warm_pool(db: AsyncIOMotorDatabase, connections: int) -> None:
+    """Open up to the given number of pooled connections by running that many pings at once.
+
+    The pings follow the read preference of db, so a read database warms the
+    pool of the member it reads from.
+    """
+    await asyncio.gather(*(
+        db.command("ping", read_preference=db.read_preference) for _ in range(connections)
+    ))
+
 async def close_database():
     if Database.client:
         Database.client.close()
         Database.client = None
-        Database.db = None
\ No newline at end of file
+        Database.db = None
+        Database.read_db = None
+        Database.transactions = None
+        Database.ready = False
+
+async def supports_transactions(db: AsyncIOMotorDatabase) -> bool:
+    """Whether the deployment is a replica set or sharded cluster"""
+    if Database.transactions is None:
+        hello = await db.client.admin.command("hello")
+        Database.transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+    return Database.transactions
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "FHIR Server"
@@ -7,6 +8,96 @@ class Settings(BaseSettings):
     DATABASE_NAME: str = "cursor5"
     DEBUG: bool = False
 
+    # MongoDB connection pool
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 10
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 5000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # Tried in order; ones whose package is missing are skipped
+    MONGODB_COMPRESSORS: str = "zstd,snappy,zlib"
+
+    # Metrics and tracing
+    MONGODB_COMMAND_METRICS_ENABLED: bool = True
+    # Re-encodes every cursor reply to measure it, so off unless sizing replies
+    MONGODB_REPLY_BYTES_METRICS_ENABLED: bool = False
+    OTEL_TRACING_ENABLED: bool = False
+
+    # Slow-query profiler for the query resolvers
+    SLOW_QUERY_PROFILER_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_MAX_SHAPES: int = 50
+    SLOW_QUERY_EXAMINED_RATIO: float = 10.0
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = 300.0
+
+    # Search, history and analytics reads
+    MONGODB_SECONDARY_READS: bool = True
+    MONGODB_MAX_STALENESS_SECONDS: Optional[int] = None
+
+    # Startup warm-up
+    MONGODB_WARMUP_ENABLED: bool = True
+    MONGODB_WARMUP_INDEX_KEYS: int = 1000
+
+    # Pagination
+    DEFAULT_PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 500
+
+    # Block-leased counters
+    COUNTER_BLOCK_SIZE: int = 100
+    COUNTER_STRIPES: int = 1
+
+    # Group-commit buffer for single Observation inserts
+    WRITE_BUFFER_ENABLED: bool = False
+    WRITE_BUFFER_MAX_DOCUMENTS: int = 100
+    WRITE_BUFFER_MAX_DELAY_MS: float = 5.0
+
+    # Bulk writes
+    BULK_WRITE_BATCH_SIZE: int = 1000
+
+    # Bulk $import
+    IMPORT_MAX_IN_FLIGHT: int = 4
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000
+
+    # Resource history: deltas between versions, with a full snapshot every K versions
+    HISTORY_DELTA_ENABLED: bool = False
+    HISTORY_SNAPSHOT_INTERVAL: int = 10
+
+    # Risk scoring: only vitals measured this recently count as a patient's latest
+    RISK_SCORE_LOOKBACK_HOURS: float = 24.0
+
+    # Vital-sign time-series storage
+    VITALS_TIMESERIES_ENABLED: bool = False
+    VITALS_TIMESERIES_COLLECTION: str = "vitals_timeseries"
+
+    # Subscriptions
+    SUBSCRIPTION_QUEUE_SIZE: int = 100
+
+    # Resource cache
+    RESOURCE_CACHE_ENABLED: bool = False
+    RESOURCE_CACHE_MAX_ENTRIES: int = 10000
+    RESOURCE_CACHE_TTL_SECONDS: float = 30.0
+
+    # GraphQL documents
+    GRAPHQL_DOCUMENT_CACHE_SIZE: int = 1000
+    GRAPHQL_ALLOWLIST_ENABLED: bool = False
+    GRAPHQL_PERSISTED_QUERIES_MANIFEST: Optional[str] = None
+
+    # GraphQL query cost limits
+    GRAPHQL_MAX_QUERY_COST: int = 50000
+    GRAPHQL_MAX_DEPTH: int = 12
+    GRAPHQL_MAX_ALIASES: int = 30
+    GRAPHQL_COST_BUDGET_PER_MINUTE: int = 500000
+    GRAPHQL_DEFAULT_LIST_SIZE: int = 10
+
+    # Bulk $export
+    EXPORT_DIR: str = "exports"
+    EXPORT_BATCH_SIZE: int = 1000
+    EXPORT_LEASE_SECONDS: int = 60
+
+    # Raw-BSON fast path for simple search queries
+    GRAPHQL_FAST_PATH_ENABLED: bool = False
+
     class Config:
         env_file = ".env"
 
@@ -1,3 +1,5 @@
+import sys
+
 VITAL_CODES = {
     "blood_pressure_systolic": {
         "code": "8480-6",
@@ -63,4 +65,61 @@ VALUE_RANGES = {
     "body_weight": (45.0, 120.0),
     "body_height": (150.0, 190.0),
     "bmi": (18.5, 35.0)
-}
\ No newline at end of file
+}
+
+# Collection holding the live documents of each resource type. Types not
+# listed here fall back to the lowercased resource type.
+RESOURCE_COLLECTIONS = {
+    "Observation": "observations",
+    "AllergyIntolerance": "allergyintolerance",
+    "Patient": "patients",
+    "Practitioner": "practitioners",
+    "Device": "devices"
+}
+
+# Code systems, profiles and codings repeated across stored resources
+LOINC_SYSTEM = "http://loinc.org"
+UCUM_SYSTEM = "http://unitsofmeasure.org"
+OBSERVATION_CATEGORY_SYSTEM = "http://terminology.hl7.org/CodeSystem/observation-category"
+ALLERGY_CLINICAL_SYSTEM = "http://terminology.hl7.org/CodeSystem/allergyintolerance-clinical"
+ALLERGY_VERIFICATION_SYSTEM = "http://terminology.hl7.org/CodeSystem/allergyintolerance-verification"
+VITAL_SIGNS_PROFILE = "http://hl7.org/fhir/StructureDefinition/vitalsigns"
+
+VITAL_SIGNS_CATEGORY = {
+    "system": OBSERVATION_CATEGORY_SYSTEM,
+    "code": "vital-signs",
+    "display": "Vital Signs"
+}
+
+VITAL_SIGNS_PANEL = {
+    "system": LOINC_SYSTEM,
+    "code": "85353-1",
+    "display": "Vital signs panel"
+}
+
+# Codings every vital-signs panel carries, shared by all decoded documents
+CONSTANT_CODINGS = [
+    VITAL_SIGNS_CATEGORY,
+    VITAL_SIGNS_PANEL,
+    *(
+        {"system": LOINC_SYSTEM, "code": vital["code"], "display": vital["display"]}
+        for vital in VITAL_CODES.values()
+    )
+]
+
+# Canonical copies of the strings above. Values decoded from BSON are new
+# objects in every document, so datatypes swap them for these.
+INTERNED_STRINGS = {
+    value: value
+    for value in map(sys.intern, {
+        LOINC_SYSTEM,
+        UCUM_SYSTEM,
+        OBSERVATION_CATEGORY_SYSTEM,
+        ALLERGY_CLINICAL_SYSTEM,
+        ALLERGY_VERIFICATION_SYSTEM,
+        VITAL_SIGNS_PROFILE,
+        "Patient",
+        *(coding[key] for coding in CONSTANT_CODINGS for key in ("code", "display")),
+        *(vital["unit"] for vital in VITAL_CODES.values())
+    })
+}
@@ -10,4 +10,19 @@ class SortOrder(Enum):
 class ResourceType(Enum):
     OBSERVATION = "Observation"
     PATIENT = "Patient"
-    PRACTITIONER = "Practitioner"
\ No newline at end of file
+    PRACTITIONER = "Practitioner"
+
+@strawberry.enum
+class TimeBucket(Enum):
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+@strawberry.enum
+class RiskLevel(Enum):
+    LOW = "low"
+    LOW_MEDIUM = "low-medium"
+    MEDIUM = "medium"
+    HIGH = "high"
@@ -0,0 +1,94 @@
+# app/core/metrics.py
+from prometheus_client import Counter, Gauge, Histogram
+from app.config.settings import get_settings
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    # Only needed with OTEL_TRACING_ENABLED
+    trace = None
+
+# Seconds, from sub-millisecond cache hits to slow aggregations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+GRAPHQL_PHASE_SECONDS = Histogram(
+    "graphql_phase_seconds",
+    "Time spent parsing, validating and executing GraphQL operations",
+    ["phase"],
+    buckets=LATENCY_BUCKETS
+)
+GRAPHQL_OPERATION_SECONDS = Histogram(
+    "graphql_operation_seconds",
+    "Total time of GraphQL operations",
+    ["operation_type", "status"],
+    buckets=LATENCY_BUCKETS
+)
+GRAPHQL_RESOLVER_SECONDS = Histogram(
+    "graphql_resolver_seconds",
+    "Time spent in GraphQL resolvers, by parent type and field",
+    ["field"],
+    buckets=LATENCY_BUCKETS
+)
+GRAPHQL_RESOLVER_ERRORS = Counter(
+    "graphql_resolver_errors_total",
+    "GraphQL resolvers that raised, by parent type and field",
+    ["field"]
+)
+FHIR_CONVERSION_SECONDS = Histogram(
+    "fhir_conversion_seconds",
+    "Time spent converting one stored document into its GraphQL type",
+    ["resource_type"],
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01)
+)
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongodb_command_seconds",
+    "MongoDB command round trips, by command and collection",
+    ["command", "collection"],
+    buckets=LATENCY_BUCKETS
+)
+MONGO_COMMAND_FAILURES = Counter(
+    "mongodb_command_failures_total",
+    "MongoDB commands that failed, by command and collection",
+    ["command", "collection"]
+)
+MONGO_DOCUMENTS_RETURNED = Counter(
+    "mongodb_documents_returned_total",
+    "Documents returned in cursor batches, by command and collection",
+    ["command", "collection"]
+)
+MONGO_REPLY_BYTES = Counter(
+    "mongodb_reply_bytes_total",
+    "BSON bytes of cursor batch replies, by command and collection, with MONGODB_REPLY_BYTES_METRICS_ENABLED",
+    ["command", "collection"]
+)
+WRITE_BUFFER_QUEUE_DEPTH = Gauge(
+    "write_buffer_queue_depth",
+    "Documents waiting in a write buffer for the next flush, by resource type",
+    ["resource_type"]
+)
+WRITE_BUFFER_FLUSH_DOCUMENTS = Histogram(
+    "write_buffer_flush_documents",
+    "Documents per write buffer flush, by resource type",
+    ["resource_type"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+)
+WRITE_BUFFER_FLUSH_SECONDS = Histogram(
+    "write_buffer_flush_seconds",
+    "Time of the insert_many of a write buffer flush, by resource type",
+    ["resource_type"],
+    buckets=LATENCY_BUCKETS
+)
+WRITE_BUFFER_WAIT_SECONDS = Histogram(
+    "write_buffer_wait_seconds",
+    "Time from a buffered insert to the outcome of its document, by resource type",
+    ["resource_type"],
+    buckets=LATENCY_BUCKETS
+)
+
+def get_tracer(name: str):
+    """An OpenTelemetry tracer, or None when tracing is disabled"""
+    if not get_settings().OTEL_TRACING_ENABLED:
+        return None
+    if trace is None:
+        raise RuntimeError("OTEL_TRACING_ENABLED needs the opentelemetry-api package")
+    return trace.get_tracer(name)
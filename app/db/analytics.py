@@ -0,0 +1,183 @@
+# app/db/analytics.py
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.constants import VITAL_CODES
+
+DEFAULT_PERCENTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+def resolve_vital(code: str) -> Tuple[str, Dict[str, Any]]:
+    """The VITAL_CODES name and entry of a vital sign given by name or LOINC code"""
+    if code in VITAL_CODES:
+        return code, VITAL_CODES[code]
+    for name, vital in VITAL_CODES.items():
+        if vital["code"] == code:
+            return name, vital
+    raise ValueError(f"Unknown vital sign {code}")
+
+def _stored_time(value: datetime) -> str:
+    # search_params dates are naive UTC ISO strings
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+def vital_values_pipeline(
+    loinc_code: str,
+    start: datetime,
+    end: datetime,
+    patient_ids: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """Stages yielding one {patient, value, day} document per measurement of a vital sign.
+
+    The first $match is an $elemMatch on search_params, so the multikey
+    search_params indexes bound the scan before anything is unwound.
+    """
+    param: Dict[str, Any] = {
+        "code": loinc_code,
+        "date": {"$gte": _stored_time(start), "$lt": _stored_time(end)},
+        "value": {"$ne": None}
+    }
+    if patient_ids is not None:
+        param["patient"] = {"$in": list(patient_ids)}
+    return [
+        {"$match": {"search_params": {"$elemMatch": param}}},
+        {"$project": {"_id": 0, "search_params": 1}},
+        {"$unwind": "$search_params"},
+        # Documents matched on one component still carry every other one
+        {"$match": {f"search_params.{key}": value for key, value in param.items()}},
+        {"$project": {
+            "patient": "$search_params.patient",
+            "value": "$search_params.value",
+            "day": {"$substrCP": ["$search_params.date", 0, 10]}
+        }}
+    ]
+
+async def vital_statistics(
+    db: AsyncIOMotorDatabase,
+    loinc_code: str,
+    start: datetime,
+    end: datetime,
+    low: float,
+    high: float,
+    patient_ids: Optional[Sequence[str]] = None,
+    bins: int = 10,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES
+) -> Dict[str, Any]:
+    """Summary statistics, percentiles, out-of-range counts and a histogram in one pass.
+
+    Values outside [low, high] are out of range. The histogram splits the range
+    into bins of equal width, the last one closed. $percentile needs MongoDB 7.0.
+    """
+    if bins < 1:
+        raise ValueError("bins must be a positive integer")
+    if low >= high:
+        raise ValueError("low must be below high")
+    width = (high - low) / bins
+    boundaries = [low + i * width for i in range(bins)] + [math.nextafter(high, math.inf)]
+    below = {"$cond": [{"$lt": ["$value", low]}, 1, 0]}
+    above = {"$cond": [{"$gt": ["$value", high]}, 1, 0]}
+
+    pipeline = vital_values_pipeline(loinc_code, start, end, patient_ids) + [
+        {"$facet": {
+            "summary": [
+                {"$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "mean": {"$avg": "$value"},
+                    "min": {"$min": "$value"},
+                    "max": {"$max": "$value"},
+                    "stdDev": {"$stdDevPop": "$value"},
+                    "percentiles": {"$percentile": {
+                        "input": "$value",
+                        "p": list(percentiles),
+                        "method": "approximate"
+                    }},
+                    "belowRange": {"$sum": below},
+                    "aboveRange": {"$sum": above}
+                }}
+            ],
+            "patients": [
+                {"$group": {
+                    "_id": "$patient",
+                    "below": {"$max": below},
+                    "above": {"$max": above}
+                }},
+                {"$group": {
+                    "_id": None,
+                    "patients": {"$sum": 1},
+                    "belowRange": {"$sum": "$below"},
+                    "aboveRange": {"$sum": "$above"}
+                }}
+            ],
+            "histogram": [
+                {"$match": {"value": {"$gte": low, "$lte": high}}},
+                {"$bucket": {"groupBy": "$value", "boundaries": boundaries, "output": {"count": {"$sum": 1}}}}
+            ]
+        }}
+    ]
+    result = (await db.observations.aggregate(pipeline, allowDiskUse=True).to_list(length=1))[0]
+    summary = result["summary"][0] if result["summary"] else {"count": 0, "percentiles": [None] * len(percentiles)}
+    patients = result["patients"][0] if result["patients"] else {}
+    counts = {bucket["_id"]: bucket["count"] for bucket in result["histogram"]}
+
+    histogram = [{"lower": None, "upper": low, "count": summary.get("belowRange", 0)}]
+    histogram += [
+        {"lower": lower, "upper": min(lower + width, high), "count": counts.get(lower, 0)}
+        for lower in boundaries[:-1]
+    ]
+    histogram.append({"lower": high, "upper": None, "count": summary.get("aboveRange", 0)})
+
+    return {
+        "count": summary["count"],
+        "mean": summary.get("mean"),
+        "min": summary.get("min"),
+        "max": summary.get("max"),
+        "stdDev": summary.get("stdDev"),
+        "percentiles": list(zip(percentiles, summary["percentiles"])),
+        "belowRange": summary.get("belowRange", 0),
+        "aboveRange": summary.get("aboveRange", 0),
+        "patients": patients.get("patients", 0),
+        "patientsBelowRange": patients.get("belowRange", 0),
+        "patientsAboveRange": patients.get("aboveRange", 0),
+        "histogram": histogram
+    }
+
+async def vital_daily_summary(
+    db: AsyncIOMotorDatabase,
+    loinc_code: str,
+    start: datetime,
+    end: datetime,
+    patient_ids: Optional[Sequence[str]] = None
+) -> List[Dict[str, Any]]:
+    """Per-day count, mean, min, max and number of patients measured, oldest day first"""
+    pipeline = vital_values_pipeline(loinc_code, start, end, patient_ids) + [
+        # Per patient first, so counting patients does not collect them into one array
+        {"$group": {
+            "_id": {"day": "$day", "patient": "$patient"},
+            "count": {"$sum": 1},
+            "sum": {"$sum": "$value"},
+            "min": {"$min": "$value"},
+            "max": {"$max": "$value"}
+        }},
+        {"$group": {
+            "_id": "$_id.day",
+            "patients": {"$sum": 1},
+            "count": {"$sum": "$count"},
+            "sum": {"$sum": "$sum"},
+            "min": {"$min": "$min"},
+            "max": {"$max": "$max"}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+    return [
+        {
+            "day": day["_id"],
+            "patients": day["patients"],
+            "count": day["count"],
+            "mean": day["sum"] / day["count"],
+            "min": day["min"],
+            "max": day["max"]
+        }
+        async for day in db.observations.aggregate(pipeline, allowDiskUse=True)
+    ]
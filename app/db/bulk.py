@@ -0,0 +1,354 @@
+# app/db/bulk.py
+import asyncio
+import json
+import re
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+from fhir.resources.R4B import get_fhir_model_class
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from app.config.database import supports_transactions
+from app.config.settings import get_settings
+from app.core.constants import RESOURCE_COLLECTIONS
+from app.fhir.utils.helpers import add_search_fields, normalize_datetimes, operation_outcome
+from .cache import resource_cache
+from .collections import resource_collection, history_collection
+from .timeseries import write_vital_points
+from .versioning import VersionManager
+
+# Bundle types accepted for ingest and the type of their response
+BUNDLE_RESPONSE_TYPES = {
+    "batch": "batch-response",
+    "transaction": "transaction-response"
+}
+
+# Ids as the server assigns them, the string form of an ObjectId
+SERVER_ID = re.compile(r"[0-9a-f]{24}")
+
+# (entry position, live document, history document)
+PreparedEntry = Tuple[int, Dict[str, Any], Dict[str, Any]]
+
+def _chunks(items: List[PreparedEntry], size: int) -> Iterator[List[PreparedEntry]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def error_response(status: str, diagnostics: str) -> Dict[str, Any]:
+    return {
+        "status": status,
+        "outcome": operation_outcome(diagnostics)
+    }
+
+def created_response(resource_type: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    version = doc["meta"]["versionId"]
+    return {
+        "status": "201 Created",
+        "location": f"{resource_type}/{doc['id']}/_history/{version}",
+        "etag": f'W/"{version}"',
+        "lastModified": doc["meta"]["lastUpdated"]
+    }
+
+def validate_resource(resource: Any) -> str:
+    """Validate a resource against its FHIR R4B model and return its type"""
+    if not isinstance(resource, dict):
+        raise ValueError("Entry has no resource")
+    resource_type = resource.get("resourceType")
+    if resource_type not in RESOURCE_COLLECTIONS:
+        raise ValueError(f"Unsupported resource type {resource_type}")
+    get_fhir_model_class(resource_type).model_validate(resource)
+    return resource_type
+
+def prepare_resource(
+    resource_type: str,
+    resource: Dict[str, Any],
+    keep_id: bool = False
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Build the live and history documents the create mutations would write.
+
+    The server assigns versions, and ids too unless keep_id is set and the
+    resource carries an id in the server's own format.
+    """
+    data = {key: value for key, value in resource.items() if key != "id"}
+    id = resource.get("id") if keep_id else None
+    if id is not None and not (isinstance(id, str) and SERVER_ID.fullmatch(id)):
+        raise ValueError(f"Resource id {id} is not a server-assigned id")
+    return VersionManager.prepare_new_resource(add_search_fields(resource_type, normalize_datetimes(data)), id)
+
+async def write_resources(
+    db: AsyncIOMotorDatabase,
+    resource_type: str,
+    entries: List[PreparedEntry],
+    outcomes: List[Optional[Dict[str, Any]]]
+) -> None:
+    """Insert live documents and their history with chunked unordered bulk writes"""
+    batch_size = get_settings().BULK_WRITE_BATCH_SIZE
+    live = resource_collection(db, resource_type)
+    history = history_collection(db, resource_type)
+
+    for chunk in _chunks(entries, batch_size):
+        failed: Dict[int, Dict[str, Any]] = {}
+        try:
+            await live.bulk_write([InsertOne(doc) for _, doc, _ in chunk], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error for error in e.details["writeErrors"]}
+
+        # Only record history for documents that made it into the live collection
+        written = [index for index in range(len(chunk)) if index not in failed]
+        if written:
+            try:
+                await history.bulk_write([InsertOne(chunk[index][2]) for index in written], ordered=False)
+            except BulkWriteError as e:
+                # A live document without history cannot be versioned, so take it back out
+                lost = {written[error["index"]]: error for error in e.details["writeErrors"]}
+                await live.delete_many({"_id": {"$in": [chunk[index][1]["_id"] for index in lost]}})
+                failed.update(lost)
+                written = [index for index in written if index not in lost]
+            if resource_type == "Observation":
+                await write_vital_points(db, [chunk[index][1] for index in written])
+            # Imports keep their ids, which may be cached as deleted
+            for index in written:
+                await resource_cache.invalidate(resource_type, chunk[index][1]["id"])
+
+        for index, (position, doc, _) in enumerate(chunk):
+            if index in failed:
+                error = failed[index]
+                status = "409 Conflict" if error.get("code") == 11000 else "400 Bad Request"
+                outcomes[position] = error_response(status, error.get("errmsg", "Write failed"))
+            else:
+                outcomes[position] = created_response(resource_type, doc)
+
+async def write_transaction(
+    db: AsyncIOMotorDatabase,
+    by_type: Dict[str, List[PreparedEntry]],
+    outcomes: List[Optional[Dict[str, Any]]]
+) -> None:
+    """Insert every live document and its history in one multi-document transaction.
+
+    Any write error aborts the transaction, so either every entry is created
+    or none is. Time-series collections cannot be written in a transaction,
+    so vital signs are mirrored once it has committed.
+    """
+    async def write(session):
+        for resource_type, entries in by_type.items():
+            await resource_collection(db, resource_type).insert_many(
+                [doc for _, doc, _ in entries], session=session
+            )
+            await history_collection(db, resource_type).insert_many(
+                [history_doc for _, _, history_doc in entries], session=session
+            )
+
+    try:
+        async with await db.client.start_session() as session:
+            await session.with_transaction(write)
+    except PyMongoError as e:
+        raise ValueError(f"Transaction failed, no entry was created: {str(e)}")
+
+    for resource_type, entries in by_type.items():
+        if resource_type == "Observation":
+            await write_vital_points(db, [doc for _, doc, _ in entries])
+        for position, doc, _ in entries:
+            await resource_cache.invalidate(resource_type, doc["id"])
+            outcomes[position] = created_response(resource_type, doc)
+
+async def ingest_bundle(db: AsyncIOMotorDatabase, bundle: Dict[str, Any]) -> Dict[str, Any]:
+    """Create every resource of a batch or transaction Bundle.
+
+    Batch entries are written with unordered bulk writes and succeed or fail
+    one by one. Transaction bundles are rejected as a whole if any entry is
+    invalid and written in one multi-document transaction, which needs a
+    replica set or sharded cluster; elsewhere they are rejected.
+    """
+    if not isinstance(bundle, dict) or bundle.get("resourceType") != "Bundle":
+        raise ValueError("Expected a Bundle resource")
+    bundle_type = bundle.get("type")
+    if bundle_type not in BUNDLE_RESPONSE_TYPES:
+        raise ValueError(f"Bundle type must be batch or transaction, got {bundle_type}")
+
+    entries = bundle.get("entry") or []
+    outcomes: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+    by_type: Dict[str, List[PreparedEntry]] = {}
+
+    for position, entry in enumerate(entries):
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError("Entry must be an object")
+            method = (entry.get("request") or {}).get("method", "POST")
+            if method != "POST":
+                raise ValueError(f"Unsupported method {method}, only POST entries can be ingested")
+            resource_type = validate_resource(entry.get("resource"))
+        except ValueError as e:
+            outcomes[position] = error_response("400 Bad Request", str(e))
+            continue
+        live_doc, history_doc = prepare_resource(resource_type, entry["resource"])
+        by_type.setdefault(resource_type, []).append((position, live_doc, history_doc))
+
+    if bundle_type == "transaction":
+        rejected = [outcome for outcome in outcomes if outcome]
+        if rejected:
+            raise ValueError(
+                f"Transaction rejected, {len(rejected)} invalid entries: "
+                f"{rejected[0]['outcome']['issue'][0]['diagnostics']}"
+            )
+        if not await supports_transactions(db):
+            raise ValueError(
+                "Transaction bundles need a replica set or sharded cluster, send a batch bundle instead"
+            )
+        await write_transaction(db, by_type, outcomes)
+    else:
+        for resource_type, prepared in by_type.items():
+            await write_resources(db, resource_type, prepared, outcomes)
+
+    return {
+        "resourceType": "Bundle",
+        "type": BUNDLE_RESPONSE_TYPES[bundle_type],
+        "entry": [{"response": outcome} for outcome in outcomes]
+    }
+
+@dataclass
+class ImportReport:
+    lines: int = 0
+    imported: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    # The first IMPORT_MAX_REPORTED_ERRORS failures as {"line", "diagnostics"}
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, line: int, diagnostics: str) -> None:
+        self.failed += 1
+        if len(self.errors) < get_settings().IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "diagnostics": diagnostics})
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lines": self.lines,
+            "imported": self.imported,
+            "failed": self.failed,
+            "seconds": round(self.seconds, 3),
+            "rowsPerSecond": round(self.imported / self.seconds, 1) if self.seconds else None,
+            "errors": self.errors
+        }
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], compressed: bool = False) -> AsyncIterator[bytes]:
+    """Split a byte stream, gzip compressed or not, into its non-empty lines"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if compressed else None
+    pending = b""
+    async for chunk in chunks:
+        if decompressor is not None:
+            data = decompressor.decompress(chunk)
+            while decompressor.eof and decompressor.unused_data:
+                # Concatenated gzip members
+                rest = decompressor.unused_data
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                data += decompressor.decompress(rest)
+            chunk = data
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+# (line number, live document, history document) grouped by resource type
+PreparedLines = Dict[str, List[PreparedEntry]]
+
+def _prepare_lines(numbered: List[Tuple[int, bytes]]) -> Tuple[PreparedLines, List[Tuple[int, str]]]:
+    """The documents of each valid line by resource type, and the errors of the others"""
+    by_type: PreparedLines = {}
+    errors: List[Tuple[int, str]] = []
+    for number, line in numbered:
+        try:
+            resource = json.loads(line)
+            resource_type = validate_resource(resource)
+            live_doc, history_doc = prepare_resource(resource_type, resource, keep_id=True)
+        except ValueError as e:
+            errors.append((number, str(e)))
+            continue
+        by_type.setdefault(resource_type, []).append((number, live_doc, history_doc))
+    return by_type, errors
+
+async def import_ndjson(
+    db: AsyncIOMotorDatabase,
+    lines: AsyncIterator[bytes],
+    progress: Optional[Callable[[ImportReport], None]] = None
+) -> ImportReport:
+    """Validate and create the resources of an NDJSON stream, one resource per line.
+
+    Lines are prepared a batch at a time off the event loop and written with the
+    same unordered bulk writes, history included, as Bundle ingest. At most
+    IMPORT_MAX_IN_FLIGHT batches are being written at once; reading the stream
+    waits for a free slot, so memory stays bounded however large the input is.
+    Resources keep ids in the server's format, so $export output round-trips.
+    A batch whose write fails has all its lines reported as failed; any other
+    error in a write stops the import and is raised.
+    """
+    settings = get_settings()
+    report = ImportReport()
+    window = asyncio.Semaphore(settings.IMPORT_MAX_IN_FLIGHT)
+    writes: set = set()
+    failures: List[BaseException] = []
+    started = time.monotonic()
+
+    async def write(by_type: PreparedLines) -> None:
+        try:
+            for resource_type, entries in by_type.items():
+                # write_resources fills outcomes by position, here the index in entries
+                outcomes: List[Optional[Dict[str, Any]]] = [None] * len(entries)
+                try:
+                    await write_resources(
+                        db,
+                        resource_type,
+                        [(index, live, history) for index, (_, live, history) in enumerate(entries)],
+                        outcomes
+                    )
+                except PyMongoError as e:
+                    # Chunks already written keep their outcomes; the rest of the batch failed
+                    outcomes = [outcome or error_response("500 Internal Server Error", str(e)) for outcome in outcomes]
+                for (number, _, _), outcome in zip(entries, outcomes):
+                    if outcome["status"].startswith("201"):
+                        report.imported += 1
+                    else:
+                        report.add_error(number, outcome["outcome"]["issue"][0]["diagnostics"])
+            if progress is not None:
+                report.seconds = time.monotonic() - started
+                progress(report)
+        finally:
+            window.release()
+
+    def finished(task: asyncio.Task) -> None:
+        writes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            failures.append(task.exception())
+
+    async def flush(batch: List[Tuple[int, bytes]]) -> None:
+        by_type, errors = await asyncio.to_thread(_prepare_lines, batch)
+        for number, diagnostics in errors:
+            report.add_error(number, diagnostics)
+        await window.acquire()
+        if failures:
+            window.release()
+            raise failures[0]
+        task = asyncio.create_task(write(by_type))
+        writes.add(task)
+        task.add_done_callback(finished)
+
+    batch: List[Tuple[int, bytes]] = []
+    try:
+        async for line in lines:
+            report.lines += 1
+            batch.append((report.lines, line))
+            if len(batch) >= settings.BULK_WRITE_BATCH_SIZE:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+        await asyncio.gather(*writes)
+        if failures:
+            raise failures[0]
+    finally:
+        for task in writes:
+            task.cancel()
+    report.seconds = time.monotonic() - started
+    return report
@@ -0,0 +1,180 @@
+# app/db/cache.py
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from app.config.settings import get_settings
+
+Document = Dict[str, Any]
+Loader = Callable[[Optional[Dict[str, int]]], Awaitable[Optional[Document]]]
+
+class CacheBackend(ABC):
+    """Storage behind ResourceCache. Subclass it to add a shared tier."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Document]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Document, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+class InMemoryLRUCache(CacheBackend):
+    """Process-local LRU cache with optional per-entry TTL"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Document]]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[Document]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Document, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+class ResourceCache:
+    """Read-through cache of resource documents keyed by (resourceType, id, versionId).
+
+    Versions are immutable and cached without expiry. The current version of a
+    resource is found through a short-lived pointer, dropped by invalidate()
+    whenever the resource is created, written or deleted. Deletions are
+    remembered as long as a pointer would be. Hits and misses count resource
+    lookups, not the backend reads each one takes.
+    """
+
+    def __init__(self, backend: CacheBackend, enabled: bool, ttl: float):
+        self.backend = backend
+        self.enabled = enabled
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _version_key(resource_type: str, id: str, version: str) -> str:
+        return f"{resource_type}/{id}/_history/{version}"
+
+    @staticmethod
+    def _current_key(resource_type: str, id: str) -> str:
+        return f"{resource_type}/{id}"
+
+    async def _put(self, resource_type: str, doc: Document) -> None:
+        version = doc.get("meta", {}).get("versionId")
+        if version is not None:
+            await self.backend.set(self._version_key(resource_type, doc["id"], version), doc)
+
+    async def current(
+        self,
+        resource_type: str,
+        id: str,
+        load: Loader,
+        projection: Optional[Dict[str, int]] = None
+    ) -> Optional[Document]:
+        """The current version of a resource. load(projection) fetches it on a miss."""
+        if not self.enabled:
+            return await load(projection)
+
+        pointer = await self.backend.get(self._current_key(resource_type, id))
+        if pointer is not None:
+            if pointer.get("deleted"):
+                self.hits += 1
+                return None
+            doc = await self.backend.get(self._version_key(resource_type, id, pointer["versionId"]))
+            if doc is not None:
+                self.hits += 1
+                return doc
+
+        self.misses += 1
+        # Whole documents are cached so any later selection can be served
+        doc = await load(None)
+        if doc is not None and doc.get("meta", {}).get("versionId") is not None:
+            await self._put(resource_type, doc)
+            await self.backend.set(
+                self._current_key(resource_type, id),
+                {"versionId": doc["meta"]["versionId"]},
+                ttl=self.ttl
+            )
+        return doc
+
+    async def version(
+        self,
+        resource_type: str,
+        id: str,
+        version: str,
+        load: Loader,
+        projection: Optional[Dict[str, int]] = None
+    ) -> Optional[Document]:
+        """A historical version of a resource. load(projection) fetches it on a miss."""
+        if not self.enabled:
+            return await load(projection)
+
+        pointer = await self.backend.get(self._current_key(resource_type, id))
+        if pointer is not None and pointer.get("deleted"):
+            self.hits += 1
+            return None
+        doc = await self.backend.get(self._version_key(resource_type, id, version))
+        if doc is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            doc = await load(None)
+            if doc is not None:
+                await self._put(resource_type, doc)
+        return doc
+
+    async def invalidate(self, resource_type: str, id: str, deleted: bool = False) -> None:
+        """Forget the current version of a resource, remembering deletions"""
+        if not self.enabled:
+            return
+        key = self._current_key(resource_type, id)
+        if deleted:
+            # Deleted resources lose their history too, so cached versions must not be served
+            await self.backend.set(key, {"deleted": True}, ttl=self.ttl)
+        else:
+            await self.backend.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses, **self.backend.stats()}
+
+def _create_resource_cache() -> ResourceCache:
+    settings = get_settings()
+    return ResourceCache(
+        InMemoryLRUCache(settings.RESOURCE_CACHE_MAX_ENTRIES),
+        enabled=settings.RESOURCE_CACHE_ENABLED,
+        ttl=settings.RESOURCE_CACHE_TTL_SECONDS
+    )
+
+resource_cache = _create_resource_cache()
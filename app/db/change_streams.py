@@ -0,0 +1,200 @@
+# app/db/change_streams.py
+import asyncio
+import base64
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+import bson
+from bson.errors import BSONError
+from pymongo.errors import OperationFailure, PyMongoError
+from app.config.database import get_database
+from app.config.settings import get_settings
+
+# Delay before reopening a change stream that failed
+RETRY_DELAY = 1.0
+
+# Server error raised when a resume token is older than the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+class SubscriptionLost(Exception):
+    """A subscriber missed events and must resubscribe, from its last cursor if resumable"""
+
+    def __init__(self, message: str, resumable: bool):
+        super().__init__(message)
+        self.resumable = resumable
+
+def encode_resume_token(token: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(bson.encode(token)).decode()
+
+def decode_resume_token(cursor: str) -> Dict[str, Any]:
+    try:
+        return bson.decode(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, BSONError):
+        raise ValueError(f"Invalid cursor {cursor}")
+
+def _history_lost(error: PyMongoError) -> bool:
+    return isinstance(error, OperationFailure) and error.code == CHANGE_STREAM_HISTORY_LOST
+
+# Whether a subscriber wants a change; others never reach its queue
+ChangeFilter = Callable[[Dict[str, Any]], bool]
+
+class Subscriber:
+    """A bounded queue of the changes it wants, and why it stopped receiving them if it did"""
+
+    def __init__(self, size: int, wants: Optional[ChangeFilter] = None):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self.wants = wants
+        self.lost: Optional[SubscriptionLost] = None
+
+    def drop(self, reason: SubscriptionLost) -> None:
+        self.lost = reason
+        if not self.queue.full():
+            # Wakes a consumer waiting on an empty queue
+            self.queue.put_nowait(None)
+
+class ChangeStreamHub:
+    """One change stream per collection, fanned out to in-process subscriber queues.
+
+    Every change carries its resume token, which clients get back as a cursor.
+    Each subscriber's filter runs before its queue, so it is only woken, and
+    only fills up, with changes it wants. A subscriber that falls behind is
+    cut off rather than silently losing events, and resubscribes from its
+    last cursor: the missed changes are replayed from a private stream opened
+    after the shared one, so the two overlap instead of leaving a gap.
+    """
+
+    def __init__(self, collection_name: str, pipeline: List[Dict[str, Any]]):
+        self.collection_name = collection_name
+        self.pipeline = pipeline
+        self._subscribers: Set[Subscriber] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._resume_token: Optional[Dict[str, Any]] = None
+        # Set while the shared stream is open, so every later change reaches it
+        self._open = asyncio.Event()
+
+    def subscribe(self, wants: Optional[ChangeFilter] = None) -> Subscriber:
+        subscriber = Subscriber(get_settings().SUBSCRIPTION_QUEUE_SIZE, wants)
+        self._subscribers.add(subscriber)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        if not self._subscribers:
+            self.stop()
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._open.clear()
+        # Clients resume from their own cursors; a later stream starts from new events
+        self._resume_token = None
+
+    def _publish(self, change: Dict[str, Any]) -> None:
+        for subscriber in list(self._subscribers):
+            if subscriber.lost is not None:
+                continue
+            if subscriber.wants is not None and not subscriber.wants(change):
+                continue
+            if subscriber.queue.full():
+                # Stalling the stream would hold back every other subscriber
+                self._subscribers.discard(subscriber)
+                subscriber.drop(SubscriptionLost(
+                    "Subscriber fell behind, resubscribe with after set to the last cursor received",
+                    resumable=True
+                ))
+                continue
+            subscriber.queue.put_nowait(change)
+
+    async def _watch(self) -> None:
+        while self._subscribers:
+            try:
+                db = await get_database()
+                async with db[self.collection_name].watch(
+                    self.pipeline,
+                    resume_after=self._resume_token
+                ) as stream:
+                    self._open.set()
+                    async for change in stream:
+                        # Reopening after an error resumes right after this event
+                        self._resume_token = stream.resume_token
+                        self._publish(change)
+            except PyMongoError as e:
+                self._open.clear()
+                print(f"Change stream on {self.collection_name} interrupted: {str(e)}")
+                if _history_lost(e):
+                    # The token is gone from the oplog; start over and tell subscribers what they missed
+                    self._resume_token = None
+                    for subscriber in list(self._subscribers):
+                        self._subscribers.discard(subscriber)
+                        subscriber.drop(SubscriptionLost(
+                            "Change stream history was lost, events since the last cursor cannot be replayed",
+                            resumable=False
+                        ))
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _replay(self, after: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Changes after a resume token up to the latest one, from a private stream"""
+        db = await get_database()
+        try:
+            async with db[self.collection_name].watch(self.pipeline, resume_after=after) as stream:
+                while True:
+                    change = await stream.try_next()
+                    if change is None:
+                        return
+                    yield change
+        except PyMongoError as e:
+            if _history_lost(e):
+                raise SubscriptionLost(
+                    "Events after this cursor are no longer in the oplog and cannot be replayed",
+                    resumable=False
+                )
+            raise
+
+    async def changes(
+        self,
+        after: Optional[Dict[str, Any]] = None,
+        wants: Optional[ChangeFilter] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Every change wanted after the resume token after, or from now on without one.
+
+        Raises SubscriptionLost once the subscriber has missed changes.
+        """
+        subscriber = self.subscribe(wants)
+        try:
+            replayed: Set[bytes] = set()
+            if after is not None:
+                # The replay reads up to a point after the shared stream opened,
+                # so nothing falls between the two
+                await self._open.wait()
+                async for change in self._replay(after):
+                    replayed.add(bson.encode(change["_id"]))
+                    if wants is None or wants(change):
+                        yield change
+            while True:
+                if subscriber.lost is not None and subscriber.queue.empty():
+                    raise subscriber.lost
+                change = await subscriber.queue.get()
+                if change is None:
+                    continue
+                if replayed and bson.encode(change["_id"]) in replayed:
+                    continue
+                yield change
+        finally:
+            self.unsubscribe(subscriber)
+
+_hubs: Dict[str, ChangeStreamHub] = {}
+
+def get_insert_hub(collection_name: str) -> ChangeStreamHub:
+    """The shared hub publishing documents inserted into a collection"""
+    if collection_name not in _hubs:
+        _hubs[collection_name] = ChangeStreamHub(
+            collection_name,
+            [{"$match": {"operationType": "insert"}}]
+        )
+    return _hubs[collection_name]
+
+def close_change_streams() -> None:
+    for hub in _hubs.values():
+        hub.stop()
+    _hubs.clear()
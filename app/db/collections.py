@@ -0,0 +1,17 @@
+# app/db/collections.py
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from app.core.constants import RESOURCE_COLLECTIONS
+
+def collection_name(resource_type: str) -> str:
+    """Name of the collection holding the live documents of a resource type"""
+    return RESOURCE_COLLECTIONS.get(resource_type, resource_type.lower())
+
+def history_collection_name(resource_type: str) -> str:
+    """Name of the collection holding the version history of a resource type"""
+    return f"{collection_name(resource_type)}_history"
+
+def resource_collection(db: AsyncIOMotorDatabase, resource_type: str) -> AsyncIOMotorCollection:
+    return db[collection_name(resource_type)]
+
+def history_collection(db: AsyncIOMotorDatabase, resource_type: str) -> AsyncIOMotorCollection:
+    return db[history_collection_name(resource_type)]
@@ -0,0 +1,124 @@
+# app/db/counters.py
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from app.config.settings import get_settings
+
+class BlockCounter:
+    """Hands out unique integers from blocks leased from the counters collection.
+
+    Each lease is one $inc of a counter document by the block size, so writers
+    only meet on that document once per block. With several stripes the
+    counter is split over as many documents and stripe s issues the numbers
+    seq * stripes + s, which never collide across stripes.
+
+    The stripe count is stored on the first counter document when it is
+    created and wins over the setting afterwards, since changing it would
+    reuse numbers. A counter document written before striping counts as one
+    stripe and carries on from where it was.
+    """
+
+    def __init__(self, name: str, block_size: int, stripes: int):
+        self.name = name
+        self.block_size = block_size
+        self.configured_stripes = stripes
+        self.stripes: Optional[int] = None
+        self._next = 0
+        self._end = 0
+        self._stripe = 0
+        self._lock = asyncio.Lock()
+
+        self.issued = 0
+        self.blocks = 0
+        self.refill_seconds = 0.0
+        self.max_refill_seconds = 0.0
+
+    def _document_id(self, stripe: int) -> str:
+        return self.name if stripe == 0 else f"{self.name}:{stripe}"
+
+    async def _load_stripes(self, db: AsyncIOMotorDatabase) -> int:
+        doc = await db.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$setOnInsert": {"next": 0, "stripes": self.configured_stripes}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc.get("stripes", 1)
+
+    async def _refill(self, db: AsyncIOMotorDatabase) -> None:
+        started = time.perf_counter()
+        if self.stripes is None:
+            self.stripes = await self._load_stripes(db)
+        # A different stripe each time spreads processes over the documents
+        stripe = random.randrange(self.stripes)
+        doc = await db.counters.find_one_and_update(
+            {"_id": self._document_id(stripe)},
+            {"$inc": {"next": self.block_size}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        # next is the last sequence number handed out from the document
+        self._stripe = stripe
+        self._next = doc["next"] - self.block_size + 1
+        self._end = doc["next"] + 1
+
+        elapsed = time.perf_counter() - started
+        self.blocks += 1
+        self.refill_seconds += elapsed
+        self.max_refill_seconds = max(self.max_refill_seconds, elapsed)
+
+    async def next(self, db: AsyncIOMotorDatabase) -> int:
+        while self._next >= self._end:
+            async with self._lock:
+                # Another caller may have refilled while this one waited
+                if self._next >= self._end:
+                    await self._refill(db)
+        seq = self._next
+        self._next += 1
+        self.issued += 1
+        return seq * self.stripes + self._stripe
+
+    def release(self) -> None:
+        """Give up the rest of the current block; those numbers are never issued"""
+        self._next = self._end = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "blockSize": self.block_size,
+            "stripes": self.stripes or self.configured_stripes,
+            "issued": self.issued,
+            "blocks": self.blocks,
+            "leased": self.blocks * self.block_size,
+            "remaining": self._end - self._next,
+            # Leased but not issued: released blocks, and the current one if the process stopped now
+            "wasted": self.blocks * self.block_size - self.issued,
+            "meanRefillMs": self.refill_seconds / self.blocks * 1000 if self.blocks else None,
+            "maxRefillMs": self.max_refill_seconds * 1000 if self.blocks else None
+        }
+
+class CounterService:
+    """The block counters of this process, by name"""
+
+    def __init__(self):
+        self._counters: Dict[str, BlockCounter] = {}
+
+    def counter(self, name: str) -> BlockCounter:
+        if name not in self._counters:
+            settings = get_settings()
+            self._counters[name] = BlockCounter(name, settings.COUNTER_BLOCK_SIZE, settings.COUNTER_STRIPES)
+        return self._counters[name]
+
+    async def next(self, db: AsyncIOMotorDatabase, name: str) -> int:
+        return await self.counter(name).next(db)
+
+    def release(self) -> None:
+        for counter in self._counters.values():
+            counter.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: counter.stats() for name, counter in self._counters.items()}
+
+counters = CounterService()
@@ -0,0 +1,210 @@
+# app/db/export.py
+import asyncio
+import json
+import os
+import shutil
+import struct
+import uuid
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from app.config.database import get_database
+from app.config.settings import get_settings
+from app.fhir.utils.helpers import to_fhir_resource, to_stored_datetime
+from .collections import resource_collection
+
+# Delay before retrying an interrupted export or checking another worker's lease
+RETRY_DELAY = 5.0
+
+# Gzip member header: deflate, no name, no mtime, unknown OS
+GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+_tasks: Dict[str, asyncio.Task] = {}
+
+def export_file_path(job_id: str, resource_type: str, compressed: bool) -> str:
+    extension = ".ndjson.gz" if compressed else ".ndjson"
+    return os.path.join(get_settings().EXPORT_DIR, job_id, resource_type + extension)
+
+def _write_at(path: str, offset: int, data: bytes) -> int:
+    """Write data at offset, dropping anything after it, and return the new file size"""
+    with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+        f.truncate(offset)
+        f.seek(offset)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+def _gzip_chunk(data: bytes, output: Dict[str, Any], finish: bool) -> bytes:
+    """The next piece of one gzip stream holding every batch of the output.
+
+    Each batch ends on a full flush, which leaves no back-references into
+    earlier batches, so a resumed job carries on with a fresh compressor from
+    any checkpoint. The running CRC and size for the trailer are kept in
+    output alongside the offset.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    chunk = GZIP_HEADER if output["offset"] == 0 else b""
+    chunk += compressor.compress(data) + compressor.flush(zlib.Z_FINISH if finish else zlib.Z_FULL_FLUSH)
+    output["crc"] = zlib.crc32(data, output["crc"])
+    output["size"] += len(data)
+    if finish:
+        chunk += struct.pack("<II", output["crc"], output["size"] & 0xFFFFFFFF)
+    return chunk
+
+async def create_export_job(
+    db: AsyncIOMotorDatabase,
+    resource_types: List[str],
+    since: Optional[str],
+    compressed: bool,
+    request_url: str
+) -> Dict[str, Any]:
+    """Record a new export job and start running it"""
+    job = {
+        "_id": uuid.uuid4().hex,
+        "status": "in-progress",
+        "request": request_url,
+        "transactionTime": datetime.utcnow().isoformat(),
+        "since": to_stored_datetime(since) if since else None,
+        "compressed": compressed,
+        "outputs": [
+            {"type": resource_type, "count": 0, "offset": 0, "crc": 0, "size": 0, "lastId": None, "done": False}
+            for resource_type in resource_types
+        ],
+        "leaseUntil": datetime.utcnow(),
+        "error": None
+    }
+    await db.export_jobs.insert_one(job)
+    start_export_job(job["_id"])
+    return job
+
+async def _claim(db: AsyncIOMotorDatabase, job_id: str) -> Optional[Dict[str, Any]]:
+    """Take or renew the lease of an unfinished job, so one worker runs it at a time"""
+    now = datetime.utcnow()
+    return await db.export_jobs.find_one_and_update(
+        {"_id": job_id, "status": "in-progress", "leaseUntil": {"$lte": now}},
+        {"$set": {"leaseUntil": now + timedelta(seconds=get_settings().EXPORT_LEASE_SECONDS)}},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def _export_type(db: AsyncIOMotorDatabase, job: Dict[str, Any], index: int) -> None:
+    """Stream one resource type into its NDJSON file, checkpointing after every batch"""
+    settings = get_settings()
+    output = job["outputs"][index]
+    resource_type = output["type"]
+    path = export_file_path(job["_id"], resource_type, job["compressed"])
+
+    query: Dict[str, Any] = {}
+    if job["since"]:
+        query["meta.lastUpdated"] = {"$gte": job["since"]}
+    if output["lastId"] is not None:
+        # Everything up to lastId is already in the file
+        query["_id"] = {"$gt": output["lastId"]}
+
+    cursor = resource_collection(db, resource_type).find(query).sort("_id", 1).batch_size(settings.EXPORT_BATCH_SIZE)
+    lines: List[str] = []
+    last_id = output["lastId"]
+
+    async def checkpoint(done: bool) -> None:
+        nonlocal lines
+        data = "".join(lines).encode()
+        chunk = _gzip_chunk(data, output, done) if job["compressed"] else data
+        if chunk:
+            output["offset"] = await asyncio.to_thread(_write_at, path, output["offset"], chunk)
+        output["count"] += len(lines)
+        output["lastId"] = last_id
+        output["done"] = done
+        lines = []
+        await db.export_jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {
+                f"outputs.{index}": output,
+                "leaseUntil": datetime.utcnow() + timedelta(seconds=settings.EXPORT_LEASE_SECONDS)
+            }}
+        )
+
+    async for doc in cursor:
+        last_id = doc["_id"]
+        lines.append(json.dumps(to_fhir_resource(doc), default=str) + "\n")
+        if len(lines) >= settings.EXPORT_BATCH_SIZE:
+            await checkpoint(done=False)
+    await checkpoint(done=True)
+
+async def run_export_job(db: AsyncIOMotorDatabase, job_id: str) -> bool:
+    """Export every pending resource type of a job, continuing from its checkpoints.
+
+    Returns False without doing anything while another worker holds the job.
+    """
+    job = await _claim(db, job_id)
+    if job is None:
+        return False
+    os.makedirs(os.path.join(get_settings().EXPORT_DIR, job_id), exist_ok=True)
+    try:
+        for index, output in enumerate(job["outputs"]):
+            if not output["done"]:
+                await _export_type(db, job, index)
+    except PyMongoError:
+        # Left in progress to resume from the last checkpoint
+        raise
+    except Exception as e:
+        await db.export_jobs.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "failed", "error": str(e)}}
+        )
+        raise
+    await db.export_jobs.update_one(
+        {"_id": job_id},
+        {"$set": {"status": "completed", "completedAt": datetime.utcnow().isoformat()}}
+    )
+    return True
+
+async def _run_until_finished(job_id: str) -> None:
+    try:
+        while True:
+            try:
+                db = await get_database()
+                if await run_export_job(db, job_id):
+                    return
+                job = await db.export_jobs.find_one({"_id": job_id}, {"status": 1})
+                if job is None or job["status"] != "in-progress":
+                    return
+                # Another worker holds the lease; take over if it stops renewing it
+            except PyMongoError as e:
+                print(f"Export {job_id} interrupted: {str(e)}")
+            except Exception as e:
+                print(f"Export {job_id} failed: {str(e)}")
+                return
+            await asyncio.sleep(RETRY_DELAY)
+    finally:
+        _tasks.pop(job_id, None)
+
+def start_export_job(job_id: str) -> None:
+    if job_id not in _tasks:
+        _tasks[job_id] = asyncio.create_task(_run_until_finished(job_id))
+
+async def resume_export_jobs(db: AsyncIOMotorDatabase) -> int:
+    """Restart unfinished jobs, each once its previous worker's lease runs out"""
+    jobs = db.export_jobs.find({"status": "in-progress"}, {"_id": 1})
+    resumed = 0
+    async for job in jobs:
+        start_export_job(job["_id"])
+        resumed += 1
+    return resumed
+
+async def delete_export_job(db: AsyncIOMotorDatabase, job_id: str) -> bool:
+    """Cancel a job and remove its files"""
+    task = _tasks.pop(job_id, None)
+    if task is not None:
+        task.cancel()
+    result = await db.export_jobs.delete_one({"_id": job_id})
+    await asyncio.to_thread(shutil.rmtree, os.path.join(get_settings().EXPORT_DIR, job_id), True)
+    return result.deleted_count > 0
+
+def stop_export_jobs() -> None:
+    """Cancel running jobs at shutdown; they resume from their checkpoints on the next start"""
+    for task in _tasks.values():
+        task.cancel()
+    _tasks.clear()
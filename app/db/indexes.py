@@ -1,22 +1,148 @@
-from motor.motor_asyncio import AsyncIOMotorDatabase
-
-async def create_indexes(db: AsyncIOMotorDatabase):
-    resources = db.resources
-    
-    # Base indexes
-    await resources.create_index("resourceType", background=True)
-    await resources.create_index("id", background=True)
-    await resources.create_index(
-        [("resourceType", 1), ("id", 1)],
-        unique=True,
-        background=True
-    )
-    
-    # Observation-specific indexes
-    await resources.create_index("patient_id")
-    await resources.create_index("code_loinc")
-    await resources.create_index("date")
-    await resources.create_index("value")
-    await resources.create_index([("patient_id", 1), ("code_loinc", 1)])
-    await resources.create_index([("patient_id", 1), ("date", 1)])
-    await resources.create_index("meta.lastUpdated")
\ No newline at end of file
+# app/db/indexes.py
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import IndexModel
+from .collections import collection_name, history_collection_name
+
+@dataclass(frozen=True)
+class IndexSpec:
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+
+    @property
+    def name(self) -> str:
+        # Same naming scheme MongoDB uses for unnamed indexes
+        return "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    def to_model(self) -> IndexModel:
+        return IndexModel(list(self.keys), name=self.name, unique=self.unique)
+
+@dataclass(frozen=True)
+class QueryShape:
+    """The fields a resolver filters on, used to detect unindexed queries"""
+    name: str
+    fields: Tuple[str, ...]
+    history: bool = False
+
+@dataclass(frozen=True)
+class ResourceIndexes:
+    live: Tuple[IndexSpec, ...]
+    history: Tuple[IndexSpec, ...]
+    queries: Tuple[QueryShape, ...] = ()
+
+@dataclass
+class IndexReport:
+    created: List[str] = field(default_factory=list)
+    collscans: List[str] = field(default_factory=list)
+
+HISTORY_INDEXES = (
+    IndexSpec((("id", 1), ("versionKey", 1)), unique=True),
+)
+
+INDEX_REGISTRY: Dict[str, ResourceIndexes] = {
+    "Observation": ResourceIndexes(
+        live=(
+            IndexSpec((("id", 1),), unique=True),
+            IndexSpec((("patient_id", 1), ("date", 1))),
+            IndexSpec((("patient_id", 1), ("effectiveDateTime", -1), ("_id", -1))),
+            IndexSpec((("effectiveDateTime", -1), ("_id", -1))),
+            IndexSpec((("subject.reference", 1), ("effectiveDateTime", -1))),
+            IndexSpec((("code.coding.code", 1),)),
+            IndexSpec((("search_params.patient", 1), ("search_params.code", 1), ("search_params.value", 1))),
+            IndexSpec((("search_params.code", 1), ("search_params.value", 1))),
+            IndexSpec((("search_params.code", 1), ("search_params.date", 1))),
+            IndexSpec((("meta.lastUpdated", 1),)),
+        ),
+        history=HISTORY_INDEXES,
+        queries=(
+            QueryShape("observation(id)", ("id",)),
+            QueryShape("searchObservations(patientId)", ("patient_id",)),
+            QueryShape("searchObservations(code)", ("search_params.code",)),
+            QueryShape("searchObservations(date)", ("date",)),
+            QueryShape("searchObservations(valueMin, valueMax)", ("search_params.value",)),
+            QueryShape("vitalStatistics(code, from, to)", ("search_params.code", "search_params.date")),
+        )
+    ),
+    "AllergyIntolerance": ResourceIndexes(
+        live=(
+            IndexSpec((("id", 1),), unique=True),
+            IndexSpec((("patient.reference", 1), ("clinicalStatus.coding.code", 1))),
+            IndexSpec((("patient.reference", 1), ("recordedDate", -1), ("_id", -1))),
+            IndexSpec((("recordedDate", -1), ("_id", -1))),
+            IndexSpec((("clinicalStatus.coding.code", 1),)),
+            IndexSpec((("code.coding.code", 1),)),
+            IndexSpec((("meta.lastUpdated", 1),)),
+        ),
+        history=HISTORY_INDEXES,
+        queries=(
+            QueryShape("allergyIntolerance(id)", ("id",)),
+            QueryShape("searchAllergies(patientId)", ("patient.reference",)),
+            QueryShape("searchAllergies(clinicalStatus)", ("clinicalStatus.coding.code",)),
+            QueryShape("searchAllergies(criticality)", ("criticality",)),
+            QueryShape("searchAllergies(code)", ("code.coding.code",)),
+            QueryShape("allergyIntoleranceVersion(id, version)", ("id", "versionKey"), history=True),
+            QueryShape("allergyIntoleranceHistory(id)", ("id",), history=True),
+        )
+    ),
+    # Loaded by id for the references that point at them
+    **{
+        resource_type: ResourceIndexes(
+            live=(IndexSpec((("id", 1),), unique=True), IndexSpec((("meta.lastUpdated", 1),))),
+            history=HISTORY_INDEXES,
+            queries=(QueryShape(f"Reference.resource({resource_type})", ("id",)),)
+        )
+        for resource_type in ("Patient", "Practitioner", "Device")
+    }
+}
+
+async def _ensure_collection_indexes(
+    collection: AsyncIOMotorCollection,
+    specs: Tuple[IndexSpec, ...],
+    report: IndexReport
+) -> List[Tuple[Tuple[str, int], ...]]:
+    """Build the missing indexes of a collection and return every key pattern it now has"""
+    existing = [
+        tuple(index["key"].items())
+        for index in await collection.list_indexes().to_list(length=None)
+    ]
+    missing = [spec for spec in specs if spec.keys not in existing]
+    if missing:
+        await collection.create_indexes([spec.to_model() for spec in missing])
+        report.created.extend(f"{collection.name}.{spec.name}" for spec in missing)
+        existing.extend(spec.keys for spec in missing)
+    return existing
+
+def _uses_index(shape: QueryShape, key_patterns: List[Tuple[Tuple[str, int], ...]]) -> bool:
+    # The planner can only use an index whose leading key is filtered on
+    return any(keys[0][0] in shape.fields for keys in key_patterns)
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> IndexReport:
+    """Diff the registry against the live indexes and build only what is missing"""
+    report = IndexReport()
+    for resource_type, indexes in INDEX_REGISTRY.items():
+        live_keys = await _ensure_collection_indexes(
+            db[collection_name(resource_type)], indexes.live, report
+        )
+        history_keys = await _ensure_collection_indexes(
+            db[history_collection_name(resource_type)], indexes.history, report
+        )
+        for shape in indexes.queries:
+            if not _uses_index(shape, history_keys if shape.history else live_keys):
+                report.collscans.append(shape.name)
+    return report
+
+async def warm_indexes(db: AsyncIOMotorDatabase, keys_per_index: int) -> int:
+    """Read the leading keys of every live index so their first pages are in the cache.
+
+    Returns the number of indexes touched.
+    """
+    touched = 0
+    for resource_type, indexes in INDEX_REGISTRY.items():
+        collection = db[collection_name(resource_type)]
+        for spec in indexes.live:
+            projection = {"_id": 0, **{key: 1 for key, _ in spec.keys}}
+            cursor = collection.find({}, projection).hint(list(spec.keys)).limit(keys_per_index)
+            await cursor.to_list(length=None)
+            touched += 1
+    return touched
@@ -0,0 +1,104 @@
+# app/db/migrations.py
+from datetime import datetime
+from typing import Awaitable, Callable, List, Tuple
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.constants import RESOURCE_COLLECTIONS
+from .collections import resource_collection, history_collection
+from .versioning import MAJOR_FACTOR, MINOR_FACTOR
+
+def _version_key_expression(version_field: str) -> dict:
+    """Aggregation equivalent of versioning.version_key"""
+    return {"$let": {
+        "vars": {"parts": {"$concatArrays": [
+            {"$map": {"input": {"$split": [version_field, "."]}, "in": {"$toLong": "$$this"}}},
+            [0, 0]
+        ]}},
+        "in": {"$add": [
+            {"$multiply": [{"$arrayElemAt": ["$$parts", 0]}, MAJOR_FACTOR]},
+            {"$multiply": [{"$arrayElemAt": ["$$parts", 1]}, MINOR_FACTOR]},
+            {"$arrayElemAt": ["$$parts", 2]}
+        ]}
+    }}
+
+async def history_version_keys(db: AsyncIOMotorDatabase) -> None:
+    """Give every history entry a numeric versionKey and make history hold each version exactly once.
+
+    History used to store a version when it was replaced, plus version 1.0.0 at
+    creation, so 1.0.0 was stored twice and the current version not at all.
+    """
+    for resource_type in RESOURCE_COLLECTIONS:
+        history = history_collection(db, resource_type)
+
+        await history.update_many(
+            {"versionKey": {"$exists": False}},
+            [{"$set": {"versionKey": _version_key_expression("$version")}}]
+        )
+
+        duplicates = history.aggregate([
+            {"$group": {
+                "_id": {"id": "$id", "versionKey": "$versionKey"},
+                "ids": {"$push": "$_id"},
+                "count": {"$sum": 1}
+            }},
+            {"$match": {"count": {"$gt": 1}}}
+        ])
+        async for group in duplicates:
+            await history.delete_many({"_id": {"$in": group["ids"][1:]}})
+
+        await history.create_index([("id", 1), ("versionKey", 1)], unique=True)
+
+        # Copy current versions of updated resources that history is missing
+        await resource_collection(db, resource_type).aggregate([
+            {"$match": {"meta.versionId": {"$regex": r"^\d+\.\d+\.\d+$", "$ne": "1.0.0"}}},
+            {"$set": {
+                "version": "$meta.versionId",
+                "versionKey": _version_key_expression("$meta.versionId")
+            }},
+            {"$unset": "_id"},
+            {"$merge": {
+                "into": history.name,
+                "on": ["id", "versionKey"],
+                "whenMatched": "keepExisting",
+                "whenNotMatched": "insert"
+            }}
+        ]).to_list(length=None)
+
+async def observation_search_params(db: AsyncIOMotorDatabase) -> None:
+    """Backfill the search_params projection on Observations written before it existed.
+
+    Mirrors helpers.observation_search_params.
+    """
+    items = {"$concatArrays": [
+        [{"code": "$code", "valueQuantity": "$valueQuantity"}],
+        {"$ifNull": ["$component", []]}
+    ]}
+    await resource_collection(db, "Observation").update_many(
+        {"search_params": {"$exists": False}},
+        [{"$set": {"search_params": {"$map": {
+            "input": {"$filter": {"input": items, "as": "item", "cond": {"$gt": [{"$size": {"$ifNull": ["$$item.code.coding", []]}}, 0]}}},
+            "as": "item",
+            "in": {
+                "code": {"$arrayElemAt": ["$$item.code.coding.code", 0]},
+                "value": "$$item.valueQuantity.value",
+                "date": "$effectiveDateTime",
+                "patient": "$patient_id"
+            }
+        }}}}]
+    )
+
+# Applied in order, each at most once per database
+MIGRATIONS: List[Tuple[str, Callable[[AsyncIOMotorDatabase], Awaitable[None]]]] = [
+    ("history_version_keys", history_version_keys),
+    ("observation_search_params", observation_search_params),
+]
+
+async def run_migrations(db: AsyncIOMotorDatabase) -> List[str]:
+    """Apply pending migrations and return their names"""
+    applied = []
+    for name, migration in MIGRATIONS:
+        if await db.migrations.find_one({"_id": name}):
+            continue
+        await migration(db)
+        await db.migrations.insert_one({"_id": name, "appliedAt": datetime.utcnow().isoformat()})
+        applied.append(name)
+    return applied
@@ -0,0 +1,94 @@
+# app/db/monitoring.py
+from typing import Any, Dict, Tuple
+import bson
+from pymongo import monitoring
+from app.config.settings import get_settings
+from app.core.metrics import (
+    MONGO_COMMAND_FAILURES,
+    MONGO_COMMAND_SECONDS,
+    MONGO_DOCUMENTS_RETURNED,
+    MONGO_REPLY_BYTES,
+    get_tracer,
+    trace
+)
+from .profiler import current_resolver, slow_queries
+
+# Commands whose replies carry a cursor batch
+CURSOR_BATCHES = {"find": "firstBatch", "aggregate": "firstBatch", "getMore": "nextBatch"}
+
+def command_collection(command_name: str, command: Dict[str, Any]) -> str:
+    """The collection a command runs on, or "" for database-level commands"""
+    target = command.get("collection") if command_name == "getMore" else command.get(command_name)
+    return target if isinstance(target, str) else ""
+
+class CommandMetrics(monitoring.CommandListener):
+    """Records latency, failures and returned documents of every command, and reply bytes if enabled.
+
+    With tracing enabled each command also gets a client span. Motor runs
+    commands with a copy of the caller's context, so the span nests under
+    whatever span, such as a resolver's, was current when the command was issued.
+    The same context tells which query resolver sent a command, for the
+    slow-query profiler.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.tracer = get_tracer(__name__)
+        self.reply_bytes = settings.MONGODB_REPLY_BYTES_METRICS_ENABLED
+        self.slow_query_ms = settings.SLOW_QUERY_THRESHOLD_MS if settings.SLOW_QUERY_PROFILER_ENABLED else None
+        # Collection, span and profiled command of each running command; events run on Motor's threads
+        self._running: Dict[Tuple[int, Any], Tuple[str, Any, Any]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = command_collection(event.command_name, event.command)
+        span = None
+        if self.tracer is not None:
+            span = self.tracer.start_span(
+                f"mongodb {event.command_name}",
+                kind=trace.SpanKind.CLIENT,
+                attributes={
+                    "db.system": "mongodb",
+                    "db.name": event.database_name,
+                    "db.operation": event.command_name,
+                    "db.mongodb.collection": collection
+                }
+            )
+        profiled = None
+        if self.slow_query_ms is not None:
+            resolver = current_resolver.get()
+            if resolver is not None:
+                profiled = (resolver, event.database_name, event.command)
+        self._running[(event.request_id, event.connection_id)] = (collection, span, profiled)
+
+    def _finish(self, event) -> Tuple[str, Any, Any]:
+        return self._running.pop((event.request_id, event.connection_id), ("", None, None))
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        collection, span, profiled = self._finish(event)
+        labels = (event.command_name, collection)
+        MONGO_COMMAND_SECONDS.labels(*labels).observe(event.duration_micros / 1_000_000)
+
+        duration_ms = event.duration_micros / 1000
+        if profiled is not None and duration_ms >= self.slow_query_ms:
+            resolver, database, command = profiled
+            slow_queries.observe(database, event.command_name, command, resolver, duration_ms)
+
+        batch_field = CURSOR_BATCHES.get(event.command_name)
+        cursor = event.reply.get("cursor") if batch_field else None
+        if cursor:
+            batch = cursor.get(batch_field) or []
+            MONGO_DOCUMENTS_RETURNED.labels(*labels).inc(len(batch))
+            if batch and self.reply_bytes:
+                MONGO_REPLY_BYTES.labels(*labels).inc(len(bson.encode(event.reply)))
+            if span is not None:
+                span.set_attribute("db.mongodb.documents_returned", len(batch))
+        if span is not None:
+            span.end()
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        collection, span, _ = self._finish(event)
+        MONGO_COMMAND_SECONDS.labels(event.command_name, collection).observe(event.duration_micros / 1_000_000)
+        MONGO_COMMAND_FAILURES.labels(event.command_name, collection).inc()
+        if span is not None:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, str(event.failure)))
+            span.end()
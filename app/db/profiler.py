@@ -0,0 +1,196 @@
+# app/db/profiler.py
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+from pymongo.errors import PyMongoError
+from app.config.database import Database
+from app.config.settings import get_settings
+
+# Query resolver running the current command, set by the QueryProfiler extension.
+# Motor copies the context onto the thread that sends the command.
+current_resolver: ContextVar[Optional[str]] = ContextVar("current_resolver", default=None)
+
+PROFILED_COMMANDS = ("find", "aggregate", "count")
+
+# Command fields that belong to the session or transaction, not the query
+SESSION_FIELDS = ("lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern")
+
+def normalize(value: Any) -> Any:
+    """The shape of a filter or pipeline: field names and operators, literals replaced by "?"
+
+    Field paths such as "$value" are kept. Lists holding only literals, such
+    as the operand of $in, collapse to one "?" whatever their length.
+    """
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [normalize(item) for item in value]
+        return "?" if all(item == "?" for item in items) else items
+    if isinstance(value, str) and value.startswith("$"):
+        return value
+    return "?"
+
+def query_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    if command_name == "find":
+        return {"filter": normalize(command.get("filter", {})), "sort": list(command.get("sort") or {})}
+    if command_name == "aggregate":
+        return {"pipeline": normalize(command.get("pipeline", []))}
+    return {"query": normalize(command.get("query", {}))}
+
+def _plan_nodes(plan: Any) -> List[Dict[str, Any]]:
+    """Every stage of a plan tree, whatever the planner's nesting"""
+    if isinstance(plan, list):
+        return [node for item in plan for node in _plan_nodes(item)]
+    if not isinstance(plan, dict):
+        return []
+    nodes = [plan] if "stage" in plan else []
+    for value in plan.values():
+        nodes.extend(_plan_nodes(value))
+    return nodes
+
+def _find_key(document: Any, key: str) -> Optional[Dict[str, Any]]:
+    """The first value under key, searching nested stages such as an aggregation's $cursor"""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        values = document.values()
+    elif isinstance(document, list):
+        values = document
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+def summarize_explain(explain: Dict[str, Any], examined_ratio: float) -> Dict[str, Any]:
+    """Winning plan stages, indexes, execution counters and the problems they show"""
+    planner = _find_key(explain, "queryPlanner") or {}
+    stats = _find_key(explain, "executionStats") or {}
+    nodes = _plan_nodes(planner.get("winningPlan", {}))
+    stages = [node["stage"] for node in nodes]
+    returned = stats.get("nReturned", 0)
+    docs_examined = stats.get("totalDocsExamined", 0)
+
+    flags = []
+    if "COLLSCAN" in stages:
+        flags.append("COLLSCAN")
+    if docs_examined / max(returned, 1) > examined_ratio:
+        flags.append("HIGH_EXAMINED_RATIO")
+    if "SORT" in stages:
+        flags.append("IN_MEMORY_SORT")
+    return {
+        "stages": stages,
+        "indexes": sorted({node["indexName"] for node in nodes if "indexName" in node}),
+        "nReturned": returned,
+        "totalDocsExamined": docs_examined,
+        "totalKeysExamined": stats.get("totalKeysExamined", 0),
+        "executionTimeMillis": stats.get("executionTimeMillis"),
+        "flags": flags
+    }
+
+class SlowQueryProfiler:
+    """Collects query resolver commands slower than SLOW_QUERY_THRESHOLD_MS, by shape.
+
+    observe is called from the command listener on Motor's threads and hands
+    over to the event loop, where each shape is explained with
+    executionStats in the background, at most once per
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS. Only shapes are kept, never the
+    values queried for. At most SLOW_QUERY_MAX_SHAPES are kept; a new shape
+    evicts the one with the least total time.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._shapes: Dict[str, Dict[str, Any]] = {}
+        self._explaining: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    def stop(self) -> None:
+        self._loop = None
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        self._explaining.clear()
+
+    def observe(self, database: str, command_name: str, command: Dict[str, Any], resolver: str, duration_ms: float) -> None:
+        loop = self._loop
+        if loop is None or command_name not in PROFILED_COMMANDS:
+            return
+        shape = {
+            "resolver": resolver,
+            "collection": command.get(command_name),
+            "command": command_name,
+            "shape": query_shape(command_name, command)
+        }
+        key = json.dumps(shape, sort_keys=True, default=str)
+        target = {
+            name: value for name, value in command.items()
+            if not name.startswith("$") and name not in SESSION_FIELDS
+        }
+        loop.call_soon_threadsafe(self._record, key, shape, database, target, duration_ms)
+
+    def _record(self, key: str, shape: Dict[str, Any], database: str, target: Dict[str, Any], duration_ms: float) -> None:
+        settings = get_settings()
+        entry = self._shapes.get(key)
+        if entry is None:
+            if len(self._shapes) >= settings.SLOW_QUERY_MAX_SHAPES:
+                cheapest = min(self._shapes, key=lambda k: self._shapes[k]["totalMs"])
+                del self._shapes[cheapest]
+            entry = self._shapes[key] = {
+                **shape,
+                "count": 0,
+                "totalMs": 0.0,
+                "maxMs": 0.0,
+                "lastSeen": None,
+                "explain": None,
+                "explainedAt": None
+            }
+        entry["count"] += 1
+        entry["totalMs"] += duration_ms
+        entry["maxMs"] = max(entry["maxMs"], duration_ms)
+        entry["lastSeen"] = time.time()
+
+        explained_at = entry["explainedAt"]
+        due = explained_at is None or time.time() - explained_at >= settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+        if due and key not in self._explaining:
+            self._explaining.add(key)
+            task = asyncio.create_task(self._explain(key, database, target))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _explain(self, key: str, database: str, target: Dict[str, Any]) -> None:
+        try:
+            if Database.client is None:
+                return
+            explain = await Database.client[database].command("explain", target, verbosity="executionStats")
+            entry = self._shapes.get(key)
+            if entry is not None:
+                entry["explain"] = summarize_explain(explain, get_settings().SLOW_QUERY_EXAMINED_RATIO)
+                entry["explainedAt"] = time.time()
+        except PyMongoError as e:
+            entry = self._shapes.get(key)
+            if entry is not None:
+                entry["explain"] = {"error": str(e)}
+                entry["explainedAt"] = time.time()
+        finally:
+            self._explaining.discard(key)
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Recorded shapes, the most total time first"""
+        return sorted(
+            ({**entry, "meanMs": entry["totalMs"] / entry["count"]} for entry in self._shapes.values()),
+            key=lambda entry: entry["totalMs"],
+            reverse=True
+        )
+
+    def clear(self) -> None:
+        self._shapes.clear()
+
+slow_queries = SlowQueryProfiler()
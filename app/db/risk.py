@@ -0,0 +1,119 @@
+# app/db/risk.py
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.core.constants import VALUE_RANGES, VITAL_CODES
+
+# Column order of the value matrices
+VITALS: Tuple[str, ...] = tuple(VITAL_CODES)
+
+# NEWS2 bands of each scored vital: inclusive upper bounds, and the points of
+# each band, one more than there are bounds. SpO2 uses scale 1. Supplemental
+# oxygen and consciousness are not recorded, so they never add points.
+NEWS2_BANDS: Dict[str, Tuple[Tuple[float, ...], Tuple[int, ...]]] = {
+    "respiratory_rate": ((8, 11, 20, 24), (3, 1, 0, 2, 3)),
+    "oxygen_saturation": ((91, 93, 95), (3, 2, 1, 0)),
+    "blood_pressure_systolic": ((90, 100, 110, 219), (3, 2, 1, 0, 3)),
+    "heart_rate": ((40, 50, 90, 110, 130), (3, 1, 0, 1, 2, 3)),
+    "body_temperature": ((35.0, 36.0, 38.0, 39.0), (3, 1, 0, 1, 2))
+}
+
+# Clinical risk thresholds on the aggregate score
+NEWS2_HIGH = 7
+NEWS2_MEDIUM = 5
+NEWS2_RED = 3
+
+# Codes of RiskScores.level
+RISK_LOW, RISK_LOW_MEDIUM, RISK_MEDIUM, RISK_HIGH = range(4)
+
+@dataclass
+class RiskScores:
+    """Scores of a batch of patients, one row per patient and one column per vital"""
+    patient_ids: List[str]
+    values: np.ndarray
+    below_range: np.ndarray
+    above_range: np.ndarray
+    points: np.ndarray
+    total: np.ndarray
+    level: np.ndarray
+
+async def load_latest_vitals(
+    db: AsyncIOMotorDatabase,
+    patient_ids: Sequence[str],
+    since: Optional[str] = None
+) -> np.ndarray:
+    """The latest value of every vital sign of each patient, NaN where not measured.
+
+    One aggregation walks the patient_id/effectiveDateTime index newest first,
+    keeps the first value of each code and pivots them into one row per patient.
+    since, a stored effectiveDateTime, bounds that walk to each patient's recent
+    observations instead of their whole history.
+    """
+    codes = {VITAL_CODES[name]["code"]: name for name in VITALS}
+    match = {"patient_id": {"$in": list(patient_ids)}, "search_params.code": {"$in": list(codes)}}
+    if since is not None:
+        match["effectiveDateTime"] = {"$gte": since}
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"patient_id": 1, "effectiveDateTime": -1, "_id": -1}},
+        {"$project": {"_id": 0, "patient_id": 1, "search_params.code": 1, "search_params.value": 1}},
+        {"$unwind": "$search_params"},
+        {"$match": {"search_params.code": {"$in": list(codes)}, "search_params.value": {"$ne": None}}},
+        {"$group": {
+            "_id": {"patient": "$patient_id", "code": "$search_params.code"},
+            "value": {"$first": "$search_params.value"}
+        }},
+        {"$group": {
+            "_id": "$_id.patient",
+            **{
+                name: {"$max": {"$cond": [{"$eq": ["$_id.code", code]}, "$value", None]}}
+                for code, name in codes.items()
+            }
+        }}
+    ]
+    rows = {
+        doc["_id"]: [doc.get(name) for name in VITALS]
+        async for doc in db.observations.aggregate(pipeline, allowDiskUse=True)
+    }
+    values = np.full((len(patient_ids), len(VITALS)), np.nan)
+    found = [row for row, patient_id in enumerate(patient_ids) if patient_id in rows]
+    if found:
+        # None becomes NaN in a float array
+        values[found] = np.array([rows[patient_ids[row]] for row in found], dtype=float)
+    return values
+
+def score_vitals(patient_ids: Sequence[str], values: np.ndarray) -> RiskScores:
+    """Range flags and NEWS2 points of every patient at once"""
+    low = np.array([VALUE_RANGES[name][0] for name in VITALS], dtype=float)
+    high = np.array([VALUE_RANGES[name][1] for name in VITALS], dtype=float)
+    # Comparisons with NaN are False, so unmeasured vitals are never flagged
+    below_range = values < low
+    above_range = values > high
+
+    # Unscored vitals keep -1
+    points = np.full(values.shape, -1, dtype=np.int8)
+    for name, (bounds, band_points) in NEWS2_BANDS.items():
+        column = VITALS.index(name)
+        band = np.searchsorted(np.array(bounds, dtype=float), values[:, column], side="left")
+        points[:, column] = np.where(np.isnan(values[:, column]), -1, np.array(band_points)[band])
+
+    scored = np.clip(points, 0, None)
+    total = scored.sum(axis=1)
+    level = np.select(
+        [total >= NEWS2_HIGH, total >= NEWS2_MEDIUM, (scored == NEWS2_RED).any(axis=1)],
+        [RISK_HIGH, RISK_MEDIUM, RISK_LOW_MEDIUM],
+        RISK_LOW
+    )
+    return RiskScores(list(patient_ids), values, below_range, above_range, points, total, level)
+
+async def patient_risk_scores(
+    db: AsyncIOMotorDatabase,
+    patient_ids: Sequence[str],
+    lookback_hours: Optional[float] = None
+) -> RiskScores:
+    """Scores from the vitals of the last lookback_hours, or of all time if None"""
+    # Stored timestamps are naive UTC ISO strings
+    since = (datetime.utcnow() - timedelta(hours=lookback_hours)).isoformat() if lookback_hours is not None else None
+    return score_vitals(patient_ids, await load_latest_vitals(db, patient_ids, since))
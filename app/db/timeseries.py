@@ -0,0 +1,118 @@
+# app/db/timeseries.py
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from bson.errors import InvalidDocument
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+from app.config.settings import get_settings
+from app.core.constants import VITAL_SIGNS_CATEGORY
+from app.fhir.utils.helpers import reference_id
+
+# FHIR dateTimes less precise than a day: a year, or a year and month
+PARTIAL_DATE = re.compile(r"(\d{4})(?:-(\d{2}))?")
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    """The start of a FHIR dateTime of any precision, or None if it cannot be parsed"""
+    if not isinstance(value, str) or not value:
+        return None
+    partial = PARTIAL_DATE.fullmatch(value)
+    try:
+        parsed = datetime(int(partial[1]), int(partial[2] or 1), 1) if partial else datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    # Timestamps written without an offset are UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def is_vital_signs(observation: Dict[str, Any]) -> bool:
+    return any(
+        coding.get("system") == VITAL_SIGNS_CATEGORY["system"] and coding.get("code") == VITAL_SIGNS_CATEGORY["code"]
+        for category in observation.get("category") or []
+        for coding in category.get("coding") or []
+    )
+
+def vital_points(observation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One time-series measurement per component of a vital-signs Observation"""
+    if not is_vital_signs(observation):
+        return []
+    ts = _parse_time(observation.get("effectiveDateTime"))
+    if ts is None:
+        return []
+    patient_id = reference_id(observation.get("subject", {}).get("reference"))
+    points = []
+    for component in observation.get("component", []):
+        codings = component.get("code", {}).get("coding", [])
+        quantity = component.get("valueQuantity", {})
+        if not codings or quantity.get("value") is None:
+            continue
+        points.append({
+            "ts": ts,
+            "meta": {"patient_id": patient_id, "code": codings[0].get("code")},
+            "value": quantity["value"],
+            "unit": quantity.get("unit"),
+            "observation_id": observation.get("id")
+        })
+    return points
+
+async def ensure_timeseries_collection(db: AsyncIOMotorDatabase) -> bool:
+    """Create the vitals time-series collection if it is enabled and missing"""
+    settings = get_settings()
+    if not settings.VITALS_TIMESERIES_ENABLED:
+        return False
+    name = settings.VITALS_TIMESERIES_COLLECTION
+    if name in await db.list_collection_names(filter={"name": name}):
+        return False
+    await db.create_collection(name, timeseries={
+        "timeField": "ts",
+        "metaField": "meta",
+        "granularity": "minutes"
+    })
+    await db[name].create_index([("meta.patient_id", 1), ("meta.code", 1), ("ts", 1)])
+    return True
+
+async def write_vital_points(db: AsyncIOMotorDatabase, observations: List[Dict[str, Any]]) -> None:
+    """Mirror the components of vital-signs observations into the time-series collection, if enabled.
+
+    The observations are already stored when this runs, so a failed mirror is
+    logged rather than raised; the time series is a derived copy.
+    """
+    settings = get_settings()
+    if not settings.VITALS_TIMESERIES_ENABLED:
+        return
+    points = [point for observation in observations for point in vital_points(observation)]
+    if not points:
+        return
+    try:
+        await db[settings.VITALS_TIMESERIES_COLLECTION].insert_many(points, ordered=False)
+    except (PyMongoError, InvalidDocument) as e:
+        print(f"Warning: could not mirror {len(points)} vital-sign points: {str(e)}")
+
+async def vitals_buckets(
+    db: AsyncIOMotorDatabase,
+    patient_id: str,
+    code: str,
+    start: datetime,
+    end: datetime,
+    bucket: str
+) -> List[Dict[str, Any]]:
+    """Min/max/avg of one vital for one patient per time bucket, oldest first"""
+    settings = get_settings()
+    if not settings.VITALS_TIMESERIES_ENABLED:
+        raise ValueError("Vital-sign time-series storage is disabled")
+    pipeline = [
+        {"$match": {
+            "meta.patient_id": patient_id,
+            "meta.code": code,
+            "ts": {"$gte": start, "$lt": end}
+        }},
+        {"$group": {
+            "_id": {"$dateTrunc": {"date": "$ts", "unit": bucket}},
+            "min": {"$min": "$value"},
+            "max": {"$max": "$value"},
+            "avg": {"$avg": "$value"},
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+    cursor = db[settings.VITALS_TIMESERIES_COLLECTION].aggregate(pipeline)
+    return await cursor.to_list(length=None)
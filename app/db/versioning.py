@@ -1,26 +1,114 @@
 # app/db/versioning.py
+import copy
 from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
 from bson import ObjectId
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
+from app.config.database import supports_transactions
+from app.config.settings import get_settings
+from .cache import resource_cache
+from .collections import resource_collection, history_collection
+
+# Multipliers packing major.minor.patch into one sortable integer
+MAJOR_FACTOR = 1 << 40
+MINOR_FACTOR = 1 << 20
+
+def version_key(version: str) -> int:
+    """Pack a "major.minor.patch" version into an integer that sorts numerically"""
+    try:
+        parts = [int(part) for part in version.split(".")]
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid version {version}")
+    major, minor, patch = (parts + [0, 0])[:3]
+    return major * MAJOR_FACTOR + minor * MINOR_FACTOR + patch
+
+# Fields of a history entry that describe the entry rather than the resource
+HISTORY_FIELDS = ("_id", "version", "versionKey", "delta", "depth")
+
+def _escape(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+def diff_documents(old: Dict[str, Any], new: Dict[str, Any], path: str = "") -> List[Dict[str, Any]]:
+    """JSON Patch add, remove and replace operations turning old into new.
+
+    Objects are compared member by member; arrays and scalars that differ are
+    replaced whole.
+    """
+    operations = [
+        {"op": "remove", "path": f"{path}/{_escape(key)}"}
+        for key in old if key not in new
+    ]
+    for key, value in new.items():
+        member = f"{path}/{_escape(key)}"
+        if key not in old:
+            operations.append({"op": "add", "path": member, "value": value})
+        elif isinstance(value, dict) and isinstance(old[key], dict):
+            operations.extend(diff_documents(old[key], value, member))
+        elif type(value) is not type(old[key]) or value != old[key]:
+            operations.append({"op": "replace", "path": member, "value": value})
+    return operations
+
+def apply_patch(doc: Dict[str, Any], operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply operations from diff_documents to doc in place"""
+    for operation in operations:
+        *parents, key = [_unescape(token) for token in operation["path"].split("/")[1:]]
+        target = doc
+        for parent in parents:
+            target = target[parent]
+        if operation["op"] == "remove":
+            target.pop(key, None)
+        else:
+            target[key] = operation["value"]
+    return doc
+
+def _content(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in doc.items() if key not in HISTORY_FIELDS}
+
+async def _rebuild_chain(history: AsyncIOMotorCollection, entry: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """Every version from the nearest snapshot up to a delta entry, by versionKey.
+
+    The entry holds how many deltas separate it from its snapshot, so the
+    chain is one bounded read down the (id, versionKey) index.
+    """
+    older = await history.find(
+        {"id": entry["id"], "versionKey": {"$lt": entry["versionKey"]}}
+    ).sort("versionKey", -1).limit(entry["depth"]).to_list(length=None)
+    chain = older[::-1] + [entry]
+    if len(chain) != entry["depth"] + 1 or "delta" in chain[0]:
+        raise ValueError(f"History of {entry['id']} is missing the snapshot of version {entry['version']}")
+
+    state = copy.deepcopy(_content(chain[0]))
+    versions = {chain[0]["versionKey"]: chain[0]}
+    for delta in chain[1:]:
+        apply_patch(state, delta["delta"])
+        versions[delta["versionKey"]] = {
+            **copy.deepcopy(state),
+            "_id": delta["_id"],
+            "version": delta["version"],
+            "versionKey": delta["versionKey"]
+        }
+    return versions
+
+def _with_delta_fields(projection: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    return None if projection is None else {**projection, "id": 1, "version": 1, "versionKey": 1, "delta": 1, "depth": 1}
+
+class VersionConflictError(ValueError):
+    """The resource is no longer at the version the update was based on"""
 
 class VersionManager:
     @staticmethod
-    async def create_versioned_resource(
-        db: AsyncIOMotorDatabase,
-        resource_type: str,
+    def prepare_new_resource(
         data: Dict[str, Any],
         id: str = None
-    ) -> Dict[str, Any]:
-        """Create a new versioned resource"""
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Stamp id and initial version metadata on data and build its history entry"""
         # If no ID provided, generate one
         if not id:
             id = str(ObjectId())
-            
-        # Get the collection names
-        resource_collection = db[resource_type.lower()]
-        history_collection = db[f"{resource_type.lower()}_history"]
-        
+
         # Set version 1.0.0 for new resources
         version = "1.0.0"
         
@@ -34,14 +122,29 @@ class VersionManager:
                 "profile": data.get("meta", {}).get("profile", [])
             }
         })
-        
-        # Store in both collections
-        await resource_collection.insert_one(data)
-        await history_collection.insert_one({
+        history_doc = {
             **data,
             "_id": ObjectId(),  # New _id for history
-            "version": version
-        })
+            "version": version,
+            "versionKey": version_key(version)
+        }
+        return data, history_doc
+
+    @staticmethod
+    async def create_versioned_resource(
+        db: AsyncIOMotorDatabase,
+        resource_type: str,
+        data: Dict[str, Any],
+        id: str = None
+    ) -> Dict[str, Any]:
+        """Create a new versioned resource"""
+        data, history_doc = VersionManager.prepare_new_resource(data, id)
+        
+        # Store in both collections
+        await resource_collection(db, resource_type).insert_one(data)
+        await history_collection(db, resource_type).insert_one(history_doc)
+        # A resource created under a deleted id must not be hidden by its tombstone
+        await resource_cache.invalidate(resource_type, data["id"])
         
         return data
 
@@ -51,20 +154,29 @@ class VersionManager:
         resource_type: str,
         id: str,
         data: Dict[str, Any],
-        is_major_update: bool = False
+        is_major_update: bool = False,
+        expected_version: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Update a versioned resource with semantic versioning"""
-        # Get collection names using lowercase
-        resource_collection = db[resource_type.lower()]
-        history_collection = db[f"{resource_type.lower()}_history"]
+        """Update a versioned resource with semantic versioning.
+
+        The live document is only replaced if it is still at the version that was
+        read, and expected_version lets callers make If-Match style updates.
+        """
+        # Get collections
+        live = resource_collection(db, resource_type)
+        history = history_collection(db, resource_type)
         
         # Get current resource
-        current = await resource_collection.find_one({"id": id})
+        current = await live.find_one({"id": id})
         if not current:
             raise ValueError(f"Resource {id} not found")
             
         # Parse current version
         current_version = current["meta"]["versionId"]
+        if expected_version is not None and expected_version != current_version:
+            raise VersionConflictError(
+                f"Resource {id} is at version {current_version}, expected {expected_version}"
+            )
         major, minor, patch = map(int, current_version.split("."))
         
         # Determine new version based on update type
@@ -73,14 +185,6 @@ class VersionManager:
         else:
             new_version = f"{major}.{minor + 1}.0"
 
-        # Store current version in history
-        history_doc = {
-            **current,
-            "_id": ObjectId(),  # New _id for history
-            "version": current_version
-        }
-        await history_collection.insert_one(history_doc)
-        
         # Update metadata for the new version
         new_meta = {
             "versionId": new_version,
@@ -95,51 +199,135 @@ class VersionManager:
             "id": id,
             "meta": new_meta
         }
+
+        # History holds every version, including the current one
+        history_doc = {
+            **updated_doc,
+            "_id": ObjectId(),  # New _id for history
+            "version": new_version,
+            "versionKey": version_key(new_version)
+        }
+
+        settings = get_settings()
+        if settings.HISTORY_DELTA_ENABLED:
+            # Store only what changed, unless a snapshot is due or the previous
+            # version is missing from history
+            previous = await history.find_one({"id": id, "versionKey": version_key(current_version)})
+            depth = None if previous is None else previous.get("depth", 0) + 1
+            if depth is not None and depth < settings.HISTORY_SNAPSHOT_INTERVAL:
+                try:
+                    # Diff against the version as history rebuilds it, which can differ
+                    # from the live document when only the live collection was migrated
+                    if "delta" in previous:
+                        previous = (await _rebuild_chain(history, previous))[previous["versionKey"]]
+                except ValueError:
+                    previous = None
+                if previous is not None:
+                    history_doc = {
+                        "_id": history_doc["_id"],
+                        "id": id,
+                        "version": new_version,
+                        "versionKey": history_doc["versionKey"],
+                        "depth": depth,
+                        "delta": diff_documents(_content(previous), _content(updated_doc))
+                    }
         
-        # Update the current resource
-        await resource_collection.replace_one(
-            {"_id": current["_id"]}, 
-            updated_doc
-        )
+        # Only replace the version that was read
+        version_filter = {"_id": current["_id"], "meta.versionId": current_version}
+        conflict = VersionConflictError(f"Resource {id} was modified concurrently")
+
+        try:
+            if await supports_transactions(db):
+                async def write(session):
+                    result = await live.replace_one(version_filter, updated_doc, session=session)
+                    if result.matched_count == 0:
+                        raise conflict
+                    await history.insert_one(history_doc, session=session)
+
+                async with await db.client.start_session() as session:
+                    await session.with_transaction(write)
+            else:
+                # Without transactions the replace is a single compare-and-swap, and
+                # history is only written once it succeeded
+                result = await live.replace_one(version_filter, updated_doc)
+                if result.matched_count == 0:
+                    raise conflict
+                await history.insert_one(history_doc)
+        finally:
+            # Drop the cached current version, also when the write lost a race
+            await resource_cache.invalidate(resource_type, id)
         
         return updated_doc
 
+    @staticmethod
+    async def iter_resource_history(
+        db: AsyncIOMotorDatabase,
+        resource_type: str,
+        id: str,
+        limit: Optional[int] = None,
+        before: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the versions of a resource newest first, optionally only those older than before.
+
+        Delta entries are rebuilt from their snapshot, one chain read at a time,
+        and come back whole whatever the projection.
+        """
+        history = history_collection(db, resource_type)
+        query = {"id": id}
+        if before is not None:
+            query["versionKey"] = {"$lt": version_key(before)}
+
+        # Served by the (id, versionKey) index without an in-memory sort
+        cursor = history.find(query, _with_delta_fields(projection)).sort("versionKey", -1)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        rebuilt: Dict[int, Dict[str, Any]] = {}
+        async for doc in cursor:
+            if "delta" not in doc:
+                yield doc
+                continue
+            # Older versions of the same chain were rebuilt along with a newer one
+            if doc["versionKey"] not in rebuilt:
+                rebuilt = await _rebuild_chain(history, doc)
+            yield rebuilt[doc["versionKey"]]
+
     @staticmethod
     async def get_resource_history(
         db: AsyncIOMotorDatabase,
         resource_type: str,
-        id: str
+        id: str,
+        limit: Optional[int] = None,
+        before: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None
     ) -> list:
         """Get version history of a resource"""
-        history_collection = db[f"{resource_type.lower()}_history"]
-        cursor = history_collection.find({"id": id}).sort("meta.versionId", -1)
-        history_docs = await cursor.to_list(length=None)
-        
-        # Get current version too
-        current = await db[resource_type.lower()].find_one({"id": id})
-        if current:
-            # Convert current document to history format
-            current["version"] = current["meta"]["versionId"]
-            history_docs.insert(0, current)
-            
-        return history_docs
+        return [
+            doc async for doc in VersionManager.iter_resource_history(
+                db, resource_type, id, limit=limit, before=before, projection=projection
+            )
+        ]
 
     @staticmethod
     async def get_version(
         db: AsyncIOMotorDatabase,
         resource_type: str,
         id: str,
-        version: str
+        version: str,
+        projection: Optional[Dict[str, int]] = None
     ) -> Dict[str, Any]:
         """Get a specific version of a resource"""
         # If it's the current version
         if version == "current":
-            return await db[resource_type.lower()].find_one({"id": id})
+            return await resource_collection(db, resource_type).find_one({"id": id}, projection)
             
         # Check history collection
-        history_doc = await db[f"{resource_type.lower()}_history"].find_one({
+        history = history_collection(db, resource_type)
+        history_doc = await history.find_one({
             "id": id,
-            "version": version
-        })
-        
-        return history_doc
\ No newline at end of file
+            "versionKey": version_key(version)
+        }, _with_delta_fields(projection))
+
+        if history_doc is not None and "delta" in history_doc:
+            return (await _rebuild_chain(history, history_doc))[history_doc["versionKey"]]
+        return history_doc
@@ -0,0 +1,153 @@
+# app/db/write_buffer.py
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+from app.config.settings import get_settings
+from app.core.metrics import (
+    WRITE_BUFFER_FLUSH_DOCUMENTS,
+    WRITE_BUFFER_FLUSH_SECONDS,
+    WRITE_BUFFER_QUEUE_DEPTH,
+    WRITE_BUFFER_WAIT_SECONDS
+)
+from .collections import resource_collection
+from .timeseries import write_vital_points
+
+@dataclass
+class _Pending:
+    db: AsyncIOMotorDatabase
+    doc: Dict[str, Any]
+    future: asyncio.Future
+    enqueued: float
+
+class WriteBuffer:
+    """Coalesces single-document inserts into one unordered insert_many.
+
+    A batch is written once it holds max_documents or its first document has
+    waited max_delay seconds. Every caller gets the outcome of its own
+    document: None once written, or the WriteError its document raised, or
+    the error of the whole write when it failed some other way. A caller
+    cancelled while waiting does not withdraw its document.
+    """
+
+    def __init__(self, resource_type: str, max_documents: int, max_delay: float):
+        self.resource_type = resource_type
+        self.max_documents = max_documents
+        self.max_delay = max_delay
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.documents = 0
+        self.failed = 0
+        self.size_flushes = 0
+        self.timer_flushes = 0
+        self.queue_depth = WRITE_BUFFER_QUEUE_DEPTH.labels(resource_type)
+        self.flush_documents = WRITE_BUFFER_FLUSH_DOCUMENTS.labels(resource_type)
+        self.flush_seconds = WRITE_BUFFER_FLUSH_SECONDS.labels(resource_type)
+        self.wait_seconds = WRITE_BUFFER_WAIT_SECONDS.labels(resource_type)
+
+    async def insert(self, db: AsyncIOMotorDatabase, doc: Dict[str, Any]) -> None:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(_Pending(db, doc, future, time.perf_counter()))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        self.queue_depth.set(len(self._pending))
+        if len(self._pending) >= self.max_documents:
+            self.size_flushes += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush_on_timer)
+        await future
+
+    def _flush_on_timer(self) -> None:
+        self.timer_flushes += 1
+        self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        self.queue_depth.set(0)
+        if batch:
+            task = asyncio.create_task(self._write(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        db = batch[0].db
+        docs = [pending.doc for pending in batch]
+        self.in_flight += len(batch)
+        started = time.perf_counter()
+        errors: Dict[int, Exception] = {}
+        # Set once every document's outcome is known; callers of a flush cancelled before then are cancelled too
+        settled = False
+        try:
+            try:
+                await resource_collection(db, self.resource_type).insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details["writeErrors"]:
+                    error_type = DuplicateKeyError if error.get("code") == 11000 else WriteError
+                    errors[error["index"]] = error_type(error.get("errmsg"), error.get("code"), error)
+            except Exception as e:
+                # Nothing tells which documents made it, so every caller sees the error
+                errors = dict.fromkeys(range(len(batch)), e)
+            settled = True
+
+            if self.resource_type == "Observation" and len(errors) < len(batch):
+                try:
+                    await write_vital_points(db, [doc for index, doc in enumerate(docs) if index not in errors])
+                except Exception as e:
+                    # The documents are stored; the time series is only a derived copy
+                    print(f"Warning: could not mirror buffered observations: {str(e)}")
+        finally:
+            self.in_flight -= len(batch)
+            finished = time.perf_counter()
+            self.documents += len(batch)
+            self.failed += len(errors)
+            self.flush_documents.observe(len(batch))
+            self.flush_seconds.observe(finished - started)
+            for index, pending in enumerate(batch):
+                self.wait_seconds.observe(finished - pending.enqueued)
+                if pending.future.done():
+                    continue
+                if index in errors:
+                    pending.future.set_exception(errors[index])
+                elif settled:
+                    pending.future.set_result(None)
+                else:
+                    pending.future.cancel()
+
+    async def close(self) -> None:
+        """Write whatever is buffered and wait for every flush to finish"""
+        self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "maxDocuments": self.max_documents,
+            "maxDelayMs": self.max_delay * 1000,
+            "queueDepth": len(self._pending),
+            "maxQueueDepth": self.max_queue_depth,
+            "inFlight": self.in_flight,
+            "documents": self.documents,
+            "failed": self.failed,
+            "sizeFlushes": self.size_flushes,
+            "timerFlushes": self.timer_flushes
+        }
+
+def _create_observation_buffer() -> WriteBuffer:
+    settings = get_settings()
+    return WriteBuffer(
+        "Observation",
+        settings.WRITE_BUFFER_MAX_DOCUMENTS,
+        settings.WRITE_BUFFER_MAX_DELAY_MS / 1000
+    )
+
+observation_writes = _create_observation_buffer()
@@ -1,7 +1,8 @@
 # app/fhir/types/allergy_intolerance.py
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set
 import strawberry
 from datetime import datetime
+from app.core.metrics import FHIR_CONVERSION_SECONDS
 from .base import CodeableConcept, Reference, Meta
 
 @strawberry.type
@@ -50,18 +51,23 @@ class AllergyIntolerance:
     recordedDate: str
 
     @classmethod
-    def from_mongo(cls, data: Dict) -> Optional['AllergyIntolerance']:
+    @FHIR_CONVERSION_SECONDS.labels("AllergyIntolerance").time()
+    def from_mongo(cls, data: Dict, fields: Optional[Set[str]] = None) -> Optional['AllergyIntolerance']:
+        """Build an AllergyIntolerance, limited to the top-level fields given in fields if set"""
         if not data:
             return None
-            
+
+        def selected(name: str) -> bool:
+            return fields is None or name in fields
+
         return cls(
             id=str(data.get('id')),
-            meta=Meta.from_dict(data.get('meta', {})),
-            code=CodeableConcept.from_dict(data.get('code', {})),
-            clinicalStatus=CodeableConcept.from_dict(data.get('clinicalStatus', {})),
-            verificationStatus=CodeableConcept.from_dict(data.get('verificationStatus', {})),
-            patient=Reference.from_dict(data.get('patient', {})),
+            meta=Meta.from_dict(data.get('meta', {})) if selected('meta') else None,
+            code=CodeableConcept.from_dict(data.get('code', {})) if selected('code') else None,
+            clinicalStatus=CodeableConcept.from_dict(data.get('clinicalStatus', {})) if selected('clinicalStatus') else None,
+            verificationStatus=CodeableConcept.from_dict(data.get('verificationStatus', {})) if selected('verificationStatus') else None,
+            patient=Reference.from_dict(data.get('patient', {})) if selected('patient') else None,
             criticality=data.get('criticality'),
-            reaction=[Reaction.from_dict(r) for r in data.get('reaction', [])] if data.get('reaction') else None,
+            reaction=[Reaction.from_dict(r) for r in data.get('reaction', [])] if selected('reaction') and data.get('reaction') else None,
             recordedDate=data.get('recordedDate')
         )
\ No newline at end of file
@@ -1,7 +1,49 @@
-from typing import List, Optional, Dict
+import dataclasses
+from typing import TYPE_CHECKING, Annotated, Any, List, Optional, Dict, Tuple, Union
 import strawberry
+from strawberry.types import Info
+from app.core.constants import CONSTANT_CODINGS, INTERNED_STRINGS, UCUM_SYSTEM
+from app.graphql.projection import selected_paths
 
-@strawberry.type
+def datatype(cls=None, *, frozen: bool = False):
+    """strawberry.type whose instances use __slots__ instead of a per-instance __dict__.
+
+    frozen makes instances immutable, for types whose instances are shared.
+    """
+    def wrap(cls):
+        typed = strawberry.type(cls)
+        if frozen:
+            # dataclass keeps an existing __init__, which would assign through the frozen __setattr__
+            del typed.__init__
+        slotted = dataclasses.dataclass(slots=True, kw_only=True, frozen=frozen)(typed)
+        slotted.__strawberry_definition__.origin = slotted
+        return slotted
+    return wrap if cls is None else wrap(cls)
+
+if TYPE_CHECKING:
+    from .allergy_intolerance import AllergyIntolerance
+    from .device import Device
+    from .observation import Observation
+    from .patient import Patient
+    from .practitioner import Practitioner
+
+# Resource types a Reference resolves to: the ones this server stores
+ReferencedResource = Annotated[
+    Union[
+        Annotated["Patient", strawberry.lazy("app.fhir.types.patient")],
+        Annotated["Practitioner", strawberry.lazy("app.fhir.types.practitioner")],
+        Annotated["Device", strawberry.lazy("app.fhir.types.device")],
+        Annotated["Observation", strawberry.lazy("app.fhir.types.observation")],
+        Annotated["AllergyIntolerance", strawberry.lazy("app.fhir.types.allergy_intolerance")]
+    ],
+    strawberry.union("ReferencedResource")
+]
+
+def interned(value: Any) -> Any:
+    """The shared copy of a known code system, code, display or unit string"""
+    return INTERNED_STRINGS.get(value, value)
+
+@datatype(frozen=True)
 class Coding:
     system: str
     code: str
@@ -9,13 +51,24 @@ class Coding:
 
     @classmethod
     def from_dict(cls, data: Dict) -> 'Coding':
+        key = (data.get('system'), data.get('code'), data.get('display'))
+        shared = SHARED_CODINGS.get(key)
+        if shared is not None:
+            return shared
         return cls(
-            system=data.get('system'),
-            code=data.get('code'),
-            display=data.get('display')
+            system=interned(key[0]),
+            code=interned(key[1]),
+            display=interned(key[2])
         )
 
-@strawberry.type
+# One frozen instance per constant coding, returned for every matching document
+SHARED_CODINGS: Dict[Tuple[str, str, str], Coding] = {}
+SHARED_CODINGS.update(
+    ((c["system"], c["code"], c["display"]), Coding.from_dict(c))
+    for c in CONSTANT_CODINGS
+)
+
+@datatype
 class CodeableConcept:
     coding: List[Coding]
     text: Optional[str]
@@ -27,37 +80,74 @@ class CodeableConcept:
             text=data.get('text')
         )
 
-@strawberry.type
+@datatype
 class Quantity:
     value: float
     unit: str
-    system: str = "http://unitsofmeasure.org"
+    system: str = UCUM_SYSTEM
     code: str
 
     @classmethod
     def from_dict(cls, data: Dict) -> 'Quantity':
         return cls(
             value=data.get('value'),
-            unit=data.get('unit'),
-            system=data.get('system', "http://unitsofmeasure.org"),
-            code=data.get('code')
+            unit=interned(data.get('unit')),
+            system=interned(data.get('system', UCUM_SYSTEM)),
+            code=interned(data.get('code'))
         )
 
-@strawberry.type
+@datatype
 class Reference:
     reference: str
-    type: str
+    type: str = "Patient"
 
     @classmethod
     def from_dict(cls, data: Dict) -> 'Reference':
         return cls(
             reference=data.get('reference'),
-            type=data.get('type', "Patient")
+            type=interned(data.get('type', "Patient"))
+        )
+
+    @strawberry.field
+    async def resource(self, info: Info) -> Optional[ReferencedResource]:
+        """The referenced resource, batched with every other reference of the request.
+
+        Only the fields selected on it are fetched. Null for references to
+        resource types this server does not store.
+        """
+        return await info.context["loaders"].load(self.reference, default_type=self.type, paths=selected_paths(info))
+
+@datatype
+class Identifier:
+    system: Optional[str]
+    value: str
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Identifier':
+        return cls(
+            system=interned(data.get('system')),
+            value=data.get('value')
+        )
+
+@datatype
+class HumanName:
+    use: Optional[str]
+    text: Optional[str]
+    family: Optional[str]
+    given: Optional[List[str]]
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'HumanName':
+        return cls(
+            use=interned(data.get('use')),
+            text=data.get('text'),
+            family=data.get('family'),
+            given=data.get('given')
         )
 
-@strawberry.type
+@datatype
 class Meta:
-    versionId: str
+    versionId: str = "1"
     lastUpdated: str
     source: Optional[str]
     profile: Optional[List[str]]
@@ -68,5 +158,5 @@ class Meta:
             versionId=data.get('versionId', '1'),
             lastUpdated=data.get('lastUpdated'),
             source=data.get('source'),
-            profile=data.get('profile')
+            profile=[interned(p) for p in data['profile']] if data.get('profile') else data.get('profile')
         )
@@ -0,0 +1,34 @@
+# app/fhir/types/bundle.py
+from typing import List, Optional, Dict
+import strawberry
+
+@strawberry.type
+class BundleEntryResponse:
+    status: str
+    location: Optional[str] = None
+    etag: Optional[str] = None
+    lastModified: Optional[str] = None
+    diagnostics: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BundleEntryResponse':
+        issues = (data.get('outcome') or {}).get('issue', [])
+        return cls(
+            status=data.get('status'),
+            location=data.get('location'),
+            etag=data.get('etag'),
+            lastModified=data.get('lastModified'),
+            diagnostics=issues[0].get('diagnostics') if issues else None
+        )
+
+@strawberry.type
+class BundleResponse:
+    type: str
+    entry: List[BundleEntryResponse]
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BundleResponse':
+        return cls(
+            type=data.get('type'),
+            entry=[BundleEntryResponse.from_dict(e.get('response', {})) for e in data.get('entry', [])]
+        )
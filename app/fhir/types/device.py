@@ -0,0 +1,54 @@
+# app/fhir/types/device.py
+from typing import List, Optional, Dict, Set
+import strawberry
+from app.core.metrics import FHIR_CONVERSION_SECONDS
+from .base import CodeableConcept, Identifier, Meta, Reference
+
+@strawberry.type
+class DeviceName:
+    name: str
+    type: str
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DeviceName':
+        return cls(
+            name=data.get('name'),
+            type=data.get('type')
+        )
+
+@strawberry.type
+class Device:
+    id: str
+    resourceType: str = "Device"
+    meta: Meta
+    identifier: Optional[List[Identifier]] = None
+    status: Optional[str] = None
+    manufacturer: Optional[str] = None
+    modelNumber: Optional[str] = None
+    serialNumber: Optional[str] = None
+    deviceName: Optional[List[DeviceName]] = None
+    type: Optional[CodeableConcept] = None
+    patient: Optional[Reference] = None
+
+    @classmethod
+    @FHIR_CONVERSION_SECONDS.labels("Device").time()
+    def from_mongo(cls, data: Dict, fields: Optional[Set[str]] = None) -> Optional['Device']:
+        """Build a Device, limited to the top-level fields given in fields if set"""
+        if not data:
+            return None
+
+        def selected(name: str) -> bool:
+            return fields is None or name in fields
+
+        return cls(
+            id=str(data.get('id')),
+            meta=Meta.from_dict(data.get('meta', {})) if selected('meta') else None,
+            identifier=[Identifier.from_dict(i) for i in data.get('identifier', [])] if selected('identifier') and data.get('identifier') else None,
+            status=data.get('status'),
+            manufacturer=data.get('manufacturer'),
+            modelNumber=data.get('modelNumber'),
+            serialNumber=data.get('serialNumber'),
+            deviceName=[DeviceName.from_dict(n) for n in data.get('deviceName', [])] if selected('deviceName') and data.get('deviceName') else None,
+            type=CodeableConcept.from_dict(data.get('type')) if selected('type') and data.get('type') else None,
+            patient=Reference.from_dict(data.get('patient')) if selected('patient') and data.get('patient') else None
+        )
@@ -1,8 +1,9 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Set
 import strawberry
-from .base import CodeableConcept, Quantity, Reference, Meta
+from app.core.metrics import FHIR_CONVERSION_SECONDS
+from .base import CodeableConcept, Quantity, Reference, Meta, datatype
 
-@strawberry.type
+@datatype
 class Component:
     code: CodeableConcept
     valueQuantity: Quantity
@@ -31,21 +32,26 @@ class Observation:
     device: Optional[Reference] = None
 
     @classmethod
-    def from_mongo(cls, data: Dict) -> Optional['Observation']:
+    @FHIR_CONVERSION_SECONDS.labels("Observation").time()
+    def from_mongo(cls, data: Dict, fields: Optional[Set[str]] = None) -> Optional['Observation']:
+        """Build an Observation, limited to the top-level fields given in fields if set"""
         if not data:
             return None
-            
+
+        def selected(name: str) -> bool:
+            return fields is None or name in fields
+
         return cls(
             id=str(data.get('id')),
-            meta=Meta.from_dict(data.get('meta', {})),
+            meta=Meta.from_dict(data.get('meta', {})) if selected('meta') else None,
             status=data.get('status'),
-            category=[CodeableConcept.from_dict(c) for c in data.get('category', [])],
-            code=CodeableConcept.from_dict(data.get('code', {})),
-            subject=Reference.from_dict(data.get('subject', {})),
+            category=[CodeableConcept.from_dict(c) for c in data.get('category', [])] if selected('category') else None,
+            code=CodeableConcept.from_dict(data.get('code', {})) if selected('code') else None,
+            subject=Reference.from_dict(data.get('subject', {})) if selected('subject') else None,
             effectiveDateTime=data.get('effectiveDateTime'),
-            valueQuantity=Quantity.from_dict(data.get('valueQuantity', {})) if data.get('valueQuantity') else None,
-            method=CodeableConcept.from_dict(data.get('method', {})) if data.get('method') else None,
-            component=[Component.from_dict(c) for c in data.get('component', [])] if data.get('component') else None,
-            performer=[Reference.from_dict(p) for p in data.get('performer', [])] if data.get('performer') else None,
-            device=Reference.from_dict(data.get('device')) if data.get('device') else None
+            valueQuantity=Quantity.from_dict(data.get('valueQuantity', {})) if selected('valueQuantity') and data.get('valueQuantity') else None,
+            method=CodeableConcept.from_dict(data.get('method', {})) if selected('method') and data.get('method') else None,
+            component=[Component.from_dict(c) for c in data.get('component', [])] if selected('component') and data.get('component') else None,
+            performer=[Reference.from_dict(p) for p in data.get('performer', [])] if selected('performer') and data.get('performer') else None,
+            device=Reference.from_dict(data.get('device')) if selected('device') and data.get('device') else None
         )
\ No newline at end of file
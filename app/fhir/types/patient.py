@@ -0,0 +1,36 @@
+# app/fhir/types/patient.py
+from typing import List, Optional, Dict, Set
+import strawberry
+from app.core.metrics import FHIR_CONVERSION_SECONDS
+from .base import HumanName, Identifier, Meta
+
+@strawberry.type
+class Patient:
+    id: str
+    resourceType: str = "Patient"
+    meta: Meta
+    identifier: Optional[List[Identifier]] = None
+    active: Optional[bool] = None
+    name: Optional[List[HumanName]] = None
+    gender: Optional[str] = None
+    birthDate: Optional[str] = None
+
+    @classmethod
+    @FHIR_CONVERSION_SECONDS.labels("Patient").time()
+    def from_mongo(cls, data: Dict, fields: Optional[Set[str]] = None) -> Optional['Patient']:
+        """Build a Patient, limited to the top-level fields given in fields if set"""
+        if not data:
+            return None
+
+        def selected(name: str) -> bool:
+            return fields is None or name in fields
+
+        return cls(
+            id=str(data.get('id')),
+            meta=Meta.from_dict(data.get('meta', {})) if selected('meta') else None,
+            identifier=[Identifier.from_dict(i) for i in data.get('identifier', [])] if selected('identifier') and data.get('identifier') else None,
+            active=data.get('active'),
+            name=[HumanName.from_dict(n) for n in data.get('name', [])] if selected('name') and data.get('name') else None,
+            gender=data.get('gender'),
+            birthDate=data.get('birthDate')
+        )
@@ -0,0 +1,86 @@
+# app/fhir/utils/helpers.py
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+def reference_id(reference: Optional[str]) -> Optional[str]:
+    """The id part of a "Type/id" reference"""
+    if not reference:
+        return None
+    return reference.rstrip("/").rsplit("/", 1)[-1]
+
+def observation_search_params(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One (code, value, date, patient) entry for the Observation and each of its components"""
+    patient = reference_id(doc.get("subject", {}).get("reference"))
+    date = doc.get("effectiveDateTime")
+    params = []
+    for item in [doc, *doc.get("component", [])]:
+        codings = (item.get("code") or {}).get("coding") or []
+        if not codings:
+            continue
+        params.append({
+            "code": codings[0].get("code"),
+            "value": (item.get("valueQuantity") or {}).get("value"),
+            "date": date,
+            "patient": patient
+        })
+    return params
+
+def add_search_fields(resource_type: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the flattened search fields the query resolvers filter on"""
+    if resource_type == "Observation":
+        doc["patient_id"] = reference_id(doc.get("subject", {}).get("reference"))
+        doc["date"] = (doc.get("effectiveDateTime") or "")[:10] or None
+        doc["search_params"] = observation_search_params(doc)
+    return doc
+
+# Storage and search fields that are not part of the FHIR resource
+INTERNAL_FIELDS = ("_id", "patient_id", "date", "search_params", "version", "versionKey")
+
+# dateTime elements stored, like meta.lastUpdated, as naive UTC ISO strings
+STORED_DATETIME_FIELDS = ("effectiveDateTime", "recordedDate")
+
+def to_stored_datetime(value: str) -> str:
+    """A FHIR dateTime with a time part as the naive UTC ISO string the server stores"""
+    if not isinstance(value, str) or "T" not in value:
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"Invalid dateTime {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+def to_fhir_datetime(value: Any) -> Any:
+    """A stored naive UTC timestamp with the offset FHIR requires"""
+    if isinstance(value, str) and "T" in value and not value.endswith("Z") and "+" not in value:
+        return value + "Z"
+    return value
+
+def normalize_datetimes(resource: Dict[str, Any]) -> Dict[str, Any]:
+    """Store the dateTime elements of an incoming resource the way the mutations do"""
+    for key in STORED_DATETIME_FIELDS:
+        if key in resource:
+            resource[key] = to_stored_datetime(resource[key])
+    return resource
+
+def to_fhir_resource(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The stored document without its internal fields and with valid FHIR timestamps"""
+    resource = {key: value for key, value in doc.items() if key not in INTERNAL_FIELDS}
+    for key in STORED_DATETIME_FIELDS:
+        if key in resource:
+            resource[key] = to_fhir_datetime(resource[key])
+    if isinstance(resource.get("meta"), dict) and "lastUpdated" in resource["meta"]:
+        resource["meta"] = {**resource["meta"], "lastUpdated": to_fhir_datetime(resource["meta"]["lastUpdated"])}
+    return resource
+
+def operation_outcome(diagnostics: str, code: str = "invalid") -> Dict[str, Any]:
+    """A single-issue OperationOutcome resource"""
+    return {
+        "resourceType": "OperationOutcome",
+        "issue": [{
+            "severity": "error",
+            "code": code,
+            "diagnostics": diagnostics
+        }]
+    }
@@ -0,0 +1,9 @@
+# app/graphql/context.py
+from typing import Any, Dict
+from .loaders import ReferenceLoaders
+
+async def get_context() -> Dict[str, Any]:
+    """Build the per-request GraphQL context"""
+    return {
+        "loaders": ReferenceLoaders()
+    }
@@ -0,0 +1,240 @@
+# app/graphql/extensions/cost.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLSchema,
+    InlineFragmentNode,
+    OperationDefinitionNode,
+    SelectionSetNode,
+    get_named_type,
+    value_from_ast_untyped
+)
+from starlette.requests import Request
+from strawberry.extensions import SchemaExtension
+from app.config.settings import get_settings
+
+# Token buckets kept for at most this many clients
+MAX_TRACKED_CLIENTS = 10000
+
+@dataclass
+class CostEstimate:
+    cost: int = 0
+    depth: int = 0
+    aliases: int = 0
+
+class CostEstimator:
+    """Static cost of an operation: every field costs 1, times the size of the lists around it.
+
+    Fields with a first argument multiply their children by its value, or by the
+    default page size when it is omitted. Other list fields multiply by
+    default_list_size, except connection edges which first already sized.
+    """
+
+    def __init__(self, schema: GraphQLSchema, document: DocumentNode, variables: Optional[Dict[str, Any]]):
+        settings = get_settings()
+        self.schema = schema
+        self.variables = variables or {}
+        self.page_size = settings.DEFAULT_PAGE_SIZE
+        self.max_page_size = settings.MAX_PAGE_SIZE
+        self.default_list_size = settings.GRAPHQL_DEFAULT_LIST_SIZE
+        self.fragments = {
+            definition.name.value: definition
+            for definition in document.definitions if isinstance(definition, FragmentDefinitionNode)
+        }
+        self.operations = [
+            definition
+            for definition in document.definitions if isinstance(definition, OperationDefinitionNode)
+        ]
+
+    def estimate(self, operation_name: Optional[str]) -> CostEstimate:
+        operation = next(
+            (op for op in self.operations if operation_name is None or (op.name and op.name.value == operation_name)),
+            None
+        )
+        estimate = CostEstimate()
+        if operation is None:
+            return estimate
+        root_type = self.schema.get_root_type(operation.operation)
+        self._selection_set(operation.selection_set, root_type, 1, 1, estimate)
+        return estimate
+
+    def _list_size(self, node: FieldNode, field_def: Any) -> int:
+        if "first" in field_def.args:
+            size = self.page_size
+            for argument in node.arguments or ():
+                if argument.name.value == "first":
+                    value = value_from_ast_untyped(argument.value, self.variables)
+                    if isinstance(value, int):
+                        size = value
+            # Resolvers reject first below 1, but a negative multiplier must never lower the cost
+            return max(1, min(size, self.max_page_size))
+        field_type = field_def.type
+        while isinstance(field_type, GraphQLNonNull):
+            field_type = field_type.of_type
+        if isinstance(field_type, GraphQLList) and node.name.value != "edges":
+            return self.default_list_size
+        return 1
+
+    def _selection_set(
+        self,
+        selection_set: SelectionSetNode,
+        parent_type: Any,
+        multiplier: int,
+        depth: int,
+        estimate: CostEstimate
+    ) -> None:
+        estimate.depth = max(estimate.depth, depth)
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpreadNode):
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is not None:
+                    fragment_type = self.schema.get_type(fragment.type_condition.name.value)
+                    self._selection_set(fragment.selection_set, fragment_type, multiplier, depth, estimate)
+                continue
+            if isinstance(selection, InlineFragmentNode):
+                fragment_type = (
+                    self.schema.get_type(selection.type_condition.name.value)
+                    if selection.type_condition else parent_type
+                )
+                self._selection_set(selection.selection_set, fragment_type, multiplier, depth, estimate)
+                continue
+
+            name = selection.name.value
+            if name.startswith("__"):
+                continue
+            if selection.alias:
+                estimate.aliases += 1
+            field_def = getattr(parent_type, "fields", {}).get(name)
+            if field_def is None:
+                continue
+            estimate.cost += multiplier
+            if selection.selection_set:
+                self._selection_set(
+                    selection.selection_set,
+                    get_named_type(field_def.type),
+                    multiplier * self._list_size(selection, field_def),
+                    depth + 1,
+                    estimate
+                )
+
+class CostBudgets:
+    """Per-client token buckets refilled continuously up to the per-minute budget"""
+
+    def __init__(self):
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _refill(self, client: str, budget: int) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (float(budget), now))
+        tokens = min(float(budget), tokens + (now - updated) * budget / 60)
+        self._buckets[client] = (tokens, now)
+        self._buckets.move_to_end(client)
+        while len(self._buckets) > MAX_TRACKED_CLIENTS:
+            self._buckets.popitem(last=False)
+        return tokens
+
+    def remaining(self, client: str) -> int:
+        return int(self._refill(client, get_settings().GRAPHQL_COST_BUDGET_PER_MINUTE))
+
+    def charge(self, client: str, cost: int) -> None:
+        tokens = self._refill(client, get_settings().GRAPHQL_COST_BUDGET_PER_MINUTE)
+        self._buckets[client] = (tokens - cost, time.monotonic())
+
+cost_budgets = CostBudgets()
+
+def resolved_fields(data: Any) -> int:
+    """Fields in a response's data, each list item counted, the way the estimate counts them"""
+    if isinstance(data, dict):
+        return sum(1 + resolved_fields(value) for name, value in data.items() if not name.startswith("__"))
+    if isinstance(data, list):
+        return sum(resolved_fields(item) for item in data)
+    return 0
+
+def client_id(request: Optional[Request]) -> str:
+    """Budget key of a request: the x-client-id header, else the peer address"""
+    if request is None:
+        return "anonymous"
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "anonymous")
+
+def admit(client: str, estimate: CostEstimate) -> None:
+    """Raise a GraphQLError if the operation breaks a limit, else charge its cost to client"""
+    settings = get_settings()
+    if estimate.depth > settings.GRAPHQL_MAX_DEPTH:
+        raise GraphQLError(
+            f"Query depth {estimate.depth} exceeds the maximum of {settings.GRAPHQL_MAX_DEPTH}",
+            extensions={"code": "QUERY_TOO_DEEP"}
+        )
+    if estimate.aliases > settings.GRAPHQL_MAX_ALIASES:
+        raise GraphQLError(
+            f"Query uses {estimate.aliases} aliases, the maximum is {settings.GRAPHQL_MAX_ALIASES}",
+            extensions={"code": "TOO_MANY_ALIASES"}
+        )
+    if estimate.cost > settings.GRAPHQL_MAX_QUERY_COST:
+        raise GraphQLError(
+            f"Query cost {estimate.cost} exceeds the maximum of {settings.GRAPHQL_MAX_QUERY_COST}",
+            extensions={"code": "QUERY_TOO_COSTLY"}
+        )
+    remaining = cost_budgets.remaining(client)
+    if estimate.cost > remaining:
+        raise GraphQLError(
+            f"Query cost {estimate.cost} exceeds the remaining budget of {remaining}, retry later",
+            extensions={"code": "COST_BUDGET_EXCEEDED"}
+        )
+    cost_budgets.charge(client, estimate.cost)
+
+class QueryCostLimiter(SchemaExtension):
+    """Reject operations that are too deep, too aliased or too costly before they execute.
+
+    The estimate is charged against the client's budget up front and corrected
+    to the number of fields in the response afterwards, which are counted once
+    execution is done rather than in a hook around every resolver. Both, and
+    the budget left, are returned in the cost response extension.
+    """
+
+    def __init__(self, *, execution_context=None):
+        self.estimate: Optional[CostEstimate] = None
+        self.actual = 0
+        self.client = "anonymous"
+
+    def on_validate(self):
+        yield
+        context = self.execution_context
+        if context.pre_execution_errors or context.graphql_document is None:
+            return
+        request = context.context.get("request") if isinstance(context.context, dict) else None
+        self.client = client_id(request)
+        self.estimate = CostEstimator(
+            context.schema._schema, context.graphql_document, context.variables
+        ).estimate(context.operation_name)
+        admit(self.client, self.estimate)
+
+    def on_execute(self):
+        yield
+        if self.estimate is not None:
+            self.actual = resolved_fields(getattr(self.execution_context.result, "data", None))
+            # Refund the part of the estimate that was not used
+            cost_budgets.charge(self.client, self.actual - self.estimate.cost)
+
+    def get_results(self) -> Dict[str, Any]:
+        if self.estimate is None:
+            return {}
+        return {
+            "cost": {
+                "estimated": self.estimate.cost,
+                "actual": self.actual,
+                "depth": self.estimate.depth,
+                "aliases": self.estimate.aliases,
+                "maxQueryCost": get_settings().GRAPHQL_MAX_QUERY_COST,
+                "budget": get_settings().GRAPHQL_COST_BUDGET_PER_MINUTE,
+                "remaining": cost_budgets.remaining(self.client)
+            }
+        }
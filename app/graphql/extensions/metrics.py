@@ -0,0 +1,66 @@
+# app/graphql/extensions/metrics.py
+import time
+from inspect import isawaitable
+from strawberry.extensions import SchemaExtension
+from strawberry.extensions.tracing.utils import should_skip_tracing
+from app.core.metrics import (
+    GRAPHQL_OPERATION_SECONDS,
+    GRAPHQL_PHASE_SECONDS,
+    GRAPHQL_RESOLVER_ERRORS,
+    GRAPHQL_RESOLVER_SECONDS
+)
+
+class MetricsExtension(SchemaExtension):
+    """Prometheus timings of each operation phase and of every field with its own resolver.
+
+    Fields read straight off their parent object are skipped, as the
+    OpenTelemetry extension does, so the overhead stays per resolver call.
+    """
+
+    def on_operation(self):
+        started = time.perf_counter()
+        yield
+        context = self.execution_context
+        operation_type = context.operation_type.value if context.graphql_document is not None else "unknown"
+        result = context.result
+        status = "error" if context.pre_execution_errors or (result is not None and result.errors) else "ok"
+        GRAPHQL_OPERATION_SECONDS.labels(operation_type, status).observe(time.perf_counter() - started)
+
+    def on_parse(self):
+        started = time.perf_counter()
+        yield
+        GRAPHQL_PHASE_SECONDS.labels("parse").observe(time.perf_counter() - started)
+
+    def on_validate(self):
+        started = time.perf_counter()
+        yield
+        GRAPHQL_PHASE_SECONDS.labels("validate").observe(time.perf_counter() - started)
+
+    def on_execute(self):
+        started = time.perf_counter()
+        yield
+        GRAPHQL_PHASE_SECONDS.labels("execute").observe(time.perf_counter() - started)
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        if should_skip_tracing(_next, info):
+            return _next(root, info, *args, **kwargs)
+        field = f"{info.parent_type.name}.{info.field_name}"
+        started = time.perf_counter()
+        try:
+            result = _next(root, info, *args, **kwargs)
+        except Exception:
+            GRAPHQL_RESOLVER_ERRORS.labels(field).inc()
+            raise
+        if isawaitable(result):
+            return self._observe(result, field, started)
+        GRAPHQL_RESOLVER_SECONDS.labels(field).observe(time.perf_counter() - started)
+        return result
+
+    async def _observe(self, result, field: str, started: float):
+        try:
+            return await result
+        except Exception:
+            GRAPHQL_RESOLVER_ERRORS.labels(field).inc()
+            raise
+        finally:
+            GRAPHQL_RESOLVER_SECONDS.labels(field).observe(time.perf_counter() - started)
@@ -0,0 +1,118 @@
+# app/graphql/extensions/persisted_queries.py
+import hashlib
+import json
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Optional
+from graphql import DocumentNode, GraphQLError
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from strawberry.extensions import SchemaExtension
+from app.config.database import get_database
+from app.config.settings import get_settings
+
+class DocumentCache:
+    """LRU of parsed documents that passed validation, keyed by query hash"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._documents: "OrderedDict[str, DocumentNode]" = OrderedDict()
+
+    def get(self, query_hash: str) -> Optional[DocumentNode]:
+        document = self._documents.get(query_hash)
+        if document is not None:
+            self._documents.move_to_end(query_hash)
+        return document
+
+    def put(self, query_hash: str, document: DocumentNode) -> None:
+        self._documents[query_hash] = document
+        self._documents.move_to_end(query_hash)
+        while len(self._documents) > self.max_entries:
+            self._documents.popitem(last=False)
+
+document_cache = DocumentCache(get_settings().GRAPHQL_DOCUMENT_CACHE_SIZE)
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+async def find_persisted_query(db: AsyncIOMotorDatabase, sha256: str) -> Optional[str]:
+    doc = await db.persisted_queries.find_one({"_id": sha256})
+    return doc["query"] if doc else None
+
+async def register_persisted_query(db: AsyncIOMotorDatabase, sha256: str, query: str) -> None:
+    await db.persisted_queries.update_one(
+        {"_id": sha256},
+        {"$setOnInsert": {"query": query}},
+        upsert=True
+    )
+
+async def load_persisted_queries_manifest(db: AsyncIOMotorDatabase) -> int:
+    """Register the queries of the configured manifest, a JSON object of sha256 to query"""
+    path = get_settings().GRAPHQL_PERSISTED_QUERIES_MANIFEST
+    if not path:
+        return 0
+    with open(path) as f:
+        manifest: Dict[str, str] = json.load(f)
+    for sha256, query in manifest.items():
+        if query_hash(query) != sha256:
+            raise ValueError(f"Manifest hash {sha256} does not match its query")
+        await register_persisted_query(db, sha256, query)
+    return len(manifest)
+
+class PersistedQueries(SchemaExtension):
+    """Automatic persisted queries, allow-listing and a parsed document cache.
+
+    Clients send extensions.persistedQuery.sha256Hash and may leave out the
+    query once the server knows it. Unknown hashes get PersistedQueryNotFound,
+    and the client retries with the full query to register it. With
+    GRAPHQL_ALLOWLIST_ENABLED, only queries already in the store are executed.
+    """
+
+    query_hash: Optional[str] = None
+    cached: bool = False
+
+    async def on_operation(self) -> AsyncIterator[None]:
+        context = self.execution_context
+        settings = get_settings()
+        persisted = (context.operation_extensions or {}).get("persistedQuery") or {}
+        sha256 = persisted.get("sha256Hash")
+
+        if context.query:
+            computed = query_hash(context.query)
+            if sha256 and sha256 != computed:
+                raise GraphQLError(
+                    "provided sha does not match query",
+                    extensions={"code": "PERSISTED_QUERY_HASH_MISMATCH"}
+                )
+            sha256 = computed
+            if document_cache.get(sha256) is None:
+                db = await get_database()
+                if settings.GRAPHQL_ALLOWLIST_ENABLED:
+                    if await find_persisted_query(db, sha256) is None:
+                        raise GraphQLError(
+                            "Query is not on the allow-list",
+                            extensions={"code": "QUERY_NOT_ALLOWED"}
+                        )
+                elif persisted:
+                    await register_persisted_query(db, sha256, context.query)
+        elif sha256 and document_cache.get(sha256) is None:
+            context.query = await find_persisted_query(await get_database(), sha256)
+            if context.query is None:
+                raise GraphQLError(
+                    "PersistedQueryNotFound",
+                    extensions={"code": "PERSISTED_QUERY_NOT_FOUND"}
+                )
+
+        if sha256:
+            document = document_cache.get(sha256)
+            if document is not None:
+                # Skips both parsing and validation
+                context.graphql_document = document
+                context.pre_execution_errors = []
+                self.cached = True
+            self.query_hash = sha256
+        yield
+
+    def on_validate(self):
+        yield
+        context = self.execution_context
+        if self.query_hash and not self.cached and not context.pre_execution_errors:
+            document_cache.put(self.query_hash, context.graphql_document)
@@ -0,0 +1,31 @@
+# app/graphql/extensions/profiler.py
+from inspect import isawaitable
+from strawberry.extensions import SchemaExtension
+from app.db.profiler import current_resolver
+
+class QueryProfiler(SchemaExtension):
+    """Tag the MongoDB commands of each query resolver with its field name.
+
+    The command listener only hands tagged commands to the slow-query
+    profiler, so mutations, subscriptions and startup work are left out.
+    """
+
+    def resolve(self, _next, root, info, *args, **kwargs):
+        if info.parent_type.name != "Query":
+            return _next(root, info, *args, **kwargs)
+        token = current_resolver.set(info.field_name)
+        try:
+            result = _next(root, info, *args, **kwargs)
+        finally:
+            current_resolver.reset(token)
+        if isawaitable(result):
+            return self._tagged(result, info.field_name)
+        return result
+
+    async def _tagged(self, result, field_name: str):
+        # The resolver body runs when awaited, so tag it again here
+        token = current_resolver.set(field_name)
+        try:
+            return await result
+        finally:
+            current_resolver.reset(token)
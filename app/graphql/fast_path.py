@@ -0,0 +1,391 @@
+# app/graphql/fast_path.py
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import bson
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from graphql import (
+    DocumentNode,
+    FieldNode,
+    GraphQLError,
+    GraphQLList,
+    GraphQLNonNull,
+    GraphQLObjectType,
+    OperationDefinitionNode,
+    OperationType,
+    SelectionSetNode,
+    get_named_type
+)
+from graphql.execution.values import get_argument_values, get_variable_values
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from strawberry import Schema
+from app.config.database import get_read_database
+from app.config.settings import get_settings
+from app.core.metrics import GRAPHQL_OPERATION_SECONDS, GRAPHQL_PHASE_SECONDS, GRAPHQL_RESOLVER_SECONDS
+from app.db.profiler import current_resolver
+from app.graphql.extensions.cost import CostEstimator, admit, client_id, cost_budgets
+from app.graphql.extensions.persisted_queries import document_cache, query_hash
+from app.graphql.pagination import encode_cursor, page_query, page_size
+from app.graphql.queries.allergy_intolerance import allergy_search_query
+from app.graphql.queries.observation import observation_search_query
+
+RAW_BSON = CodecOptions(document_class=RawBSONDocument)
+
+# Edges encoded per chunk of the streamed response
+EDGES_PER_CHUNK = 100
+
+@dataclass(frozen=True)
+class FastPathField:
+    collection: str
+    sort_key: str
+    build_query: Callable[..., Dict[str, Any]]
+
+FAST_PATH_FIELDS = {
+    "searchObservations": FastPathField("observations", "effectiveDateTime", observation_search_query),
+    "searchAllergies": FastPathField("allergyintolerance", "recordedDate", allergy_search_query)
+}
+
+@dataclass
+class FastPathPlan:
+    field_name: str
+    field: FastPathField
+    query: Dict[str, Any]
+    limit: int
+    after: Optional[str]
+    # Connection fields in selection order, with the edge and pageInfo fields below them
+    selection: List[Tuple[str, List[str]]]
+    node: Optional[Dict[str, Any]]
+
+def _literal(value: Any) -> Any:
+    return {"$literal": value} if isinstance(value, str) else value
+
+class _Ineligible(Exception):
+    pass
+
+def _plain_fields(selection_set: Optional[SelectionSetNode]) -> List[FieldNode]:
+    """The fields of a selection set without aliases, fragments or directives"""
+    if selection_set is None:
+        raise _Ineligible()
+    fields = []
+    for selection in selection_set.selections:
+        if not isinstance(selection, FieldNode) or selection.alias or selection.directives:
+            raise _Ineligible()
+        if selection.name.value.startswith("__"):
+            raise _Ineligible()
+        fields.append(selection)
+    return fields
+
+def _node_expression(
+    schema: Schema,
+    selection_set: SelectionSetNode,
+    parent: GraphQLObjectType,
+    base: str,
+    depth: int
+) -> Dict[str, Any]:
+    """Aggregation expression shaping the document at base into the selected fields"""
+    definition = parent.extensions["strawberry-definition"]
+    get_graphql_name = schema.config.name_converter.get_graphql_name
+    shape = {}
+    for node in _plain_fields(selection_set):
+        name = node.name.value
+        field_def = parent.fields[name]
+        strawberry_field = next(
+            (f for f in definition.fields if get_graphql_name(f) == name), None
+        )
+        if strawberry_field is None or strawberry_field.base_resolver is not None:
+            # Computed fields such as Reference.resource need the resolvers
+            raise _Ineligible()
+        path = f"{base}{strawberry_field.python_name}"
+
+        field_type = field_def.type
+        required = isinstance(field_type, GraphQLNonNull)
+        if required:
+            field_type = field_type.of_type
+        named = get_named_type(field_type)
+
+        if not isinstance(named, GraphQLObjectType):
+            # The types declare the values from_dict fills in for missing fields
+            default = strawberry_field.default
+            if not isinstance(default, (str, int, float, bool)):
+                default = None
+            value = {"$toDouble": path} if named.name == "Float" else path
+            shape[name] = {"$ifNull": [value, _literal(default)]}
+        elif isinstance(field_type, GraphQLList):
+            variable = f"v{depth}"
+            items = {"$map": {
+                "input": {"$ifNull": [path, []]},
+                "as": variable,
+                "in": _node_expression(schema, node.selection_set, named, f"$${variable}.", depth + 1)
+            }}
+            if required:
+                shape[name] = items
+            else:
+                # from_mongo leaves missing and empty optional lists as null
+                shape[name] = {"$cond": [{"$gt": [{"$size": {"$ifNull": [path, []]}}, 0]}, items, None]}
+        else:
+            variable = f"v{depth}"
+            nested = {"$let": {
+                "vars": {variable: {"$ifNull": [path, {}]}},
+                "in": _node_expression(schema, node.selection_set, named, f"$${variable}.", depth + 1)
+            }}
+            if required:
+                shape[name] = nested
+            else:
+                # from_mongo leaves missing and empty optional objects as null, where
+                # $cond alone would take {} as true
+                present = {"$gt": [{"$size": {"$objectToArray": {"$ifNull": [path, {}]}}}, 0]}
+                shape[name] = {"$cond": [present, nested, None]}
+    return shape
+
+def plan_operation(
+    schema: Schema,
+    document: DocumentNode,
+    operation_name: Optional[str],
+    variables: Optional[Dict[str, Any]]
+) -> Optional[FastPathPlan]:
+    """A plan for operations that read one search connection with plain selections, else None"""
+    graphql_schema = schema._schema
+    operations = [d for d in document.definitions if isinstance(d, OperationDefinitionNode)]
+    if len(document.definitions) != len(operations):
+        return None
+    operation = next(
+        (op for op in operations if operation_name is None or (op.name and op.name.value == operation_name)),
+        None
+    )
+    if operation is None or operation.operation != OperationType.QUERY or operation.directives:
+        return None
+    if operation_name is None and len(operations) > 1:
+        return None
+
+    try:
+        roots = _plain_fields(operation.selection_set)
+        if len(roots) != 1 or roots[0].name.value not in FAST_PATH_FIELDS:
+            return None
+        root = roots[0]
+        field_def = graphql_schema.query_type.fields[root.name.value]
+        names = {
+            schema.config.name_converter.from_argument(argument): argument.python_name
+            for argument in field_def.extensions["strawberry-definition"].arguments
+        }
+        variable_values = get_variable_values(graphql_schema, operation.variable_definitions or (), variables or {})
+        if isinstance(variable_values, list):
+            return None
+        arguments = {
+            names[name]: value
+            for name, value in get_argument_values(field_def, root, variable_values).items()
+        }
+
+        connection = get_named_type(field_def.type)
+        selection = []
+        node = None
+        for field in _plain_fields(root.selection_set):
+            name = field.name.value
+            if name == "totalCount":
+                selection.append((name, []))
+            elif name == "pageInfo":
+                selection.append((name, [f.name.value for f in _plain_fields(field.selection_set)]))
+            elif name == "edges":
+                children = []
+                edge = get_named_type(connection.fields["edges"].type)
+                for child in _plain_fields(field.selection_set):
+                    children.append(child.name.value)
+                    if child.name.value == "node":
+                        node = _node_expression(
+                            schema, child.selection_set, get_named_type(edge.fields["node"].type), "$", 0
+                        )
+                selection.append((name, children))
+            else:
+                return None
+    except (_Ineligible, GraphQLError, KeyError):
+        return None
+
+    fast_path_field = FAST_PATH_FIELDS[root.name.value]
+    first = arguments.pop("first", None)
+    after = arguments.pop("after", None)
+    try:
+        limit = page_size(first)
+    except ValueError:
+        return None
+    return FastPathPlan(
+        field_name=root.name.value,
+        field=fast_path_field,
+        query=fast_path_field.build_query(**arguments),
+        limit=limit,
+        after=after,
+        selection=selection,
+        node=node
+    )
+
+async def fetch_page(db: AsyncIOMotorDatabase, plan: FastPathPlan) -> Tuple[List[RawBSONDocument], bool, Optional[int]]:
+    """The raw page documents, whether another page follows and the total if selected"""
+    collection = db[plan.field.collection]
+    sort_key = plan.field.sort_key
+    project = {"_id": 1, "sort": {"$ifNull": [f"${sort_key}", None]}}
+    if plan.node is not None:
+        project["node"] = plan.node
+    pipeline = [
+        {"$match": page_query(plan.query, sort_key, plan.after)},
+        {"$sort": {sort_key: -1, "_id": -1}},
+        {"$limit": plan.limit + 1},
+        {"$project": project}
+    ]
+    raw = collection.with_options(codec_options=RAW_BSON)
+    docs = await raw.aggregate(pipeline).to_list(length=plan.limit + 1)
+    total = None
+    if any(name == "totalCount" for name, _ in plan.selection):
+        total = await collection.count_documents(plan.query)
+    return docs[:plan.limit], len(docs) > plan.limit, total
+
+def _edge(doc: RawBSONDocument, fields: List[str]) -> Dict[str, Any]:
+    decoded = bson.decode(doc.raw)
+    edge = {}
+    for name in fields:
+        if name == "cursor":
+            edge[name] = encode_cursor(decoded["sort"], decoded["_id"])
+        else:
+            edge[name] = decoded.get("node")
+    return edge
+
+async def stream_response(
+    plan: FastPathPlan,
+    docs: List[RawBSONDocument],
+    has_next_page: bool,
+    total: Optional[int]
+) -> AsyncIterator[bytes]:
+    """The JSON response, encoded one chunk of edges at a time"""
+    yield f'{{"data":{{"{plan.field_name}":{{'.encode()
+    for index, (name, fields) in enumerate(plan.selection):
+        prefix = "," if index else ""
+        if name == "totalCount":
+            yield f'{prefix}"totalCount":{json.dumps(total)}'.encode()
+        elif name == "pageInfo":
+            values = {
+                "hasNextPage": has_next_page,
+                "endCursor": _edge(docs[-1], ["cursor"])["cursor"] if docs else None
+            }
+            yield f'{prefix}"pageInfo":{json.dumps({f: values[f] for f in fields})}'.encode()
+        else:
+            yield f'{prefix}"edges":['.encode()
+            for start in range(0, len(docs), EDGES_PER_CHUNK):
+                chunk = ",".join(
+                    json.dumps(_edge(doc, fields), default=str)
+                    for doc in docs[start:start + EDGES_PER_CHUNK]
+                )
+                yield (("," if start else "") + chunk).encode()
+            yield b"]"
+    yield b"}}}"
+
+async def _timed(chunks: AsyncIterator[bytes], started: float, executed: float) -> AsyncIterator[bytes]:
+    """chunks, recording the metrics MetricsExtension records once the last one is sent"""
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        finished = time.perf_counter()
+        GRAPHQL_PHASE_SECONDS.labels("execute").observe(finished - executed)
+        GRAPHQL_OPERATION_SECONDS.labels("query", "ok").observe(finished - started)
+
+class GraphQLFastPath:
+    """ASGI middleware answering simple search queries straight from raw BSON.
+
+    Only documents already parsed and validated by the regular endpoint, and
+    so held in the document cache, are considered. Every other request, and
+    any request the plan cannot serve, goes on to the GraphQL router. Answered
+    requests are recorded in the same operation and resolver metrics as
+    MetricsExtension records for the router.
+    """
+
+    def __init__(self, app: ASGIApp, schema: Schema, path: str = "/graphql"):
+        self.app = app
+        self.schema = schema
+        self.path = path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"].rstrip("/") != self.path
+            or not get_settings().GRAPHQL_FAST_PATH_ENABLED
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+        body = await request.body()
+        response = None
+        if request.headers.get("content-type", "").startswith("application/json"):
+            response = await self._respond(request, body)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+        replayed = False
+
+        async def replay() -> Dict[str, Any]:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay, send)
+
+    async def _respond(self, request: Request, body: bytes) -> Optional[StreamingResponse]:
+        started = time.perf_counter()
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        if not isinstance(payload, dict):
+            return None
+        query = payload.get("query")
+        operation_name = payload.get("operationName")
+        variables = payload.get("variables")
+        extensions = payload.get("extensions") or {}
+        # Malformed requests are left to the regular endpoint to report
+        if (
+            not isinstance(query, (str, type(None)))
+            or not isinstance(operation_name, (str, type(None)))
+            or not isinstance(variables, (dict, type(None)))
+            or not isinstance(extensions, dict)
+        ):
+            return None
+        persisted = extensions.get("persistedQuery") or {}
+        sha256 = query_hash(query) if query else (persisted.get("sha256Hash") if isinstance(persisted, dict) else None)
+        document = document_cache.get(sha256) if isinstance(sha256, str) else None
+        if document is None:
+            return None
+
+        plan = plan_operation(self.schema, document, operation_name, variables)
+        if plan is None:
+            return None
+        client = client_id(request)
+        estimate = CostEstimator(self.schema._schema, document, variables).estimate(operation_name)
+        try:
+            admit(client, estimate)
+        except GraphQLError:
+            # The regular endpoint reports the error
+            return None
+
+        # Profiled and timed like the resolver it stands in for
+        token = current_resolver.set(plan.field_name)
+        executed = time.perf_counter()
+        try:
+            docs, has_next_page, total = await fetch_page(await get_read_database(), plan)
+        except (PyMongoError, ValueError):
+            # The regular endpoint charges the request again when it runs it
+            cost_budgets.charge(client, -estimate.cost)
+            return None
+        finally:
+            current_resolver.reset(token)
+        GRAPHQL_RESOLVER_SECONDS.labels(f"Query.{plan.field_name}").observe(time.perf_counter() - executed)
+        return StreamingResponse(
+            _timed(stream_response(plan, docs, has_next_page, total), started, executed),
+            media_type="application/json"
+        )
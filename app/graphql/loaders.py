@@ -0,0 +1,67 @@
+# app/graphql/loaders.py
+from functools import partial
+from typing import Any, Dict, List, Optional, Set, Tuple
+from strawberry.dataloader import DataLoader
+from app.config.database import get_database
+from app.db.collections import resource_collection
+from app.fhir.types.allergy_intolerance import AllergyIntolerance
+from app.fhir.types.device import Device
+from app.fhir.types.observation import Observation
+from app.fhir.types.patient import Patient
+from app.fhir.types.practitioner import Practitioner
+from .projection import to_projection, top_level_fields
+
+# GraphQL type of each resource type this server stores; references to other types resolve to null
+REFERENCE_TYPES = {
+    "Patient": Patient,
+    "Practitioner": Practitioner,
+    "Device": Device,
+    "Observation": Observation,
+    "AllergyIntolerance": AllergyIntolerance
+}
+
+async def load_resources(
+    resource_type: str,
+    paths: Optional[Tuple[str, ...]],
+    ids: List[str]
+) -> List[Optional[Any]]:
+    """Fetch every requested resource of one type with a single $in query, only the selected paths if given"""
+    db = await get_database()
+    projection = {"_id": 0} if paths is None else {**to_projection(set(paths)), "_id": 0}
+    fields = None if paths is None else top_level_fields(set(paths))
+    cursor = resource_collection(db, resource_type).find({"id": {"$in": ids}}, projection)
+    by_id = {doc["id"]: doc async for doc in cursor}
+    return [REFERENCE_TYPES[resource_type].from_mongo(by_id.get(id), fields) for id in ids]
+
+class ReferenceLoaders:
+    """Per-request DataLoaders batching Reference lookups by resource type and selection"""
+
+    def __init__(self):
+        self._loaders: Dict[Tuple[str, Optional[Tuple[str, ...]]], DataLoader] = {}
+
+    def for_type(self, resource_type: str, paths: Optional[Set[str]] = None) -> DataLoader:
+        # References selecting the same fields, as in every row of a list, share one batch
+        key = (resource_type, None if paths is None else tuple(sorted(paths)))
+        if key not in self._loaders:
+            self._loaders[key] = DataLoader(
+                load_fn=partial(load_resources, *key)
+            )
+        return self._loaders[key]
+
+    async def load(
+        self,
+        reference: str,
+        default_type: Optional[str] = None,
+        paths: Optional[Set[str]] = None
+    ) -> Optional[Any]:
+        # Accepts relative ("Patient/123") and absolute (".../Patient/123") references
+        parts = reference.rstrip("/").split("/") if reference else []
+        if len(parts) >= 2:
+            resource_type, id = parts[-2], parts[-1]
+        elif len(parts) == 1 and default_type:
+            resource_type, id = default_type, parts[0]
+        else:
+            return None
+        if resource_type not in REFERENCE_TYPES:
+            return None
+        return await self.for_type(resource_type, paths).load(id)
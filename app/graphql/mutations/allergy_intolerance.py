@@ -5,6 +5,7 @@ from datetime import datetime
 from bson import ObjectId
 from app.fhir.types.allergy_intolerance import AllergyIntolerance
 from app.config.database import get_database
+from app.db.cache import resource_cache
 from app.db.versioning import VersionManager
 
 @strawberry.input
@@ -109,7 +110,8 @@ class AllergyIntoleranceMutations:
         self,
         id: str,
         allergy_data: AllergyIntoleranceInput,
-        is_major_update: bool = False
+        is_major_update: bool = False,
+        expected_version: Optional[str] = None
     ) -> AllergyIntolerance:
         db = await get_database()
         
@@ -174,7 +176,8 @@ class AllergyIntoleranceMutations:
             resource_type="AllergyIntolerance",
             id=id,
             data=updated_doc,
-            is_major_update=is_major_update
+            is_major_update=is_major_update,
+            expected_version=expected_version
         )
 
         return AllergyIntolerance.from_mongo(result)
@@ -185,4 +188,5 @@ class AllergyIntoleranceMutations:
         # Delete from both main and history collections
         result1 = await db.allergyintolerance.delete_one({"id": id})
         result2 = await db.allergyintolerance_history.delete_many({"id": id})
+        await resource_cache.invalidate("AllergyIntolerance", id, deleted=True)
         return result1.deleted_count > 0
\ No newline at end of file
@@ -0,0 +1,15 @@
+# app/graphql/mutations/bundle.py
+import strawberry
+from strawberry.scalars import JSON
+from app.fhir.types.bundle import BundleResponse
+from app.config.database import get_database
+from app.db.bulk import ingest_bundle
+
+@strawberry.type
+class BundleMutations:
+    @strawberry.mutation
+    async def ingest_bundle(self, bundle: JSON) -> BundleResponse:
+        """Create every entry of a FHIR batch or transaction Bundle"""
+        db = await get_database()
+        result = await ingest_bundle(db, bundle)
+        return BundleResponse.from_dict(result)
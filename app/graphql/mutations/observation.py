@@ -3,8 +3,22 @@ import strawberry
 from datetime import datetime
 from bson import ObjectId
 from app.fhir.types.observation import Observation
-from app.core.constants import VITAL_CODES, VALUE_RANGES
+from app.core.constants import (
+    LOINC_SYSTEM,
+    UCUM_SYSTEM,
+    VALUE_RANGES,
+    VITAL_CODES,
+    VITAL_SIGNS_CATEGORY,
+    VITAL_SIGNS_PANEL,
+    VITAL_SIGNS_PROFILE
+)
 from app.config.database import get_database
+from app.config.settings import get_settings
+from app.db.cache import resource_cache
+from app.db.counters import counters
+from app.db.timeseries import write_vital_points
+from app.db.write_buffer import observation_writes
+from app.fhir.utils.helpers import add_search_fields
 import random
 
 @strawberry.type
@@ -17,19 +31,14 @@ class ObservationMutations:
         _id = str(ObjectId())
         
         # Get counter for versioning
-        counter = await db.counters.find_one_and_update(
-            {"_id": "Observation"},
-            {"$inc": {"next": 1}},
-            upsert=True,
-            return_document=True
-        )
+        version = await counters.next(db, "Observation")
         
         # Create meta information
         meta = {
-            "versionId": str(counter["next"]),
+            "versionId": str(version),
             "lastUpdated": datetime.utcnow().isoformat(),
             "source": f"urn:uuid:{_id}",
-            "profile": ["http://hl7.org/fhir/StructureDefinition/vitalsigns"]
+            "profile": [VITAL_SIGNS_PROFILE]
         }
         
         # Generate components for each vital sign
@@ -45,7 +54,7 @@ class ObservationMutations:
             component = {
                 "code": {
                     "coding": [{
-                        "system": "http://loinc.org",
+                        "system": LOINC_SYSTEM,
                         "code": vital_info["code"],
                         "display": vital_info["display"]
                     }]
@@ -53,7 +62,7 @@ class ObservationMutations:
                 "valueQuantity": {
                     "value": value,
                     "unit": vital_info["unit"],
-                    "system": "http://unitsofmeasure.org",
+                    "system": UCUM_SYSTEM,
                     "code": vital_info["unit"]
                 }
             }
@@ -67,18 +76,10 @@ class ObservationMutations:
             "meta": meta,
             "status": "final",
             "category": [{
-                "coding": [{
-                    "system": "http://terminology.hl7.org/CodeSystem/observation-category",
-                    "code": "vital-signs",
-                    "display": "Vital Signs"
-                }]
+                "coding": [dict(VITAL_SIGNS_CATEGORY)]
             }],
             "code": {
-                "coding": [{
-                    "system": "http://loinc.org",
-                    "code": "85353-1",
-                    "display": "Vital signs panel"
-                }],
+                "coding": [dict(VITAL_SIGNS_PANEL)],
                 "text": "Vital Signs Panel"
             },
             "subject": {
@@ -94,17 +95,22 @@ class ObservationMutations:
                 "reference": "Device/vital-signs-monitor",
                 "display": "Vital Signs Monitor"
             },
-            "component": components,
-            # Flattened search fields
-            "patient_id": patient_id,
-            "date": datetime.utcnow().isoformat()[:10]  # YYYY-MM-DD
+            "component": components
         }
+        # Flattened search fields
+        add_search_fields("Observation", observation_doc)
 
-        await db.observations.insert_one(observation_doc)
+        if get_settings().WRITE_BUFFER_ENABLED:
+            # Written together with other inserts of the next few milliseconds
+            await observation_writes.insert(db, observation_doc)
+        else:
+            await db.observations.insert_one(observation_doc)
+            await write_vital_points(db, [observation_doc])
         return Observation.from_mongo(observation_doc)
 
     @strawberry.mutation
     async def delete_observation(self, id: str) -> bool:
         db = await get_database()
         result = await db.observations.delete_one({"id": id, "resourceType": "Observation"})
+        await resource_cache.invalidate("Observation", id, deleted=True)
         return result.deleted_count > 0
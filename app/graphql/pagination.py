@@ -0,0 +1,107 @@
+# app/graphql/pagination.py
+import base64
+import json
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+import strawberry
+from bson import ObjectId
+from bson.errors import InvalidId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from strawberry.types import Info
+from app.config.settings import get_settings
+from .projection import iter_fields
+
+T = TypeVar("T")
+
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str] = None
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo
+    total_count: Optional[int] = None
+
+def encode_cursor(sort_value: Any, _id: ObjectId) -> str:
+    raw = json.dumps([sort_value, str(_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor: str) -> Tuple[Any, ObjectId]:
+    try:
+        sort_value, _id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return sort_value, ObjectId(_id)
+    except (ValueError, TypeError, InvalidId):
+        raise ValueError(f"Invalid cursor {cursor}")
+
+def is_selected(info: Info, field_name: str) -> bool:
+    """Whether the client selected field_name directly under the current field"""
+    return any(
+        field.name == field_name
+        for field in iter_fields(info.selected_fields[0].selections)
+    )
+
+def _after_filter(sort_key: str, sort_value: Any, _id: ObjectId) -> Dict[str, Any]:
+    # Keyset condition for a (sort_key desc, _id desc) ordering
+    after = [
+        {sort_key: {"$lt": sort_value}},
+        {sort_key: sort_value, "_id": {"$lt": _id}}
+    ]
+    if sort_value is not None:
+        # Missing sort keys sort last in descending order
+        after.append({sort_key: None})
+    return {"$or": after}
+
+def page_size(first: Optional[int]) -> int:
+    settings = get_settings()
+    if first is None:
+        return settings.DEFAULT_PAGE_SIZE
+    if first < 1:
+        raise ValueError("first must be a positive integer")
+    return min(first, settings.MAX_PAGE_SIZE)
+
+def page_query(query: Dict[str, Any], sort_key: str, after: Optional[str]) -> Dict[str, Any]:
+    """query restricted to the documents following the after cursor"""
+    if after:
+        return {"$and": [query, _after_filter(sort_key, *decode_cursor(after))]}
+    return query
+
+async def paginate(
+    collection: AsyncIOMotorCollection,
+    query: Dict[str, Any],
+    sort_key: str,
+    convert: Callable[[Dict[str, Any]], T],
+    first: Optional[int] = None,
+    after: Optional[str] = None,
+    with_total: bool = False,
+    projection: Optional[Dict[str, int]] = None
+) -> Connection[T]:
+    """Fetch one page of query ordered by (sort_key, _id) descending"""
+    limit = page_size(first)
+    if projection is not None:
+        # The sort key is needed to build cursors even when it is not selected
+        projection = {**projection, sort_key: 1}
+
+    # Fetch one extra document to know whether another page follows
+    cursor = collection.find(page_query(query, sort_key, after), projection).sort([(sort_key, -1), ("_id", -1)]).limit(limit + 1)
+    docs = await cursor.to_list(length=limit + 1)
+    has_next_page = len(docs) > limit
+    docs = docs[:limit]
+
+    edges = [
+        Edge(cursor=encode_cursor(doc.get(sort_key), doc["_id"]), node=convert(doc))
+        for doc in docs
+    ]
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(
+            has_next_page=has_next_page,
+            end_cursor=edges[-1].cursor if edges else None
+        ),
+        total_count=await collection.count_documents(query) if with_total else None
+    )
@@ -0,0 +1,55 @@
+# app/graphql/projection.py
+from typing import Dict, Iterator, List, Set
+from strawberry.types import Info
+from strawberry.types.nodes import FragmentSpread, InlineFragment, SelectedField, Selection
+
+# Fields resolved in Python, mapped to the stored field they read
+COMPUTED_FIELDS = {
+    "resource": "reference"
+}
+
+def iter_fields(selections: List[Selection]) -> Iterator[SelectedField]:
+    """Yield the fields of a selection set, expanding fragments in place"""
+    for selection in selections:
+        if isinstance(selection, (FragmentSpread, InlineFragment)):
+            yield from iter_fields(selection.selections)
+        else:
+            yield selection
+
+def _collect_paths(selections: List[Selection], prefix: str, paths: Set[str]) -> None:
+    for field in iter_fields(selections):
+        if field.name.startswith("__"):
+            continue
+        if field.name in COMPUTED_FIELDS:
+            paths.add(prefix + COMPUTED_FIELDS[field.name])
+        elif field.selections:
+            _collect_paths(field.selections, f"{prefix}{field.name}.", paths)
+        else:
+            paths.add(prefix + field.name)
+
+def selected_paths(info: Info, *path: str) -> Set[str]:
+    """Dotted document paths selected below the current field.
+
+    path walks into nested fields first, e.g. ("edges", "node") for a connection.
+    """
+    selections = info.selected_fields[0].selections
+    for name in path:
+        selections = [
+            child
+            for field in iter_fields(selections) if field.name == name
+            for child in field.selections
+        ]
+    paths = {"id"}
+    _collect_paths(selections, "", paths)
+    return paths
+
+def to_projection(paths: Set[str]) -> Dict[str, int]:
+    """Mongo projection for paths, dropping paths already covered by a parent"""
+    projection = {}
+    for path in sorted(paths):
+        if not any(path.startswith(f"{kept}.") for kept in projection):
+            projection[path] = 1
+    return projection
+
+def top_level_fields(paths: Set[str]) -> Set[str]:
+    return {path.split(".", 1)[0] for path in paths}
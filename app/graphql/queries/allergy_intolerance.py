@@ -1,66 +1,116 @@
 # app/graphql/queries/allergy_intolerance.py
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import strawberry
+from strawberry.types import Info
 from app.fhir.types.allergy_intolerance import AllergyIntolerance
-from app.config.database import get_database
+from app.config.database import get_database, get_read_database
+from app.db.cache import resource_cache
 from app.db.versioning import VersionManager
+from app.graphql.pagination import Connection, is_selected, page_size, paginate
+from app.graphql.projection import selected_paths, to_projection, top_level_fields
+
+def allergy_search_query(
+    patient_id: Optional[str] = None,
+    clinical_status: Optional[str] = None,
+    criticality: Optional[str] = None,
+    code: Optional[str] = None
+) -> Dict[str, Any]:
+    query = {"resourceType": "AllergyIntolerance"}
+
+    if patient_id:
+        query["patient.reference"] = f"Patient/{patient_id}"
+    if clinical_status:
+        query["clinicalStatus.coding.code"] = clinical_status
+    if criticality:
+        query["criticality"] = criticality
+    if code:
+        query["code.coding.code"] = code
+    return query
 
 @strawberry.type
 class AllergyIntoleranceQueries:
     @strawberry.field
-    async def allergy_intolerance(self, id: str) -> Optional[AllergyIntolerance]:
+    async def allergy_intolerance(self, info: Info, id: str) -> Optional[AllergyIntolerance]:
         db = await get_database()
-        data = await db.allergyintolerance.find_one({"id": id})
-        return AllergyIntolerance.from_mongo(data)
+        paths = selected_paths(info)
+        data = await resource_cache.current(
+            "AllergyIntolerance",
+            id,
+            lambda projection: db.allergyintolerance.find_one({"id": id}, projection),
+            projection=to_projection(paths)
+        )
+        return AllergyIntolerance.from_mongo(data, top_level_fields(paths))
 
     @strawberry.field
     async def allergy_intolerance_version(
         self, 
+        info: Info,
         id: str, 
         version: str
     ) -> Optional[AllergyIntolerance]:
         db = await get_database()
-        data = await VersionManager.get_version(
-            db=db,
-            resource_type="AllergyIntolerance",
-            id=id,
-            version=version
-        )
-        return AllergyIntolerance.from_mongo(data)
+        paths = selected_paths(info)
+
+        def load(projection):
+            return VersionManager.get_version(
+                db=db,
+                resource_type="AllergyIntolerance",
+                id=id,
+                version=version,
+                projection=projection
+            )
+
+        if version == "current":
+            data = await resource_cache.current("AllergyIntolerance", id, load, projection=to_projection(paths))
+        else:
+            data = await resource_cache.version("AllergyIntolerance", id, version, load, projection=to_projection(paths))
+        return AllergyIntolerance.from_mongo(data, top_level_fields(paths))
 
     @strawberry.field
     async def search_allergies(
         self,
+        info: Info,
         patient_id: Optional[str] = None,
         clinical_status: Optional[str] = None,
         criticality: Optional[str] = None,
-        code: Optional[str] = None
-    ) -> List[AllergyIntolerance]:
-        db = await get_database()
-        query = {"resourceType": "AllergyIntolerance"}
-        
-        if patient_id:
-            query["patient.reference"] = f"Patient/{patient_id}"
-        if clinical_status:
-            query["clinicalStatus.coding.code"] = clinical_status
-        if criticality:
-            query["criticality"] = criticality
-        if code:
-            query["code.coding.code"] = code
-            
-        cursor = db.allergyintolerance.find(query)
-        allergies = []
-        async for doc in cursor:
-            allergies.append(AllergyIntolerance.from_mongo(doc))
-        return allergies
+        code: Optional[str] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> Connection[AllergyIntolerance]:
+        db = await get_read_database()
+        query = allergy_search_query(patient_id, clinical_status, criticality, code)
+
+        paths = selected_paths(info, "edges", "node")
+        fields = top_level_fields(paths)
+        return await paginate(
+            db.allergyintolerance,
+            query,
+            sort_key="recordedDate",
+            convert=lambda doc: AllergyIntolerance.from_mongo(doc, fields),
+            first=first,
+            after=after,
+            with_total=is_selected(info, "totalCount"),
+            projection=to_projection(paths)
+        )
 
     @strawberry.field
-    async def allergy_intolerance_history(self, id: str) -> List[AllergyIntolerance]:
-        """Get version history of an allergy intolerance resource"""
-        db = await get_database()
+    async def allergy_intolerance_history(
+        self,
+        info: Info,
+        id: str,
+        first: Optional[int] = None,
+        before: Optional[str] = None
+    ) -> List[AllergyIntolerance]:
+        """Get version history of an allergy intolerance resource, newest first"""
+        db = await get_read_database()
+        paths = selected_paths(info)
         history = await VersionManager.get_resource_history(
             db=db,
             resource_type="AllergyIntolerance",
-            id=id
+            id=id,
+            limit=page_size(first),
+            before=before,
+            projection=to_projection(paths)
         )
-        return [AllergyIntolerance.from_mongo(doc) for doc in history]
\ No newline at end of file
+        fields = top_level_fields(paths)
+        return [AllergyIntolerance.from_mongo(doc, fields) for doc in history]
\ No newline at end of file
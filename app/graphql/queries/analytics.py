@@ -0,0 +1,183 @@
+# app/graphql/queries/analytics.py
+import math
+from datetime import datetime
+from typing import Annotated, List, Optional
+import strawberry
+from app.config.database import get_read_database
+from app.config.settings import get_settings
+from app.core.constants import VALUE_RANGES, VITAL_CODES
+from app.core.enum import RiskLevel
+from app.db.analytics import resolve_vital, vital_daily_summary, vital_statistics
+from app.db.risk import NEWS2_BANDS, VITALS, patient_risk_scores
+
+# Indexed by the level codes of app.db.risk
+RISK_LEVELS = (RiskLevel.LOW, RiskLevel.LOW_MEDIUM, RiskLevel.MEDIUM, RiskLevel.HIGH)
+
+@strawberry.type
+class Percentile:
+    percentile: float
+    value: Optional[float]
+
+@strawberry.type
+class HistogramBin:
+    lower: Optional[float]
+    upper: Optional[float]
+    count: int
+
+@strawberry.type
+class VitalStatistics:
+    code: str
+    unit: str
+    normal_low: float
+    normal_high: float
+    count: int
+    patient_count: int
+    mean: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+    std_dev: Optional[float]
+    percentiles: List[Percentile]
+    below_range: int
+    above_range: int
+    patients_below_range: int
+    patients_above_range: int
+    histogram: List[HistogramBin]
+
+@strawberry.type
+class DailyVitalSummary:
+    day: str
+    patient_count: int
+    count: int
+    mean: float
+    min: float
+    max: float
+
+@strawberry.type
+class VitalRisk:
+    name: str
+    code: str
+    value: float
+    below_range: bool
+    above_range: bool
+    score: Optional[int] = strawberry.field(description="NEWS2 points, null for vitals NEWS2 does not score")
+
+@strawberry.type
+class PatientRiskScore:
+    patient_id: str
+    score: int
+    risk_level: RiskLevel
+    vitals: List[VitalRisk]
+    unmeasured: List[str] = strawberry.field(description="NEWS2 vitals with no recorded value")
+
+@strawberry.type
+class AnalyticsQueries:
+    @strawberry.field
+    async def vital_statistics(
+        self,
+        code: str,
+        from_: Annotated[datetime, strawberry.argument(name="from")],
+        to: datetime,
+        patient_ids: Optional[List[str]] = None,
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+        bins: int = 10
+    ) -> VitalStatistics:
+        """Population statistics of one vital sign, by LOINC code or VITAL_CODES name.
+
+        The normal range defaults to VALUE_RANGES; the histogram has an open bin
+        on either side of it.
+        """
+        db = await get_read_database()
+        name, vital = resolve_vital(code)
+        default_low, default_high = VALUE_RANGES[name]
+        low = default_low if low is None else low
+        high = default_high if high is None else high
+        stats = await vital_statistics(db, vital["code"], from_, to, low, high, patient_ids, bins)
+        return VitalStatistics(
+            code=vital["code"],
+            unit=vital["unit"],
+            normal_low=low,
+            normal_high=high,
+            count=stats["count"],
+            patient_count=stats["patients"],
+            mean=stats["mean"],
+            min=stats["min"],
+            max=stats["max"],
+            std_dev=stats["stdDev"],
+            percentiles=[Percentile(percentile=p, value=value) for p, value in stats["percentiles"]],
+            below_range=stats["belowRange"],
+            above_range=stats["aboveRange"],
+            patients_below_range=stats["patientsBelowRange"],
+            patients_above_range=stats["patientsAboveRange"],
+            histogram=[HistogramBin(**b) for b in stats["histogram"]]
+        )
+
+    @strawberry.field
+    async def vital_daily_summary(
+        self,
+        code: str,
+        from_: Annotated[datetime, strawberry.argument(name="from")],
+        to: datetime,
+        patient_ids: Optional[List[str]] = None
+    ) -> List[DailyVitalSummary]:
+        """Day-by-day aggregates of one vital sign over a cohort of patients"""
+        db = await get_read_database()
+        _, vital = resolve_vital(code)
+        days = await vital_daily_summary(db, vital["code"], from_, to, patient_ids)
+        return [
+            DailyVitalSummary(
+                day=d["day"],
+                patient_count=d["patients"],
+                count=d["count"],
+                mean=d["mean"],
+                min=d["min"],
+                max=d["max"]
+            )
+            for d in days
+        ]
+
+    @strawberry.field
+    async def patient_risk_scores(
+        self,
+        patient_ids: List[str],
+        lookback_hours: Optional[float] = None
+    ) -> List[PatientRiskScore]:
+        """NEWS2 early-warning scores and out-of-range flags from each patient's latest vitals.
+
+        Only vitals from the last lookbackHours count, RISK_SCORE_LOOKBACK_HOURS by default.
+        """
+        if lookback_hours is None:
+            lookback_hours = get_settings().RISK_SCORE_LOOKBACK_HOURS
+        if lookback_hours <= 0:
+            raise ValueError("lookbackHours must be positive")
+        db = await get_read_database()
+        scores = await patient_risk_scores(db, patient_ids, lookback_hours)
+        # Convert once instead of reading NumPy scalars per element
+        values = scores.values.tolist()
+        below = scores.below_range.tolist()
+        above = scores.above_range.tolist()
+        points = scores.points.tolist()
+        totals = scores.total.tolist()
+        levels = scores.level.tolist()
+        results = []
+        for row, patient_id in enumerate(scores.patient_ids):
+            vitals = [
+                VitalRisk(
+                    name=name,
+                    code=VITAL_CODES[name]["code"],
+                    value=values[row][column],
+                    below_range=below[row][column],
+                    above_range=above[row][column],
+                    score=points[row][column] if name in NEWS2_BANDS else None
+                )
+                for column, name in enumerate(VITALS)
+                if not math.isnan(values[row][column])
+            ]
+            results.append(PatientRiskScore(
+                patient_id=patient_id,
+                score=totals[row],
+                risk_level=RISK_LEVELS[levels[row]],
+                vitals=vitals,
+                unmeasured=[name for name in NEWS2_BANDS if points[row][VITALS.index(name)] < 0]
+            ))
+        return results
@@ -1,43 +1,84 @@
-from typing import List, Optional
+from typing import Any, Dict, Optional
 import strawberry
+from strawberry.types import Info
 from app.fhir.types.observation import Observation
-from app.config.database import get_database
+from app.config.database import get_database, get_read_database
+from app.db.cache import resource_cache
+from app.graphql.pagination import Connection, is_selected, paginate
+from app.graphql.projection import selected_paths, to_projection, top_level_fields
+
+def observation_search_query(
+    patient_id: Optional[str] = None,
+    code: Optional[str] = None,
+    date: Optional[str] = None,
+    value_min: Optional[float] = None,
+    value_max: Optional[float] = None
+) -> Dict[str, Any]:
+    query = {"resourceType": "Observation"}
+
+    if patient_id:
+        query["patient_id"] = patient_id
+    if date:
+        query["date"] = date
+
+    # Code and value conditions must hold for the same component, which
+    # the multikey search_params indexes turn into one bounded range scan
+    param = {}
+    if patient_id and (code or value_min is not None or value_max is not None):
+        param["patient"] = patient_id
+    if code:
+        param["code"] = code
+    if value_min is not None or value_max is not None:
+        param["value"] = {}
+        if value_min is not None:
+            param["value"]["$gte"] = value_min
+        if value_max is not None:
+            param["value"]["$lte"] = value_max
+    if param:
+        query["search_params"] = {"$elemMatch": param}
+    return query
 
 @strawberry.type
 class ObservationQueries:
     @strawberry.field
-    async def observation(self, id: str) -> Optional[Observation]:
+    async def observation(self, info: Info, id: str) -> Optional[Observation]:
         db = await get_database()
-        data = await db.observations.find_one({"id": id, "resourceType": "Observation"})
-        return Observation.from_mongo(data)
+        paths = selected_paths(info)
+        data = await resource_cache.current(
+            "Observation",
+            id,
+            lambda projection: db.observations.find_one(
+                {"id": id, "resourceType": "Observation"},
+                projection
+            ),
+            projection=to_projection(paths)
+        )
+        return Observation.from_mongo(data, top_level_fields(paths))
 
     @strawberry.field
     async def search_observations(
         self,
+        info: Info,
         patient_id: Optional[str] = None,
         code: Optional[str] = None,
         date: Optional[str] = None,
         value_min: Optional[float] = None,
-        value_max: Optional[float] = None
-    ) -> List[Observation]:
-        db = await get_database()
-        query = {"resourceType": "Observation"}
-        
-        if patient_id:
-            query["patient_id"] = patient_id
-        if code:
-            query["code_loinc"] = code
-        if date:
-            query["date"] = date
-        if value_min is not None or value_max is not None:
-            query["value"] = {}
-            if value_min is not None:
-                query["value"]["$gte"] = value_min
-            if value_max is not None:
-                query["value"]["$lte"] = value_max
-            
-        cursor = db.observations.find(query)
-        observations = []
-        async for doc in cursor:
-            observations.append(Observation.from_mongo(doc))
-        return observations
+        value_max: Optional[float] = None,
+        first: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> Connection[Observation]:
+        db = await get_read_database()
+        query = observation_search_query(patient_id, code, date, value_min, value_max)
+
+        paths = selected_paths(info, "edges", "node")
+        fields = top_level_fields(paths)
+        return await paginate(
+            db.observations,
+            query,
+            sort_key="effectiveDateTime",
+            convert=lambda doc: Observation.from_mongo(doc, fields),
+            first=first,
+            after=after,
+            with_total=is_selected(info, "totalCount"),
+            projection=to_projection(paths)
+        )
@@ -0,0 +1,36 @@
+# app/graphql/queries/vitals.py
+from datetime import datetime
+from typing import Annotated, List
+import strawberry
+from app.config.database import get_database
+from app.core.constants import VITAL_CODES
+from app.core.enum import TimeBucket
+from app.db.timeseries import vitals_buckets
+
+@strawberry.type
+class VitalsBucket:
+    start: datetime
+    min: float
+    max: float
+    avg: float
+    count: int
+
+@strawberry.type
+class VitalsQueries:
+    @strawberry.field
+    async def vitals_time_series(
+        self,
+        patient_id: str,
+        code: str,
+        from_: Annotated[datetime, strawberry.argument(name="from")],
+        to: datetime,
+        bucket: TimeBucket = TimeBucket.HOUR
+    ) -> List[VitalsBucket]:
+        """Downsampled values of one vital sign, by LOINC code or VITAL_CODES name"""
+        db = await get_database()
+        loinc_code = VITAL_CODES.get(code, {}).get("code", code)
+        buckets = await vitals_buckets(db, patient_id, loinc_code, from_, to, bucket.value)
+        return [
+            VitalsBucket(start=b["_id"], min=b["min"], max=b["max"], avg=b["avg"], count=b["count"])
+            for b in buckets
+        ]
@@ -2,18 +2,41 @@
 import strawberry
 from .queries.observation import ObservationQueries
 from .queries.allergy_intolerance import AllergyIntoleranceQueries
+from .queries.vitals import VitalsQueries
+from .queries.analytics import AnalyticsQueries
 from .mutations.observation import ObservationMutations
 from .mutations.allergy_intolerance import AllergyIntoleranceMutations
+from .mutations.bundle import BundleMutations
+from .subscriptions.observation import ObservationSubscriptions
+from app.config.settings import get_settings
+from .extensions.cost import QueryCostLimiter
+from .extensions.metrics import MetricsExtension
+from .extensions.profiler import QueryProfiler
+from .extensions.persisted_queries import PersistedQueries
 
 @strawberry.type
-class Query(ObservationQueries, AllergyIntoleranceQueries):
+class Query(ObservationQueries, AllergyIntoleranceQueries, VitalsQueries, AnalyticsQueries):
     pass
 
 @strawberry.type
-class Mutation(ObservationMutations, AllergyIntoleranceMutations):
+class Mutation(ObservationMutations, AllergyIntoleranceMutations, BundleMutations):
     pass
 
+@strawberry.type
+class Subscription(ObservationSubscriptions):
+    pass
+
+extensions = [PersistedQueries, QueryCostLimiter, MetricsExtension]
+if get_settings().SLOW_QUERY_PROFILER_ENABLED:
+    extensions.append(QueryProfiler)
+if get_settings().OTEL_TRACING_ENABLED:
+    # Resolver spans become the parents of the MongoDB command spans
+    from strawberry.extensions.tracing import OpenTelemetryExtension
+    extensions.append(OpenTelemetryExtension)
+
 schema = strawberry.Schema(
     query=Query,
-    mutation=Mutation
+    mutation=Mutation,
+    subscription=Subscription,
+    extensions=extensions
 )
\ No newline at end of file
@@ -0,0 +1,50 @@
+# app/graphql/subscriptions/observation.py
+from typing import Any, AsyncGenerator, Dict, Optional
+import strawberry
+from app.fhir.types.observation import Observation
+from app.config.database import get_database, supports_transactions
+from app.db.change_streams import decode_resume_token, encode_resume_token, get_insert_hub
+from app.db.collections import collection_name
+from app.fhir.utils.helpers import observation_search_params
+
+def _matches(doc: Dict[str, Any], patient_id: Optional[str], code: Optional[str]) -> bool:
+    params = doc.get("search_params") or observation_search_params(doc)
+    if patient_id and not any(p["patient"] == patient_id for p in params):
+        return False
+    if code and not any(p["code"] == code for p in params):
+        return False
+    return True
+
+@strawberry.type
+class ObservationAdded:
+    # Pass as after when resubscribing to get every event after this one
+    cursor: str
+    observation: Observation
+
+@strawberry.type
+class ObservationSubscriptions:
+    @strawberry.subscription
+    async def observation_added(
+        self,
+        patient_id: Optional[str] = None,
+        code: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> AsyncGenerator[ObservationAdded, None]:
+        """Observations as they are created, optionally for one patient and LOINC code.
+
+        With after, the observations created since that cursor come first. A
+        subscriber that falls behind gets an error instead of losing events
+        and resubscribes from its last cursor.
+        """
+        db = await get_database()
+        # Change streams have the same deployment requirement as transactions
+        if not await supports_transactions(db):
+            raise ValueError("Subscriptions require a replica set or sharded cluster")
+
+        hub = get_insert_hub(collection_name("Observation"))
+        token = decode_resume_token(after) if after else None
+        async for change in hub.changes(token, lambda change: _matches(change["fullDocument"], patient_id, code)):
+            yield ObservationAdded(
+                cursor=encode_resume_token(change["_id"]),
+                observation=Observation.from_mongo(change["fullDocument"])
+            )
@@ -1,9 +1,24 @@
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pymongo.errors import PyMongoError
 from strawberry.fastapi import GraphQLRouter
 from contextlib import asynccontextmanager
 from app.graphql.schema import schema
-from app.config.database import get_database, close_database
-from app.db.indexes import create_indexes
+from app.graphql.context import get_context
+from app.config.database import Database, get_database, get_read_database, close_database, warm_pool
+from app.config.settings import get_settings
+from app.db.change_streams import close_change_streams
+from app.db.counters import counters
+from app.db.export import resume_export_jobs, stop_export_jobs
+from app.db.write_buffer import observation_writes
+from app.db.indexes import ensure_indexes, warm_indexes
+from app.db.migrations import run_migrations
+from app.db.profiler import slow_queries
+from app.db.timeseries import ensure_timeseries_collection
+from app.graphql.extensions.persisted_queries import load_persisted_queries_manifest
+from app.graphql.fast_path import GraphQLFastPath
+from app.api import admin, fhir
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -14,9 +29,43 @@ async def lifespan(app: FastAPI):
         await db.client.admin.command('ping')
         print("Successfully connected to MongoDB")
         
-        # Create indexes
-        await create_indexes(db)
-        print("Indexes created successfully")
+        # Bring existing data up to date before building indexes on it
+        for name in await run_migrations(db):
+            print(f"Applied migration {name}")
+
+        # Create missing indexes
+        report = await ensure_indexes(db)
+        print(f"Indexes ready, created: {', '.join(report.created) or 'none'}")
+        for query in report.collscans:
+            print(f"Warning: {query} has no supporting index and will COLLSCAN")
+
+        if await ensure_timeseries_collection(db):
+            print("Created vital-signs time-series collection")
+
+        registered = await load_persisted_queries_manifest(db)
+        if registered:
+            print(f"Registered {registered} persisted queries")
+
+        resumed = await resume_export_jobs(db)
+        if resumed:
+            print(f"Resuming {resumed} bulk export jobs")
+
+        # Open pooled connections and load hot index pages before reporting healthy
+        settings = get_settings()
+        if settings.MONGODB_WARMUP_ENABLED:
+            try:
+                # Searches may read from a secondary, so warm both members
+                read_db = await get_read_database()
+                await warm_pool(db, settings.MONGODB_MIN_POOL_SIZE)
+                await warm_pool(read_db, settings.MONGODB_MIN_POOL_SIZE)
+                await warm_indexes(db, settings.MONGODB_WARMUP_INDEX_KEYS)
+                touched = await warm_indexes(read_db, settings.MONGODB_WARMUP_INDEX_KEYS)
+                print(f"Warmed {settings.MONGODB_MIN_POOL_SIZE} connections and {touched} indexes")
+            except PyMongoError as e:
+                print(f"Warning: warm-up failed: {str(e)}")
+        if settings.SLOW_QUERY_PROFILER_ENABLED:
+            slow_queries.start()
+        Database.ready = True
         
         yield
     except Exception as e:
@@ -25,6 +74,12 @@ async def lifespan(app: FastAPI):
     finally:
         # Cleanup
         print("Shutting down...")
+        Database.ready = False
+        slow_queries.stop()
+        close_change_streams()
+        stop_export_jobs()
+        counters.release()
+        await observation_writes.close()
         await close_database()
 
 app = FastAPI(
@@ -34,16 +89,28 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Answers simple search queries from raw BSON when GRAPHQL_FAST_PATH_ENABLED is set
+app.add_middleware(GraphQLFastPath, schema=schema)
+
 # Create GraphQL route
-graphql_router = GraphQLRouter(schema)
+graphql_router = GraphQLRouter(schema, context_getter=get_context)
 
 # Add routes
 app.include_router(graphql_router, prefix="/graphql")
+app.include_router(fhir.router)
+app.include_router(admin.router)
 
 @app.get("/health")
 async def health_check():
+    if not Database.ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """GraphQL, MongoDB and write buffer metrics in the Prometheus text format"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
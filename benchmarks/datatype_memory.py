@@ -0,0 +1,85 @@
+# benchmarks/datatype_memory.py
+"""Measure the memory held by the Observation objects of a large search result.
+
+Each document is decoded from BSON on its own, as Motor hands them over, so
+no strings are shared between documents unless the datatypes share them.
+No database is needed.
+
+    python -m benchmarks.datatype_memory --count 10000
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+import bson
+from bson import ObjectId
+from app.core.constants import (
+    LOINC_SYSTEM,
+    UCUM_SYSTEM,
+    VALUE_RANGES,
+    VITAL_CODES,
+    VITAL_SIGNS_CATEGORY,
+    VITAL_SIGNS_PANEL,
+    VITAL_SIGNS_PROFILE
+)
+from app.fhir.types.observation import Observation
+
+def panel_document(index: int) -> dict:
+    _id = ObjectId()
+    return {
+        "_id": _id,
+        "id": str(_id),
+        "resourceType": "Observation",
+        "meta": {
+            "versionId": str(index),
+            "lastUpdated": datetime.utcnow().isoformat(),
+            "source": f"urn:uuid:{_id}",
+            "profile": [VITAL_SIGNS_PROFILE]
+        },
+        "status": "final",
+        "category": [{"coding": [VITAL_SIGNS_CATEGORY]}],
+        "code": {"coding": [VITAL_SIGNS_PANEL], "text": "Vital Signs Panel"},
+        "subject": {"reference": f"Patient/{index % 100}", "type": "Patient"},
+        "effectiveDateTime": (datetime.utcnow() - timedelta(minutes=index)).isoformat(),
+        "performer": [{"reference": "Practitioner/example", "display": "Nurse Practitioner"}],
+        "device": {"reference": "Device/vital-signs-monitor", "display": "Vital Signs Monitor"},
+        "component": [
+            {
+                "code": {"coding": [{"system": LOINC_SYSTEM, "code": vital["code"], "display": vital["display"]}]},
+                "valueQuantity": {
+                    "value": round(random.uniform(*VALUE_RANGES[name]), 1),
+                    "unit": vital["unit"],
+                    "system": UCUM_SYSTEM,
+                    "code": vital["unit"]
+                }
+            }
+            for name, vital in VITAL_CODES.items()
+        ]
+    }
+
+def main(count: int) -> None:
+    encoded = [bson.encode(panel_document(i)) for i in range(count)]
+
+    gc.collect()
+    tracemalloc.start()
+    documents = [bson.decode(raw) for raw in encoded]
+    after_decode, _ = tracemalloc.get_traced_memory()
+    observations = [Observation.from_mongo(doc) for doc in documents]
+    # Responses keep the objects, not the documents
+    del documents
+    gc.collect()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{count} observations")
+    print(f"decoded documents: {after_decode / 1024 / 1024:8.1f} MiB")
+    print(f"observation objects: {held / 1024 / 1024:6.1f} MiB ({held / count:.0f} bytes each)")
+    print(f"peak while building: {peak / 1024 / 1024:6.1f} MiB")
+    assert len(observations) == count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=10000)
+    args = parser.parse_args()
+    main(args.count)
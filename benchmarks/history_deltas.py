@@ -0,0 +1,109 @@
+# benchmarks/history_deltas.py
+"""Compare history storage and version reconstruction latency for several
+snapshot intervals.
+
+An interval of 1 stores every version whole, as history did before deltas.
+Each interval writes its own resources and is measured on those alone. Runs
+against the MongoDB given by --url in an empty scratch database (--database,
+default fhir_benchmark) that is dropped afterwards unless --keep is given.
+
+    python -m benchmarks.history_deltas --url mongodb://localhost:27017 --resources 100 --versions 50 --intervals 1,5,10,20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ["HISTORY_DELTA_ENABLED"] = "true"
+
+import bson
+from app.config.database import close_database
+from app.config.settings import get_settings
+from app.core.constants import ALLERGY_CLINICAL_SYSTEM, ALLERGY_VERIFICATION_SYSTEM
+from app.db.indexes import ensure_indexes
+from app.db.versioning import VersionManager
+from benchmarks.scratch import add_database_arguments, open_scratch_database
+
+def allergy(patient: int, edit: int) -> dict:
+    """An AllergyIntolerance after a number of small clinical edits"""
+    return {
+        "resourceType": "AllergyIntolerance",
+        "meta": {"profile": ["http://hl7.org/fhir/StructureDefinition/AllergyIntolerance"]},
+        "code": {"coding": [{"system": "http://snomed.info/sct", "code": "91936005", "display": "Allergy to penicillin"}]},
+        "clinicalStatus": {"coding": [{"system": ALLERGY_CLINICAL_SYSTEM, "code": "active" if edit % 7 else "inactive"}]},
+        "verificationStatus": {"coding": [{"system": ALLERGY_VERIFICATION_SYSTEM, "code": "confirmed"}]},
+        "patient": {"reference": f"Patient/{patient}"},
+        "criticality": ("low", "high", "unable-to-assess")[edit % 3],
+        "recordedDate": "2024-01-01",
+        "reaction": [{
+            "manifestation": [{"coding": [{"system": "http://snomed.info/sct", "code": "247472004", "display": "Hives"}]}],
+            "onsetAge": {"value": 30, "unit": "years", "system": "http://unitsofmeasure.org", "code": "a"}
+        }],
+        "note": [{"text": f"Reviewed at visit {edit}"}]
+    }
+
+async def populate(db, resources: int, versions: int) -> list:
+    ids = []
+    for patient in range(resources):
+        doc = await VersionManager.create_versioned_resource(db, "AllergyIntolerance", allergy(patient, 0))
+        for edit in range(1, versions):
+            await VersionManager.update_versioned_resource(db, "AllergyIntolerance", doc["id"], allergy(patient, edit))
+        ids.append(doc["id"])
+    return ids
+
+async def history_bytes(db, ids: list) -> int:
+    return sum([len(bson.encode(doc)) async for doc in db.allergyintolerance_history.find({"id": {"$in": ids}})])
+
+async def median_ms(run, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+async def main(url: str, database: str, resources: int, versions: int, intervals: list, repeat: int, keep: bool) -> None:
+    settings = get_settings()
+    db = await open_scratch_database(url, database)
+    rng = random.Random(0)
+    try:
+        await ensure_indexes(db)
+        print(f"{resources} resources x {versions} versions")
+        print(f"{'K':>4} {'history MiB':>12} {'saving':>7} {'get_version ms':>15} {'full history ms':>16}")
+        baseline = None
+        for interval in intervals:
+            settings.HISTORY_SNAPSHOT_INTERVAL = interval
+            ids = await populate(db, resources, versions)
+
+            size = await history_bytes(db, ids)
+            baseline = baseline or size
+
+            async def one_version():
+                version = f"1.{rng.randrange(versions)}.0"
+                await VersionManager.get_version(db, "AllergyIntolerance", rng.choice(ids), version)
+
+            async def whole_history():
+                await VersionManager.get_resource_history(db, "AllergyIntolerance", rng.choice(ids))
+
+            version_ms = await median_ms(one_version, repeat)
+            history_ms = await median_ms(whole_history, repeat)
+            print(
+                f"{interval:>4} {size / 1024 / 1024:>12.2f} {1 - size / baseline:>7.0%} "
+                f"{version_ms:>15.2f} {history_ms:>16.2f}"
+            )
+    finally:
+        if not keep:
+            await db.client.drop_database(db.name)
+        await close_database()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--resources", type=int, default=100)
+    parser.add_argument("--versions", type=int, default=50)
+    parser.add_argument("--intervals", default="1,5,10,20", help="comma-separated snapshot intervals, 1 first")
+    parser.add_argument("--repeat", type=int, default=200)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.database, args.resources, args.versions, [int(k) for k in args.intervals.split(",")], args.repeat, args.keep))
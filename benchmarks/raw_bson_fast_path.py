@@ -0,0 +1,121 @@
+# benchmarks/raw_bson_fast_path.py
+"""Compare the regular GraphQL execution of a large searchObservations page
+with the raw-BSON fast path.
+
+Runs against the MongoDB given by --url in an empty scratch database
+(--database, default fhir_benchmark) that is dropped afterwards unless
+--keep is given.
+
+    python -m benchmarks.raw_bson_fast_path --url mongodb://localhost:27017 --count 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+# One page has to hold every result, and the limits must let it through
+os.environ["MAX_PAGE_SIZE"] = "100000"
+os.environ["GRAPHQL_MAX_QUERY_COST"] = "100000000"
+os.environ["GRAPHQL_COST_BUDGET_PER_MINUTE"] = "1000000000"
+
+from datetime import datetime, timedelta
+from bson import ObjectId
+from graphql import parse
+from app.config.database import close_database, get_database
+from benchmarks.scratch import add_database_arguments, open_scratch_database
+from app.db.indexes import ensure_indexes
+from app.graphql.context import get_context
+from app.graphql.fast_path import fetch_page, plan_operation, stream_response
+from app.graphql.mutations.observation import ObservationMutations
+from app.graphql.schema import schema
+
+PATIENT_ID = "benchmark-patient"
+
+QUERY = """
+query($first: Int) {
+  searchObservations(patientId: "benchmark-patient", first: $first) {
+    pageInfo { hasNextPage endCursor }
+    edges {
+      cursor
+      node {
+        id
+        status
+        effectiveDateTime
+        subject { reference }
+        component {
+          code { coding { code display } }
+          valueQuantity { value unit }
+        }
+      }
+    }
+  }
+}
+"""
+
+async def seed(count: int) -> None:
+    db = await get_database()
+    await ensure_indexes(db)
+    panel = await ObservationMutations().create_random_vital_signs_panel(PATIENT_ID)
+    template = await db.observations.find_one({"id": panel.id})
+    start = datetime.utcnow()
+    docs = []
+    for i in range(count - 1):
+        _id = ObjectId()
+        docs.append({
+            **template,
+            "_id": _id,
+            "id": str(_id),
+            "effectiveDateTime": (start - timedelta(minutes=i)).isoformat()
+        })
+    for offset in range(0, len(docs), 1000):
+        await db.observations.insert_many(docs[offset:offset + 1000], ordered=False)
+
+async def regular(variables) -> bytes:
+    result = await schema.execute(QUERY, variable_values=variables, context_value=await get_context())
+    if result.errors:
+        raise RuntimeError(result.errors)
+    return json.dumps({"data": result.data}).encode()
+
+async def fast(document, variables) -> bytes:
+    plan = plan_operation(schema, document, None, variables)
+    docs, has_next_page, total = await fetch_page(await get_database(), plan)
+    return b"".join([chunk async for chunk in stream_response(plan, docs, has_next_page, total)])
+
+async def measure(run, repeat: int) -> float:
+    await run()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+async def main(url: str, database: str, count: int, repeat: int, keep: bool) -> None:
+    db = await open_scratch_database(url, database)
+    try:
+        await seed(count)
+        variables = {"first": count}
+        document = parse(QUERY)
+
+        assert json.loads(await regular(variables)) == json.loads(await fast(document, variables))
+
+        regular_ms = await measure(lambda: regular(variables), repeat)
+        fast_ms = await measure(lambda: fast(document, variables), repeat)
+        print(f"{count} results, median of {repeat} runs")
+        print(f"regular execution: {regular_ms:9.1f} ms")
+        print(f"raw-BSON fast path: {fast_ms:8.1f} ms")
+        print(f"speedup: {regular_ms / fast_ms:.1f}x")
+    finally:
+        if not keep:
+            await db.client.drop_database(db.name)
+        await close_database()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.database, args.count, args.repeat, args.keep))
@@ -0,0 +1,136 @@
+# benchmarks/risk_scoring.py
+"""Time the patientRiskScores resolver end to end for a large cohort, and
+the NEWS2 scoring step on its own.
+
+Seeds --history vital-signs panels per patient, one every --interval hours,
+with values drawn around the VALUE_RANGES of each vital. The resolver loads
+only the panels of the last RISK_SCORE_LOOKBACK_HOURS, so deeper histories
+should not slow it down. Runs against the MongoDB given by --url in an empty
+scratch database (--database, default fhir_benchmark) that is dropped
+afterwards unless --keep is given.
+
+    python -m benchmarks.risk_scoring --url mongodb://localhost:27017 --patients 50000 --history 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+# Every patient is scored in one request
+os.environ["GRAPHQL_MAX_QUERY_COST"] = "100000000"
+os.environ["GRAPHQL_COST_BUDGET_PER_MINUTE"] = "1000000000"
+
+from datetime import datetime, timedelta
+import numpy as np
+from app.config.database import close_database, get_database
+from app.config.settings import get_settings
+from app.core.constants import LOINC_SYSTEM, VALUE_RANGES, VITAL_CODES, VITAL_SIGNS_CATEGORY
+from app.db.indexes import ensure_indexes
+from app.db.risk import VITALS, load_latest_vitals, score_vitals
+from app.fhir.utils.helpers import add_search_fields
+from app.graphql.context import get_context
+from app.graphql.schema import schema
+from benchmarks.scratch import add_database_arguments, open_scratch_database
+
+QUERY = """
+query($ids: [String!]!) {
+  patientRiskScores(patientIds: $ids) {
+    patientId
+    score
+    riskLevel
+    vitals { name value score belowRange aboveRange }
+  }
+}
+"""
+
+def random_values(rng: np.random.Generator, rows: int) -> np.ndarray:
+    low = np.array([VALUE_RANGES[name][0] for name in VITALS])
+    high = np.array([VALUE_RANGES[name][1] for name in VITALS])
+    spread = high - low
+    values = rng.uniform(low - spread / 4, high + spread / 4, (rows, len(VITALS))).round(1)
+    values[rng.random(values.shape) < 0.05] = np.nan
+    return values
+
+def panel(patient_id: str, effective: datetime, values: list) -> dict:
+    doc = {
+        "resourceType": "Observation",
+        "status": "final",
+        "category": [{"coding": [dict(VITAL_SIGNS_CATEGORY)]}],
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "effectiveDateTime": effective.isoformat(),
+        "component": [
+            {
+                "code": {"coding": [{"system": LOINC_SYSTEM, "code": VITAL_CODES[name]["code"]}]},
+                "valueQuantity": {"value": value, "unit": VITAL_CODES[name]["unit"]}
+            }
+            for name, value in zip(VITALS, values) if value == value
+        ]
+    }
+    return add_search_fields("Observation", doc)
+
+async def seed(patient_ids: list, history: int, interval: float) -> None:
+    db = await get_database()
+    await ensure_indexes(db)
+    rng = np.random.default_rng(0)
+    now = datetime.utcnow()
+    for offset in range(0, len(patient_ids), 1000):
+        batch = patient_ids[offset:offset + 1000]
+        values = random_values(rng, len(batch) * history).tolist()
+        docs = [
+            panel(patient_id, now - timedelta(hours=interval * step), values[row * history + step])
+            for row, patient_id in enumerate(batch)
+            for step in range(history)
+        ]
+        await db.observations.insert_many(docs, ordered=False)
+
+async def median_ms(run, repeat: int) -> float:
+    await run()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+async def main(url: str, database: str, patients: int, history: int, interval: float, repeat: int, keep: bool) -> None:
+    db = await open_scratch_database(url, database)
+    try:
+        patient_ids = [f"patient-{i}" for i in range(patients)]
+        await seed(patient_ids, history, interval)
+        since = (datetime.utcnow() - timedelta(hours=get_settings().RISK_SCORE_LOOKBACK_HOURS)).isoformat()
+        values = await load_latest_vitals(db, patient_ids, since)
+
+        async def resolver():
+            result = await schema.execute(QUERY, variable_values={"ids": patient_ids}, context_value=await get_context())
+            if result.errors:
+                raise RuntimeError(result.errors)
+
+        async def load_window():
+            await load_latest_vitals(db, patient_ids, since)
+
+        async def load_all():
+            await load_latest_vitals(db, patient_ids)
+
+        async def score():
+            score_vitals(patient_ids, values)
+
+        print(f"{patients} patients, {history} panels each, median of {repeat} runs")
+        print(f"patientRiskScores resolver: {await median_ms(resolver, repeat):10.1f} ms")
+        print(f"load, lookback window:      {await median_ms(load_window, repeat):10.1f} ms")
+        print(f"load, whole history:        {await median_ms(load_all, repeat):10.1f} ms")
+        print(f"score only:                 {await median_ms(score, repeat):10.1f} ms")
+    finally:
+        if not keep:
+            await db.client.drop_database(db.name)
+        await close_database()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--patients", type=int, default=50000)
+    parser.add_argument("--history", type=int, default=20, help="vital-signs panels per patient")
+    parser.add_argument("--interval", type=float, default=4.0, help="hours between a patient's panels")
+    parser.add_argument("--repeat", type=int, default=5)
+    add_database_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.database, args.patients, args.history, args.interval, args.repeat, args.keep))
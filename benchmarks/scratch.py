@@ -0,0 +1,25 @@
+# benchmarks/scratch.py
+"""The scratch database that database benchmarks seed and drop"""
+import argparse
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from app.config.database import Database
+
+def add_database_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--url", required=True, help="MongoDB to run against; the configured MONGODB_URL is never used")
+    parser.add_argument("--database", default="fhir_benchmark", help="scratch database, which must be empty")
+    parser.add_argument("--keep", action="store_true", help="keep the benchmark database")
+
+async def open_scratch_database(url: str, name: str) -> AsyncIOMotorDatabase:
+    """Point the app at an empty database on url.
+
+    Benchmarks drop their database afterwards, so one that already holds
+    collections is refused rather than risk dropping real data.
+    """
+    client = AsyncIOMotorClient(url)
+    db = client[name]
+    if await db.list_collection_names():
+        client.close()
+        raise SystemExit(f"Database {name} is not empty, refusing to use it as a scratch database")
+    Database.client = client
+    Database.db = db
+    return db
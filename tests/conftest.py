@@ -0,0 +1,32 @@
+# tests/conftest.py
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from app.config.database import Database
+from app.graphql.context import get_context
+from app.graphql.extensions.cost import cost_budgets
+from app.graphql.schema import schema
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def db():
+    """An in-memory database in place of the configured MongoDB"""
+    Database.client = AsyncMongoMockClient()
+    Database.db = Database.client["fhir_test"]
+    Database.read_db = None
+    Database.transactions = False
+    yield Database.db
+    Database.client = None
+    Database.db = None
+    Database.read_db = None
+    Database.transactions = None
+    cost_budgets._buckets.clear()
+
+@pytest.fixture
+def execute(db):
+    """Run a GraphQL operation with a fresh request context"""
+    async def run(query, variables=None):
+        return await schema.execute(query, variable_values=variables, context_value=await get_context())
+    return run
@@ -0,0 +1,35 @@
+# tests/test_analytics.py
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.db.analytics import resolve_vital, vital_statistics, vital_values_pipeline
+
+pytestmark = pytest.mark.anyio
+
+HEART_RATE = "8867-4"
+
+def test_vitals_resolve_by_name_or_code():
+    assert resolve_vital("heart_rate")[1]["code"] == HEART_RATE
+    assert resolve_vital(HEART_RATE)[0] == "heart_rate"
+    with pytest.raises(ValueError):
+        resolve_vital("0000-0")
+
+def test_pipeline_matches_one_component_in_the_utc_window():
+    # 2024-01-02T01:00+02:00 is 2024-01-01T23:00 UTC
+    start = datetime(2024, 1, 2, 1, tzinfo=timezone(timedelta(hours=2)))
+
+    pipeline = vital_values_pipeline(HEART_RATE, start, start + timedelta(hours=1), ["p1"])
+
+    param = {
+        "code": HEART_RATE,
+        "date": {"$gte": "2024-01-01T23:00:00", "$lt": "2024-01-02T00:00:00"},
+        "value": {"$ne": None},
+        "patient": {"$in": ["p1"]}
+    }
+    assert pipeline[0] == {"$match": {"search_params": {"$elemMatch": param}}}
+    # Other components of the matched documents are dropped after the unwind
+    assert pipeline[3] == {"$match": {f"search_params.{key}": value for key, value in param.items()}}
+
+@pytest.mark.parametrize("bins, low, high", [(0, 50, 100), (10, 100, 50)])
+async def test_statistics_reject_invalid_ranges(db, bins, low, high):
+    with pytest.raises(ValueError):
+        await vital_statistics(db, HEART_RATE, datetime(2024, 1, 1), datetime(2024, 1, 2), low, high, bins=bins)
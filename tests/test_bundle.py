@@ -0,0 +1,142 @@
+# tests/test_bundle.py
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import app.db.bulk as bulk
+from app.config.database import Database
+from app.db.bulk import ingest_bundle
+
+pytestmark = pytest.mark.anyio
+
+OBSERVATION = {
+    "resourceType": "Observation",
+    "status": "final",
+    "code": {"coding": [{"system": "http://loinc.org", "code": "85353-1"}]},
+    "subject": {"reference": "Patient/p1"},
+    "effectiveDateTime": "2024-01-01T10:00:00Z"
+}
+
+# Shaped like the output of the createAllergyIntolerance mutation
+ALLERGY = {
+    "resourceType": "AllergyIntolerance",
+    "code": {"coding": [{"system": "http://snomed.info/sct", "code": "227493005", "display": "Cashew nuts"}]},
+    "clinicalStatus": {"coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/allergyintolerance-clinical",
+        "code": "active"
+    }]},
+    "verificationStatus": {"coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/allergyintolerance-verification",
+        "code": "confirmed"
+    }]},
+    "patient": {"reference": "Patient/p1"},
+    "criticality": "high",
+    "recordedDate": "2024-01-01",
+    "reaction": [{"manifestation": [{"coding": [{"system": "http://snomed.info/sct", "code": "39579001", "display": "Anaphylaxis"}]}]}]
+}
+
+def batch(*resources, bundle_type="batch"):
+    return {
+        "resourceType": "Bundle",
+        "type": bundle_type,
+        "entry": [{"resource": resource, "request": {"method": "POST", "url": "Observation"}} for resource in resources]
+    }
+
+async def test_batch_creates_valid_entries_and_reports_invalid_ones(db):
+    result = await ingest_bundle(db, batch(OBSERVATION, {"resourceType": "Observation"}, OBSERVATION))
+
+    statuses = [entry["response"]["status"] for entry in result["entry"]]
+    assert result["type"] == "batch-response"
+    assert statuses == ["201 Created", "400 Bad Request", "201 Created"]
+    assert await db.observations.count_documents({}) == 2
+    assert await db.observations_history.count_documents({}) == 2
+
+async def test_transaction_with_invalid_entry_writes_nothing(db):
+    with pytest.raises(ValueError, match="Transaction rejected"):
+        await ingest_bundle(db, batch(OBSERVATION, {"resourceType": "Observation"}, bundle_type="transaction"))
+    assert await db.observations.count_documents({}) == 0
+
+async def test_history_write_error_is_reported_per_entry(db, monkeypatch):
+    history_collection = bulk.history_collection
+
+    class FailFirstInsert:
+        def __init__(self, collection):
+            self.collection = collection
+
+        async def bulk_write(self, requests, ordered):
+            await self.collection.bulk_write(requests[1:], ordered=ordered)
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 2, "errmsg": "history write failed"}]})
+
+    monkeypatch.setattr(bulk, "history_collection", lambda db, resource_type: FailFirstInsert(history_collection(db, resource_type)))
+
+    result = await ingest_bundle(db, batch(OBSERVATION, OBSERVATION))
+
+    first, second = (entry["response"] for entry in result["entry"])
+    assert first["status"] == "400 Bad Request"
+    assert first["outcome"]["issue"][0]["diagnostics"] == "history write failed"
+    assert second["status"] == "201 Created"
+    # No live document is left without its history
+    live_ids = {doc["id"] async for doc in db.observations.find()}
+    history_ids = {doc["id"] async for doc in db.observations_history.find()}
+    assert live_ids == history_ids
+    assert len(live_ids) == 1
+
+async def test_resources_are_validated_as_r4(db):
+    # R5 wraps manifestation codes in a CodeableReference
+    r5_allergy = {
+        **ALLERGY,
+        "reaction": [{"manifestation": [{"concept": {"coding": [{"system": "http://snomed.info/sct", "code": "39579001"}]}}]}]
+    }
+
+    result = await ingest_bundle(db, batch(ALLERGY, r5_allergy))
+
+    assert [entry["response"]["status"] for entry in result["entry"]] == ["201 Created", "400 Bad Request"]
+
+async def test_transaction_is_rejected_without_transaction_support(db):
+    with pytest.raises(ValueError, match="replica set"):
+        await ingest_bundle(db, batch(OBSERVATION, OBSERVATION, bundle_type="transaction"))
+    assert await db.observations.count_documents({}) == 0
+
+class FakeSession:
+    """Runs a transaction callback against the in-memory database, which has no sessions"""
+
+    def __init__(self):
+        self.transactions = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def with_transaction(self, callback):
+        self.transactions += 1
+        # The in-memory collections refuse any session argument
+        return await callback(None)
+
+@pytest.fixture
+def session(db, monkeypatch):
+    fake = FakeSession()
+
+    async def start_session():
+        return fake
+
+    monkeypatch.setattr(Database, "transactions", True)
+    monkeypatch.setattr(db.client, "start_session", start_session, raising=False)
+    return fake
+
+async def test_transaction_writes_every_entry_in_one_transaction(db, session):
+    result = await ingest_bundle(db, batch(OBSERVATION, ALLERGY, OBSERVATION, bundle_type="transaction"))
+
+    assert result["type"] == "transaction-response"
+    assert [entry["response"]["status"] for entry in result["entry"]] == ["201 Created"] * 3
+    assert session.transactions == 1
+    assert await db.observations.count_documents({}) == 2
+    assert await db.allergyintolerance_history.count_documents({}) == 1
+
+async def test_failed_transaction_reports_no_partial_success(db, session, monkeypatch):
+    async def failing(callback):
+        raise DuplicateKeyError("E11000 duplicate key")
+
+    monkeypatch.setattr(session, "with_transaction", failing)
+
+    with pytest.raises(ValueError, match="no entry was created"):
+        await ingest_bundle(db, batch(OBSERVATION, OBSERVATION, bundle_type="transaction"))
@@ -0,0 +1,78 @@
+# tests/test_cache.py
+import pytest
+import app.db.cache as cache_module
+from app.db.cache import CacheBackend, InMemoryLRUCache, ResourceCache
+
+pytestmark = pytest.mark.anyio
+
+DOC = {"id": "o1", "meta": {"versionId": "2"}, "status": "final"}
+
+@pytest.fixture
+def cache():
+    return ResourceCache(InMemoryLRUCache(10), enabled=True, ttl=30)
+
+@pytest.fixture
+def loads():
+    return []
+
+@pytest.fixture
+def load(loads):
+    async def load(projection):
+        loads.append(projection)
+        return dict(DOC)
+    return load
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+async def test_current_counts_one_lookup_per_call(cache, load, loads):
+    assert await cache.current("Observation", "o1", load) == DOC
+    assert await cache.current("Observation", "o1", load) == DOC
+    assert await cache.current("Observation", "o1", load) == DOC
+
+    assert len(loads) == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (2, 1)
+
+async def test_version_counts_one_lookup_per_call(cache, load, loads):
+    await cache.version("Observation", "o1", "2", load)
+    await cache.version("Observation", "o1", "2", load)
+
+    assert len(loads) == 1
+    assert (cache.stats()["hits"], cache.stats()["misses"]) == (1, 1)
+
+async def test_invalidate_drops_current_pointer_and_remembers_deletes(cache, load, loads):
+    await cache.current("Observation", "o1", load)
+    await cache.invalidate("Observation", "o1")
+    await cache.current("Observation", "o1", load)
+    assert len(loads) == 2
+
+    await cache.invalidate("Observation", "o1", deleted=True)
+    assert await cache.current("Observation", "o1", load) is None
+    assert await cache.version("Observation", "o1", "2", load) is None
+    assert len(loads) == 2
+
+async def test_deletes_are_forgotten_after_ttl(cache, load, loads, monkeypatch):
+    await cache.invalidate("Observation", "o1", deleted=True)
+    now = cache_module.time.monotonic()
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now + 31)
+
+    assert await cache.current("Observation", "o1", load) == DOC
+    assert len(loads) == 1
+
+async def test_lru_evicts_least_recently_used():
+    backend = InMemoryLRUCache(2)
+    await backend.set("a", {"v": 1})
+    await backend.set("b", {"v": 2})
+    await backend.get("a")
+    await backend.set("c", {"v": 3})
+
+    assert await backend.get("b") is None
+    assert await backend.get("a") == {"v": 1}
+    assert backend.stats()["evictions"] == 1
+
+async def test_disabled_cache_always_loads_with_projection(load, loads):
+    cache = ResourceCache(InMemoryLRUCache(10), enabled=False, ttl=30)
+    await cache.current("Observation", "o1", load, projection={"status": 1})
+    await cache.current("Observation", "o1", load, projection={"status": 1})
+    assert loads == [{"status": 1}, {"status": 1}]
@@ -0,0 +1,204 @@
+# tests/test_change_streams.py
+import asyncio
+import pytest
+from pymongo.errors import OperationFailure
+import app.db.change_streams as change_streams
+from app.config.settings import get_settings
+from app.db.change_streams import (
+    ChangeStreamHub,
+    SubscriptionLost,
+    decode_resume_token,
+    encode_resume_token
+)
+
+pytestmark = pytest.mark.anyio
+
+class FakeStream:
+    def __init__(self, oplog, position):
+        self.oplog = oplog
+        self.position = position
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def try_next(self):
+        if self.oplog.failure is not None:
+            raise self.oplog.failure
+        if self.position >= len(self.oplog.changes):
+            return None
+        change = self.oplog.changes[self.position]
+        self.position += 1
+        self.resume_token = change["_id"]
+        return change
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            change = await self.try_next()
+            if change is not None:
+                return change
+            async with self.oplog.appended:
+                await self.oplog.appended.wait()
+
+class FakeOplog:
+    """Insert events of one collection, watched like a change stream"""
+
+    def __init__(self):
+        self.changes = []
+        self.truncated = set()
+        self.failure = None
+        self.appended = asyncio.Condition()
+        # Inserted just before the next stream from now on opens
+        self.before_open = []
+
+    def watch(self, pipeline, resume_after=None):
+        if resume_after is None:
+            for id in self.before_open:
+                self._append(id, None)
+            self.before_open = []
+            return FakeStream(self, len(self.changes))
+        if resume_after["_data"] in self.truncated:
+            raise OperationFailure("Resume point lost", code=286)
+        position = next(i for i, change in enumerate(self.changes) if change["_id"] == resume_after)
+        return FakeStream(self, position + 1)
+
+    def _append(self, id, patient):
+        self.changes.append({
+            "_id": {"_data": f"{len(self.changes):08d}"},
+            "fullDocument": {"id": id, "patient": patient}
+        })
+
+    async def insert(self, id, patient=None):
+        self._append(id, patient)
+        async with self.appended:
+            self.appended.notify_all()
+
+    async def fail(self, error):
+        self.failure = error
+        async with self.appended:
+            self.appended.notify_all()
+
+@pytest.fixture
+def oplog(monkeypatch):
+    oplog = FakeOplog()
+
+    async def get_database():
+        return {"observations": oplog}
+
+    monkeypatch.setattr(change_streams, "get_database", get_database)
+    return oplog
+
+@pytest.fixture
+def hub(oplog):
+    hub = ChangeStreamHub("observations", [])
+    yield hub
+    hub.stop()
+
+async def take(changes, count):
+    return [(await asyncio.wait_for(changes.__anext__(), 1))["fullDocument"]["id"] for _ in range(count)]
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_resume_token_round_trips_through_cursor():
+    token = {"_data": "8263A1B2C3000000012B022C0100296E5A1004"}
+    assert decode_resume_token(encode_resume_token(token)) == token
+    with pytest.raises(ValueError):
+        decode_resume_token("not a cursor")
+
+async def test_subscriber_gets_live_changes(hub, oplog):
+    changes = hub.changes()
+    pending = asyncio.ensure_future(changes.__anext__())
+    await settle()
+    await oplog.insert("o1")
+    assert (await asyncio.wait_for(pending, 1))["fullDocument"]["id"] == "o1"
+    await oplog.insert("o2")
+    assert await take(changes, 1) == ["o2"]
+    await changes.aclose()
+
+async def test_resume_replays_missed_changes_once(hub, oplog):
+    for id in ("o1", "o2", "o3"):
+        await oplog.insert(id)
+    cursor = oplog.changes[0]["_id"]
+
+    changes = hub.changes(cursor)
+    assert await take(changes, 2) == ["o2", "o3"]
+    await settle()
+    await oplog.insert("o4")
+    assert await take(changes, 1) == ["o4"]
+    await changes.aclose()
+
+async def test_first_resume_misses_nothing_before_shared_stream_opens(hub, oplog):
+    await oplog.insert("o1")
+    # Written after the last change the replay could have read, but before
+    # the shared stream started watching
+    oplog.before_open = ["o2"]
+
+    changes = hub.changes(oplog.changes[0]["_id"])
+    assert await take(changes, 1) == ["o2"]
+    await settle()
+    await oplog.insert("o3")
+    assert await take(changes, 1) == ["o3"]
+    await changes.aclose()
+
+async def test_filtered_subscriber_is_not_cut_off_by_changes_it_does_not_want(hub, oplog, monkeypatch):
+    monkeypatch.setattr(get_settings(), "SUBSCRIPTION_QUEUE_SIZE", 2)
+    changes = hub.changes(wants=lambda change: change["fullDocument"]["patient"] == "p1")
+    pending = asyncio.ensure_future(changes.__anext__())
+    await settle()
+    for id in ("o1", "o2", "o3", "o4"):
+        await oplog.insert(id, "p2")
+        await settle()
+    await oplog.insert("o5", "p1")
+
+    assert (await asyncio.wait_for(pending, 1))["fullDocument"]["id"] == "o5"
+    await changes.aclose()
+
+async def test_slow_subscriber_is_cut_off_instead_of_losing_events(hub, oplog, monkeypatch):
+    monkeypatch.setattr(get_settings(), "SUBSCRIPTION_QUEUE_SIZE", 2)
+    changes = hub.changes()
+    pending = asyncio.ensure_future(changes.__anext__())
+    await settle()
+    for id in ("o1", "o2", "o3", "o4"):
+        await oplog.insert(id)
+        await settle()
+
+    received = [(await pending)["fullDocument"]["id"]]
+    with pytest.raises(SubscriptionLost) as lost:
+        while True:
+            received += await take(changes, 1)
+    assert lost.value.resumable
+    # Every event up to the cut-off arrived, so resuming from the last one misses nothing
+    resumed = hub.changes(oplog.changes[len(received) - 1]["_id"])
+    assert received + await take(resumed, 4 - len(received)) == ["o1", "o2", "o3", "o4"]
+    await resumed.aclose()
+
+async def test_resume_from_truncated_history_is_not_resumable(hub, oplog):
+    await oplog.insert("o1")
+    oplog.truncated.add(oplog.changes[0]["_id"]["_data"])
+
+    with pytest.raises(SubscriptionLost) as lost:
+        await take(hub.changes(oplog.changes[0]["_id"]), 1)
+    assert not lost.value.resumable
+
+async def test_history_lost_on_shared_stream_resets_token_and_tells_subscribers(hub, oplog, monkeypatch):
+    monkeypatch.setattr(change_streams, "RETRY_DELAY", 60)
+    changes = hub.changes()
+    pending = asyncio.ensure_future(changes.__anext__())
+    await settle()
+    await oplog.insert("o1")
+    await pending
+    assert hub._resume_token == oplog.changes[0]["_id"]
+
+    await oplog.fail(OperationFailure("Resume point lost", code=286))
+    with pytest.raises(SubscriptionLost) as lost:
+        await take(changes, 1)
+    assert not lost.value.resumable
+    assert hub._resume_token is None
@@ -0,0 +1,85 @@
+# tests/test_cost.py
+import pytest
+from graphql import parse
+from app.config.settings import get_settings
+from app.graphql.extensions.cost import CostEstimator, cost_budgets
+from app.graphql.schema import schema
+
+pytestmark = pytest.mark.anyio
+
+SEARCH = "searchObservations(first: {first}) {{ edges {{ node {{ id status code {{ coding {{ code system display }} }} }} }} }}"
+
+def estimate(query, variables=None):
+    return CostEstimator(schema._schema, parse(query), variables).estimate(None)
+
+def error_codes(result):
+    return [error.extensions.get("code") for error in result.errors or []]
+
+def test_first_multiplies_the_cost_of_children():
+    small = estimate("{ " + SEARCH.format(first=10) + " }")
+    large = estimate("{ " + SEARCH.format(first=100) + " }")
+    assert large.cost > small.cost * 9
+
+def test_first_is_capped_at_the_maximum_page_size():
+    max_page = get_settings().MAX_PAGE_SIZE
+    assert estimate("{ " + SEARCH.format(first=max_page) + " }") == estimate("{ " + SEARCH.format(first=max_page * 100) + " }")
+
+@pytest.mark.parametrize("first", [0, -1, -100000])
+def test_non_positive_first_never_lowers_the_cost(first):
+    query = '{ allergyIntoleranceHistory(id: "x", first: %d) { id } a: %s }' % (first, SEARCH.format(first=500))
+    baseline = estimate('{ a: %s }' % SEARCH.format(first=500))
+    assert estimate(query).cost > baseline.cost
+
+def test_first_from_variables_is_used():
+    query = "query($n: Int) { " + SEARCH.format(first="$n") + " }"
+    assert estimate(query, {"n": 100}) == estimate("{ " + SEARCH.format(first=100) + " }")
+    assert estimate(query, {"n": -5}).cost > 0
+
+def test_depth_and_aliases_are_counted():
+    result = estimate("{ a: observation(id: \"1\") { subject { resource { ... on Observation { id } } } } b: observation(id: \"2\") { id } }")
+    assert result.aliases == 2
+    assert result.depth == 4
+
+async def test_costly_query_is_rejected_before_execution(execute, monkeypatch):
+    monkeypatch.setattr(get_settings(), "GRAPHQL_MAX_QUERY_COST", 1000)
+    query = '{ allergyIntoleranceHistory(id: "x", first: -100000) { id } a: %s b: %s }' % (
+        SEARCH.format(first=500), SEARCH.format(first=500)
+    )
+
+    result = await execute(query)
+
+    assert error_codes(result) == ["QUERY_TOO_COSTLY"]
+    assert result.data is None
+
+async def test_too_many_aliases_are_rejected(execute, monkeypatch):
+    monkeypatch.setattr(get_settings(), "GRAPHQL_MAX_ALIASES", 2)
+    result = await execute('{ a: observation(id: "1") { id } b: observation(id: "1") { id } c: observation(id: "1") { id } }')
+    assert error_codes(result) == ["TOO_MANY_ALIASES"]
+
+async def test_budget_is_charged_actual_cost_and_enforced(execute, monkeypatch):
+    monkeypatch.setattr(get_settings(), "GRAPHQL_COST_BUDGET_PER_MINUTE", 10000)
+    query = "{ " + SEARCH.format(first=500) + " }"
+    cost = estimate(query).cost
+    assert cost > 10000
+
+    result = await execute(query)
+    assert error_codes(result) == ["COST_BUDGET_EXCEEDED"]
+
+    result = await execute("{ " + SEARCH.format(first=10) + " }")
+    assert result.errors is None
+    # Nothing matched, so only the fields actually resolved were charged
+    actual = result.extensions["cost"]["actual"]
+    assert actual < result.extensions["cost"]["estimated"]
+    assert cost_budgets.remaining("anonymous") >= 10000 - actual
+
+async def test_actual_cost_counts_the_fields_in_the_response(db, execute):
+    await db.observations.insert_many([
+        {"id": f"o{i}", "resourceType": "Observation", "status": "final", "effectiveDateTime": "2024-01-01"}
+        for i in range(2)
+    ])
+
+    result = await execute("{ searchObservations(first: 10) { edges { node { id status __typename } } } }")
+
+    assert result.errors is None
+    # searchObservations and edges, then node, id and status for each of the two edges
+    assert result.extensions["cost"]["actual"] == 2 + 2 * 3
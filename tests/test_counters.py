@@ -0,0 +1,35 @@
+# tests/test_counters.py
+import asyncio
+import pytest
+from app.db.counters import BlockCounter
+
+pytestmark = pytest.mark.anyio
+
+@pytest.mark.parametrize("stripes", [1, 3])
+async def test_processes_never_issue_the_same_number(db, stripes):
+    # Separate counters stand for separate processes sharing the collection
+    processes = [BlockCounter("Observation", block_size=7, stripes=stripes) for _ in range(3)]
+
+    issued = await asyncio.gather(*(process.next(db) for process in processes for _ in range(50)))
+
+    assert len(set(issued)) == len(issued) == 150
+
+async def test_stripe_count_is_kept_from_the_first_counter(db):
+    await BlockCounter("Observation", block_size=5, stripes=4).next(db)
+    later = BlockCounter("Observation", block_size=5, stripes=1)
+
+    await later.next(db)
+
+    assert later.stripes == 4
+
+async def test_unissued_numbers_are_reported_as_wasted(db):
+    counter = BlockCounter("Observation", block_size=10, stripes=1)
+    for _ in range(3):
+        await counter.next(db)
+
+    assert counter.stats()["wasted"] == 7
+    counter.release()
+    await counter.next(db)
+
+    stats = counter.stats()
+    assert (stats["leased"], stats["issued"], stats["remaining"], stats["wasted"]) == (20, 4, 9, 16)
@@ -0,0 +1,53 @@
+# tests/test_database.py
+import httpx
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from app.config.database import Database, get_read_database
+from app.config.settings import get_settings
+from app.main import app
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def client():
+    # Never connects: nothing here sends a command
+    Database.client = AsyncIOMotorClient("mongodb://localhost:1", connect=False)
+    Database.db = Database.client["fhir_test"]
+    yield Database.client
+    Database.client.close()
+    Database.client = Database.db = Database.read_db = None
+
+async def test_reads_prefer_secondaries_within_the_staleness_bound(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "MONGODB_SECONDARY_READS", True)
+    monkeypatch.setattr(get_settings(), "MONGODB_MAX_STALENESS_SECONDS", 120)
+
+    db = await get_read_database()
+
+    assert db.name == "fhir_test"
+    assert db.read_preference == SecondaryPreferred(max_staleness=120)
+
+async def test_reads_stay_on_the_primary_when_secondary_reads_are_off(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "MONGODB_SECONDARY_READS", False)
+
+    assert (await get_read_database()).read_preference == Primary()
+
+async def test_read_database_follows_a_new_client(client, monkeypatch):
+    first = await get_read_database()
+    client.close()
+    Database.client = AsyncIOMotorClient("mongodb://localhost:2", connect=False)
+    Database.db = Database.client["fhir_test"]
+
+    second = await get_read_database()
+
+    assert second is not first and second.client is Database.client
+
+async def test_health_reports_starting_until_warm(monkeypatch):
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+    monkeypatch.setattr(Database, "ready", False)
+    starting = await http.get("/health")
+    monkeypatch.setattr(Database, "ready", True)
+    healthy = await http.get("/health")
+
+    assert (starting.status_code, healthy.status_code) == (503, 200)
@@ -0,0 +1,42 @@
+# tests/test_datatypes.py
+import dataclasses
+import pytest
+from app.core.constants import VITAL_SIGNS_CATEGORY
+from app.fhir.types.base import CodeableConcept, Coding, Quantity
+
+pytestmark = pytest.mark.anyio
+
+def test_constant_codings_are_shared_and_frozen():
+    first = Coding.from_dict(dict(VITAL_SIGNS_CATEGORY))
+    second = Coding.from_dict(dict(VITAL_SIGNS_CATEGORY))
+
+    assert first is second
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        first.display = "Changed"
+    assert Coding.from_dict(dict(VITAL_SIGNS_CATEGORY)).display == VITAL_SIGNS_CATEGORY["display"]
+
+def test_other_codings_are_built_per_document():
+    data = {"system": "http://snomed.info/sct", "code": "91936005", "display": "Allergy to penicillin"}
+    assert Coding.from_dict(data) == Coding.from_dict(data)
+    assert Coding.from_dict(data) is not Coding.from_dict(data)
+
+def test_datatypes_are_slotted():
+    quantity = Quantity.from_dict({"value": 72, "unit": "/min", "code": "/min"})
+    concept = CodeableConcept.from_dict({"coding": [dict(VITAL_SIGNS_CATEGORY)], "text": "Vital Signs"})
+    assert not hasattr(quantity, "__dict__")
+    assert not hasattr(concept, "__dict__")
+    assert quantity.system == "http://unitsofmeasure.org"
+
+async def test_shared_codings_resolve_through_graphql(db, execute):
+    await db.observations.insert_one({
+        "id": "o1",
+        "resourceType": "Observation",
+        "status": "final",
+        "category": [{"coding": [dict(VITAL_SIGNS_CATEGORY)]}],
+        "effectiveDateTime": "2024-01-01T00:00:00"
+    })
+
+    result = await execute('{ observation(id: "o1") { category { coding { system code display } } } }')
+
+    assert result.errors is None
+    assert result.data["observation"]["category"] == [{"coding": [VITAL_SIGNS_CATEGORY]}]
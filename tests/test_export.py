@@ -0,0 +1,79 @@
+# tests/test_export.py
+import gzip
+from datetime import datetime, timedelta
+import json
+import pytest
+from bson import ObjectId
+from pymongo.errors import AutoReconnect
+from app.config.settings import get_settings
+from app.db import export
+from app.db.export import export_file_path, run_export_job
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "EXPORT_DIR", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "EXPORT_BATCH_SIZE", 2)
+
+async def create_job(db, compressed):
+    # Recorded without starting the background task that create_export_job would
+    job = {
+        "_id": "job1",
+        "status": "in-progress",
+        "since": None,
+        "compressed": compressed,
+        "outputs": [{"type": "Observation", "count": 0, "offset": 0, "crc": 0, "size": 0, "lastId": None, "done": False}],
+        "leaseUntil": datetime.utcnow(),
+        "error": None
+    }
+    await db.export_jobs.insert_one(job)
+    await db.observations.insert_many([
+        {"_id": ObjectId(), "id": f"o{index}", "resourceType": "Observation", "status": "final"} for index in range(5)
+    ])
+
+def exported_ids(compressed):
+    path = export_file_path("job1", "Observation", compressed)
+    with (gzip.open(path) if compressed else open(path, "rb")) as f:
+        return [json.loads(line)["id"] for line in f]
+
+@pytest.mark.parametrize("compressed", [False, True])
+async def test_export_writes_every_resource_once(db, settings, compressed):
+    await create_job(db, compressed)
+
+    assert await run_export_job(db, "job1")
+
+    job = await db.export_jobs.find_one({"_id": "job1"})
+    assert job["status"] == "completed"
+    assert job["outputs"][0]["count"] == 5
+    assert exported_ids(compressed) == [f"o{index}" for index in range(5)]
+
+@pytest.mark.parametrize("compressed", [False, True])
+async def test_interrupted_export_resumes_from_its_checkpoint(db, settings, monkeypatch, compressed):
+    await create_job(db, compressed)
+    write_at = export._write_at
+    writes = []
+
+    def flaky_write_at(path, offset, data):
+        writes.append(offset)
+        if len(writes) == 2:
+            raise AutoReconnect("connection lost")
+        return write_at(path, offset, data)
+
+    monkeypatch.setattr(export, "_write_at", flaky_write_at)
+    with pytest.raises(AutoReconnect):
+        await run_export_job(db, "job1")
+    # The lease of the interrupted worker runs out
+    await db.export_jobs.update_one({"_id": "job1"}, {"$set": {"leaseUntil": datetime.utcnow()}})
+
+    assert await run_export_job(db, "job1")
+    assert exported_ids(compressed) == [f"o{index}" for index in range(5)]
+
+async def test_leased_job_is_left_to_its_worker(db, settings):
+    await create_job(db, compressed=False)
+    await db.export_jobs.update_one(
+        {"_id": "job1"},
+        {"$set": {"leaseUntil": datetime.utcnow() + timedelta(minutes=5)}}
+    )
+
+    assert not await run_export_job(db, "job1")
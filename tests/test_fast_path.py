@@ -0,0 +1,174 @@
+# tests/test_fast_path.py
+from collections import OrderedDict
+import bson
+import httpx
+import pytest
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+from pymongo.errors import PyMongoError
+from strawberry.fastapi import GraphQLRouter
+import app.graphql.fast_path as fast_path
+from app.config.settings import get_settings
+from app.graphql.context import get_context
+from app.graphql.extensions.cost import cost_budgets
+from app.graphql.extensions.persisted_queries import document_cache
+from app.graphql.fast_path import GraphQLFastPath
+from app.graphql.schema import schema
+
+pytestmark = pytest.mark.anyio
+
+QUERY = 'query($n: Int) { searchObservations(patientId: "p1", first: $n) { pageInfo { hasNextPage } edges { node { id status } } } }'
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(get_settings(), "GRAPHQL_FAST_PATH_ENABLED", True)
+    # Only documents the regular endpoint validated in this test are served
+    monkeypatch.setattr(document_cache, "_documents", OrderedDict())
+    app = FastAPI()
+    app.add_middleware(GraphQLFastPath, schema=schema)
+    app.include_router(GraphQLRouter(schema, context_getter=get_context), prefix="/graphql")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+class FakeFetch:
+    """Stands in for the aggregation, which the in-memory database cannot run"""
+
+    def __init__(self):
+        self.plans = []
+        self.error = None
+
+    async def __call__(self, db, plan):
+        self.plans.append(plan)
+        if self.error is not None:
+            raise self.error
+        doc = {"_id": ObjectId(), "sort": "2024-01-01", "node": {"id": "o1", "status": "final"}}
+        return [RawBSONDocument(bson.encode(doc))], False, None
+
+@pytest.fixture
+def fetches(monkeypatch):
+    fetch = FakeFetch()
+    monkeypatch.setattr(fast_path, "fetch_page", fetch)
+    return fetch
+
+@pytest.fixture
+def charges(monkeypatch):
+    calls = []
+    charge = cost_budgets.charge
+
+    def spy(client, cost):
+        calls.append(cost)
+        charge(client, cost)
+
+    monkeypatch.setattr(cost_budgets, "charge", spy)
+    return calls
+
+async def test_cached_search_is_served_by_the_fast_path(client, fetches):
+    # The first request parses and validates the document through the regular endpoint
+    regular = await client.post("/graphql", json={"query": QUERY, "variables": {"n": 5}})
+    assert regular.status_code == 200 and not fetches.plans
+
+    response = await client.post("/graphql", json={"query": QUERY, "variables": {"n": 5}})
+
+    assert len(fetches.plans) == 1 and fetches.plans[0].limit == 5
+    assert response.json() == {"data": {"searchObservations": {
+        "pageInfo": {"hasNextPage": False},
+        "edges": [{"node": {"id": "o1", "status": "final"}}]
+    }}}
+
+@pytest.mark.parametrize("payload", [
+    {"query": 123},
+    {"query": ["not", "a", "query"]},
+    {"query": QUERY, "variables": "n=5"},
+    {"query": QUERY, "operationName": 5},
+    {"extensions": "persisted"},
+    {"extensions": {"persistedQuery": {"sha256Hash": 1}}},
+    {"extensions": {"persistedQuery": "abc"}}
+])
+async def test_malformed_payloads_are_left_to_the_regular_endpoint(client, fetches, payload):
+    await client.post("/graphql", json={"query": QUERY})
+    fetches.plans.clear()
+
+    response = await client.post("/graphql", json=payload)
+
+    assert response.status_code < 500
+    assert not fetches.plans
+
+async def test_failed_fetch_refunds_the_estimate_before_falling_back(client, fetches, charges):
+    await client.post("/graphql", json={"query": QUERY, "variables": {"n": 5}})
+    fetches.error = PyMongoError("connection reset")
+    charges.clear()
+
+    response = await client.post("/graphql", json={"query": QUERY, "variables": {"n": 5}})
+
+    assert len(fetches.plans) == 1
+    # Only the regular execution's actual cost stays charged
+    assert sum(charges) == response.json()["extensions"]["cost"]["actual"]
+
+async def test_fast_path_records_operation_and_resolver_metrics(client, fetches):
+    def count(name, labels):
+        return REGISTRY.get_sample_value(f"{name}_count", labels) or 0
+
+    resolver = {"field": "Query.searchObservations"}
+    operation = {"operation_type": "query", "status": "ok"}
+    await client.post("/graphql", json={"query": QUERY})
+    resolvers, operations = count("graphql_resolver_seconds", resolver), count("graphql_operation_seconds", operation)
+
+    await client.post("/graphql", json={"query": QUERY})
+
+    assert len(fetches.plans) == 1
+    assert count("graphql_resolver_seconds", resolver) == resolvers + 1
+    assert count("graphql_operation_seconds", operation) == operations + 1
+
+# Float fields are left out: the in-memory database has no $toDouble
+PARITY_QUERIES = [
+    'query { searchObservations(patientId: "p1", first: 5) { edges { node {'
+    ' id status meta { versionId source profile } subject { reference type }'
+    ' valueQuantity { unit system code } method { text coding { code } } device { reference type }'
+    ' performer { reference type } component { code { coding { code } } valueQuantity { unit system } } } } } }',
+    'query { searchAllergies(patientId: "p1", first: 5) { edges { node {'
+    ' id criticality patient { reference type } reaction { manifestation { coding { code } } onsetAge { unit system } } } } } }'
+]
+
+@pytest.fixture
+def decoded_fetch(db, monkeypatch):
+    """The real aggregation, read as dicts since the in-memory database cannot return raw BSON"""
+    fetch_page = fast_path.fetch_page
+    fetched = []
+
+    async def fetch(db, plan):
+        docs, has_next_page, total = await fetch_page(db, plan)
+        fetched.append(plan)
+        return [RawBSONDocument(bson.encode(doc)) for doc in docs], has_next_page, total
+
+    monkeypatch.setattr(type(db.observations), "with_options", lambda collection, codec_options: collection, raising=False)
+    monkeypatch.setattr(fast_path, "fetch_page", fetch)
+    return fetched
+
+async def test_fast_path_answers_like_the_resolvers(client, db, decoded_fetch):
+    await db.observations.insert_many([
+        {
+            "id": "o1", "resourceType": "Observation", "status": "final", "meta": {"source": "s"},
+            "subject": {"reference": "Patient/p1"}, "patient_id": "p1", "effectiveDateTime": "2024-01-02",
+            "valueQuantity": {}, "method": {}, "component": [{"code": {"coding": [{"code": "8867-4"}]}, "valueQuantity": {"unit": "/min"}}]
+        },
+        {
+            "id": "o2", "resourceType": "Observation", "status": "final", "meta": {"versionId": "2"},
+            "subject": {"reference": "Patient/p1", "type": "Group"}, "patient_id": "p1", "effectiveDateTime": "2024-01-01",
+            "valueQuantity": {"unit": "kg", "system": "urn:other", "code": "kg"}, "device": {"reference": "Device/d1"},
+            "performer": [], "component": []
+        }
+    ])
+    await db.allergyintolerance.insert_one({
+        "id": "a1", "resourceType": "AllergyIntolerance", "criticality": "high", "recordedDate": "2024-01-01",
+        "patient": {"reference": "Patient/p1"}, "patientId": "p1",
+        "reaction": [{"manifestation": [{"coding": [{"code": "39579001"}]}], "onsetAge": {}}, {"manifestation": []}]
+    })
+
+    for query in PARITY_QUERIES:
+        regular = (await client.post("/graphql", json={"query": query})).json()
+        fast = (await client.post("/graphql", json={"query": query})).json()
+        assert "errors" not in regular
+        assert all(connection["edges"] for connection in regular["data"].values())
+        assert fast == {"data": regular["data"]}
+    assert len(decoded_fetch) == len(PARITY_QUERIES)
@@ -0,0 +1,150 @@
+# tests/test_import.py
+import gzip
+import json
+from datetime import datetime
+import pytest
+from pymongo.errors import AutoReconnect
+import app.db.bulk as bulk
+from app.config.settings import get_settings
+from app.db.bulk import import_ndjson, ndjson_lines
+from app.db.cache import InMemoryLRUCache, resource_cache
+from app.db.export import export_file_path, run_export_job
+from app.fhir.utils.helpers import to_fhir_resource
+
+pytestmark = pytest.mark.anyio
+
+OBSERVATION = {
+    "resourceType": "Observation",
+    "status": "final",
+    "code": {"coding": [{"system": "http://loinc.org", "code": "85353-1"}]},
+    "subject": {"reference": "Patient/p1"},
+    "effectiveDateTime": "2024-01-01T10:00:00Z"
+}
+
+CREATE_ALLERGY = """
+mutation {
+  createAllergyIntolerance(allergyData: {
+    patientId: "p1", code: "227493005", codeDisplay: "Cashew nuts", criticality: "high",
+    reactions: [{
+      manifestation: [{system: "http://snomed.info/sct", code: "39579001", display: "Anaphylaxis"}]
+    }]
+  }) { id }
+}
+"""
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+def ndjson(count):
+    return [json.dumps(OBSERVATION).encode() for _ in range(count)]
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(get_settings(), "BULK_WRITE_BATCH_SIZE", 2)
+
+async def test_ndjson_lines_splits_chunks_and_gzip_members():
+    text = b'{"a": 1}\n\n{"b": 2}\n{"c": 3}'
+    assert [line async for line in ndjson_lines(stream(text[:5], text[5:]))] == [b'{"a": 1}', b'{"b": 2}', b'{"c": 3}']
+
+    compressed = gzip.compress(b'{"a": 1}\n') + gzip.compress(b'{"b": 2}\n')
+    assert [line async for line in ndjson_lines(stream(compressed[:7], compressed[7:]), compressed=True)] == [b'{"a": 1}', b'{"b": 2}']
+
+async def test_import_counts_every_line(db, small_batches):
+    lines = ndjson(3) + [b"not json", json.dumps({"resourceType": "Encounter"}).encode()] + ndjson(2)
+
+    report = await import_ndjson(db, stream(*lines))
+
+    assert (report.lines, report.imported, report.failed) == (7, 5, 2)
+    assert [error["line"] for error in report.errors] == [4, 5]
+    assert await db.observations.count_documents({}) == 5
+    assert await db.observations_history.count_documents({}) == 5
+
+async def test_import_clears_cached_deletes_of_its_ids(db, monkeypatch):
+    monkeypatch.setattr(resource_cache, "enabled", True)
+    monkeypatch.setattr(resource_cache, "backend", InMemoryLRUCache(10))
+    id = "65a1b2c3d4e5f60718293a4b"
+    await resource_cache.invalidate("Observation", id, deleted=True)
+
+    await import_ndjson(db, stream(json.dumps({**OBSERVATION, "id": id}).encode()))
+
+    async def load(projection):
+        return await db.observations.find_one({"id": id}, projection)
+
+    assert (await resource_cache.current("Observation", id, load))["id"] == id
+
+async def test_failed_batch_write_is_reported_not_lost(db, small_batches, monkeypatch):
+    write_resources = bulk.write_resources
+    calls = []
+
+    async def flaky(db, resource_type, entries, outcomes):
+        calls.append(len(entries))
+        if len(calls) == 2:
+            raise AutoReconnect("connection lost")
+        await write_resources(db, resource_type, entries, outcomes)
+
+    monkeypatch.setattr(bulk, "write_resources", flaky)
+
+    report = await import_ndjson(db, stream(*ndjson(6)))
+
+    assert (report.lines, report.imported, report.failed) == (6, 4, 2)
+    assert all(error["diagnostics"] == "connection lost" for error in report.errors)
+    assert await db.observations.count_documents({}) == 4
+
+async def test_unexpected_write_error_fails_the_import(db, small_batches, monkeypatch):
+    async def broken(db, resource_type, entries, outcomes):
+        raise RuntimeError("bug in a write")
+
+    monkeypatch.setattr(bulk, "write_resources", broken)
+
+    with pytest.raises(RuntimeError, match="bug in a write"):
+        await import_ndjson(db, stream(*ndjson(6)))
+
+async def test_round_trips_server_ids(db):
+    resource = {**OBSERVATION, "id": "65a1b2c3d4e5f60718293a4b"}
+    report = await import_ndjson(db, stream(json.dumps(resource).encode(), json.dumps({**OBSERVATION, "id": "mine"}).encode()))
+
+    assert (report.imported, report.failed) == (1, 1)
+    assert await db.observations.find_one({"id": "65a1b2c3d4e5f60718293a4b"}) is not None
+
+async def test_exported_resources_import_unchanged(db, execute, tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "EXPORT_DIR", str(tmp_path))
+    created = await execute(CREATE_ALLERGY)
+    assert created.errors is None
+    await db.observations.insert_one({**OBSERVATION, "id": "65a1b2c3d4e5f60718293a4b"})
+    exported = {
+        doc["id"]: to_fhir_resource(doc)
+        for collection in ("allergyintolerance", "observations")
+        async for doc in db[collection].find()
+    }
+    await db.export_jobs.insert_one({
+        "_id": "job1",
+        "status": "in-progress",
+        "since": None,
+        "compressed": False,
+        "outputs": [
+            {"type": resource_type, "count": 0, "offset": 0, "crc": 0, "size": 0, "lastId": None, "done": False}
+            for resource_type in ("AllergyIntolerance", "Observation")
+        ],
+        "leaseUntil": datetime.utcnow(),
+        "error": None
+    })
+    assert await run_export_job(db, "job1")
+    for collection in ("allergyintolerance", "allergyintolerance_history", "observations", "observations_history"):
+        await db.drop_collection(collection)
+
+    lines = []
+    for resource_type in ("AllergyIntolerance", "Observation"):
+        with open(export_file_path("job1", resource_type, False), "rb") as f:
+            lines.extend(f.read().splitlines())
+    report = await import_ndjson(db, stream(*lines))
+
+    assert (report.imported, report.failed, report.errors) == (2, 0, [])
+    allergy = await db.allergyintolerance.find_one({"id": created.data["createAllergyIntolerance"]["id"]})
+    assert allergy["reaction"][0]["manifestation"][0]["coding"][0]["code"] == "39579001"
+    for id, resource in exported.items():
+        reimported = to_fhir_resource(await db[
+            "allergyintolerance" if resource["resourceType"] == "AllergyIntolerance" else "observations"
+        ].find_one({"id": id}))
+        # Imported resources start a new version history
+        assert {**reimported, "meta": None} == {**resource, "meta": None}
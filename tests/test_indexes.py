@@ -0,0 +1,22 @@
+# tests/test_indexes.py
+import pytest
+from app.db.indexes import INDEX_REGISTRY, ensure_indexes
+
+pytestmark = pytest.mark.anyio
+
+async def test_only_missing_indexes_are_built(db):
+    expected = sum(len(indexes.live) + len(indexes.history) for indexes in INDEX_REGISTRY.values())
+
+    first = await ensure_indexes(db)
+    second = await ensure_indexes(db)
+
+    assert len(first.created) == expected
+    assert "observations.search_params.code_1_search_params.value_1" in first.created
+    assert second.created == []
+
+async def test_queries_without_a_leading_index_are_reported(db):
+    report = await ensure_indexes(db)
+
+    assert "searchAllergies(criticality)" in report.collscans
+    assert "searchObservations(code)" not in report.collscans
+    assert "allergyIntoleranceHistory(id)" not in report.collscans
@@ -0,0 +1,51 @@
+# tests/test_monitoring.py
+import pytest
+from prometheus_client import REGISTRY
+import app.db.monitoring as monitoring
+from app.config.settings import get_settings
+from app.db.monitoring import CommandMetrics
+
+class Event:
+    command_name = "find"
+    database_name = "fhir_test"
+    request_id = 1
+    connection_id = ("localhost", 27017)
+    duration_micros = 1500
+    command = {"find": "observations", "filter": {}}
+    reply = {"cursor": {"firstBatch": [{"id": "o1"}, {"id": "o2"}], "id": 0}, "ok": 1}
+
+def sample(name):
+    return REGISTRY.get_sample_value(name, {"command": "find", "collection": "observations"}) or 0
+
+@pytest.fixture
+def encodes(monkeypatch):
+    calls = []
+    encode = monitoring.bson.encode
+
+    def spy(document):
+        calls.append(document)
+        return encode(document)
+
+    monkeypatch.setattr(monitoring.bson, "encode", spy)
+    return calls
+
+def record(listener):
+    listener.started(Event)
+    listener.succeeded(Event)
+
+def test_replies_are_not_re_encoded_by_default(encodes):
+    documents = sample("mongodb_documents_returned_total")
+
+    record(CommandMetrics())
+
+    assert sample("mongodb_documents_returned_total") == documents + 2
+    assert encodes == []
+
+def test_reply_bytes_are_measured_when_enabled(encodes, monkeypatch):
+    monkeypatch.setattr(get_settings(), "MONGODB_REPLY_BYTES_METRICS_ENABLED", True)
+    reply_bytes = sample("mongodb_reply_bytes_total")
+
+    record(CommandMetrics())
+
+    assert sample("mongodb_reply_bytes_total") > reply_bytes
+    assert encodes == [Event.reply]
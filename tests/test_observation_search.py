@@ -0,0 +1,49 @@
+# tests/test_observation_search.py
+import pytest
+from app.fhir.utils.helpers import add_search_fields
+
+pytestmark = pytest.mark.anyio
+
+HEART_RATE = "8867-4"
+RESPIRATORY_RATE = "9279-1"
+
+def panel(id, patient_id, **values):
+    return add_search_fields("Observation", {
+        "id": id,
+        "resourceType": "Observation",
+        "status": "final",
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "effectiveDateTime": f"2024-01-0{id[-1]}T10:00:00",
+        "component": [
+            {"code": {"coding": [{"code": code}]}, "valueQuantity": {"value": value}}
+            for code, value in values.items()
+        ]
+    })
+
+@pytest.fixture
+async def observations(db):
+    await db.observations.insert_many([
+        panel("o1", "p1", **{HEART_RATE: 120, RESPIRATORY_RATE: 16}),
+        # Heart rate in range, but another component above it
+        panel("o2", "p1", **{HEART_RATE: 70, RESPIRATORY_RATE: 130}),
+        panel("o3", "p2", **{HEART_RATE: 125})
+    ])
+
+def ids(result):
+    assert result.errors is None
+    return [edge["node"]["id"] for edge in result.data["searchObservations"]["edges"]]
+
+async def test_code_and_value_must_match_the_same_component(execute, observations):
+    result = await execute(
+        '{ searchObservations(code: "%s", valueMin: 100) { edges { node { id } } } }' % HEART_RATE
+    )
+
+    assert sorted(ids(result)) == ["o1", "o3"]
+
+async def test_patient_narrows_the_component_match(execute, observations):
+    result = await execute(
+        '{ searchObservations(patientId: "p1", code: "%s", valueMin: 100, valueMax: 200) { edges { node { id } } } }'
+        % HEART_RATE
+    )
+
+    assert ids(result) == ["o1"]
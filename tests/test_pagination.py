@@ -0,0 +1,133 @@
+# tests/test_pagination.py
+import pytest
+from bson import ObjectId
+from app.config.settings import get_settings
+from app.graphql.pagination import decode_cursor, encode_cursor, page_size
+
+pytestmark = pytest.mark.anyio
+
+SEARCH = """
+query($first: Int, $after: String) {
+  searchObservations(patientId: "p1", first: $first, after: $after) {
+    totalCount
+    edges { cursor node { id } }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+ALLERGIES = """
+query($after: String) {
+  searchAllergies(patientId: "p1", first: 2, after: $after) {
+    edges { node { id } }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+"""
+
+HISTORY = 'query($first: Int) { allergyIntoleranceHistory(id: "a1", first: $first) { id } }'
+
+@pytest.fixture
+async def observations(db):
+    docs = [
+        {
+            "_id": ObjectId(),
+            "id": f"o{i}",
+            "resourceType": "Observation",
+            "patient_id": "p1",
+            # Two observations share every timestamp, so _id breaks the ties
+            "effectiveDateTime": f"2024-01-{i // 2 + 1:02d}T00:00:00"
+        }
+        for i in range(7)
+    ]
+    docs.append({"_id": ObjectId(), "id": "undated", "resourceType": "Observation", "patient_id": "p1"})
+    await db.observations.insert_many(docs)
+    return docs
+
+def test_page_size_defaults_and_caps():
+    settings = get_settings()
+    assert page_size(None) == settings.DEFAULT_PAGE_SIZE
+    assert page_size(1) == 1
+    assert page_size(settings.MAX_PAGE_SIZE + 1) == settings.MAX_PAGE_SIZE
+
+@pytest.mark.parametrize("first", [0, -1])
+def test_page_size_rejects_non_positive_first(first):
+    with pytest.raises(ValueError):
+        page_size(first)
+
+def test_cursor_round_trips_and_rejects_garbage():
+    _id = ObjectId()
+    assert decode_cursor(encode_cursor("2024-01-01", _id)) == ("2024-01-01", _id)
+    with pytest.raises(ValueError):
+        decode_cursor("garbage")
+
+async def test_pages_cover_every_document_once(execute, observations):
+    seen, after = [], None
+    while True:
+        result = await execute(SEARCH, {"first": 3, "after": after})
+        assert result.errors is None
+        connection = result.data["searchObservations"]
+        assert connection["totalCount"] == len(observations)
+        seen += [edge["node"]["id"] for edge in connection["edges"]]
+        if not connection["pageInfo"]["hasNextPage"]:
+            break
+        after = connection["pageInfo"]["endCursor"]
+
+    assert sorted(seen) == sorted(doc["id"] for doc in observations)
+    # Newest first, undated last
+    assert seen[0] == "o6" and seen[-1] == "undated"
+
+async def test_total_count_is_only_counted_when_selected(db, execute, observations, monkeypatch):
+    counts = []
+    count_documents = type(db.observations).count_documents
+
+    async def spy(collection, query, *args, **kwargs):
+        counts.append(query)
+        return await count_documents(collection, query, *args, **kwargs)
+
+    monkeypatch.setattr(type(db.observations), "count_documents", spy, raising=False)
+
+    result = await execute('{ searchObservations(patientId: "p1") { edges { node { id } } } }')
+    assert result.errors is None and not counts
+
+    result = await execute(SEARCH, {"first": 3})
+    assert result.data["searchObservations"]["totalCount"] == len(observations)
+    assert len(counts) == 1
+
+async def test_first_is_capped_at_max_page_size(execute, observations, monkeypatch):
+    monkeypatch.setattr(get_settings(), "MAX_PAGE_SIZE", 2)
+
+    result = await execute(SEARCH, {"first": 100})
+
+    assert len(result.data["searchObservations"]["edges"]) == 2
+    assert result.data["searchObservations"]["pageInfo"]["hasNextPage"]
+
+async def test_allergies_page_by_recorded_date(db, execute):
+    await db.allergyintolerance.insert_many([
+        {
+            "_id": ObjectId(),
+            "id": f"a{i}",
+            "resourceType": "AllergyIntolerance",
+            "patient": {"reference": "Patient/p1"},
+            "recordedDate": f"2024-0{i + 1}-01"
+        }
+        for i in range(3)
+    ])
+
+    first = (await execute(ALLERGIES)).data["searchAllergies"]
+    second = (await execute(ALLERGIES, {"after": first["pageInfo"]["endCursor"]})).data["searchAllergies"]
+
+    assert [edge["node"]["id"] for edge in first["edges"]] == ["a2", "a1"]
+    assert [edge["node"]["id"] for edge in second["edges"]] == ["a0"]
+    assert first["pageInfo"]["hasNextPage"] and not second["pageInfo"]["hasNextPage"]
+
+@pytest.mark.parametrize("query", [SEARCH, HISTORY])
+@pytest.mark.parametrize("first", [0, -1, -100000])
+async def test_non_positive_first_is_rejected(execute, observations, query, first):
+    result = await execute(query, {"first": first})
+    assert result.errors
+    assert "first must be a positive integer" in result.errors[0].message
+
+async def test_invalid_cursor_is_an_error(execute, observations):
+    result = await execute(SEARCH, {"first": 3, "after": "garbage"})
+    assert "Invalid cursor" in result.errors[0].message
@@ -0,0 +1,63 @@
+# tests/test_persisted_queries.py
+from collections import OrderedDict
+import httpx
+import pytest
+from fastapi import FastAPI
+from strawberry.fastapi import GraphQLRouter
+from app.config.settings import get_settings
+from app.graphql.context import get_context
+from app.graphql.extensions.persisted_queries import DocumentCache, document_cache, query_hash
+from app.graphql.schema import schema
+
+pytestmark = pytest.mark.anyio
+
+QUERY = "{ __typename }"
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(document_cache, "_documents", OrderedDict())
+    app = FastAPI()
+    app.include_router(GraphQLRouter(schema, context_getter=get_context), prefix="/graphql")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+def persisted(sha256, query=None):
+    body = {"extensions": {"persistedQuery": {"version": 1, "sha256Hash": sha256}}}
+    if query is not None:
+        body["query"] = query
+    return body
+
+def error_codes(response):
+    return [error["extensions"]["code"] for error in response.json().get("errors", [])]
+
+async def test_unknown_hash_is_registered_by_the_retry(client):
+    sha256 = query_hash(QUERY)
+
+    missing = await client.post("/graphql", json=persisted(sha256))
+    registered = await client.post("/graphql", json=persisted(sha256, QUERY))
+    document_cache._documents.clear()
+    by_hash = await client.post("/graphql", json=persisted(sha256))
+
+    assert error_codes(missing) == ["PERSISTED_QUERY_NOT_FOUND"]
+    assert registered.json()["data"] == {"__typename": "Query"}
+    assert by_hash.json()["data"] == {"__typename": "Query"}
+
+async def test_hash_must_match_the_query(client):
+    response = await client.post("/graphql", json=persisted("0" * 64, QUERY))
+
+    assert error_codes(response) == ["PERSISTED_QUERY_HASH_MISMATCH"]
+
+async def test_allowlist_rejects_unregistered_queries(client, monkeypatch):
+    monkeypatch.setattr(get_settings(), "GRAPHQL_ALLOWLIST_ENABLED", True)
+
+    response = await client.post("/graphql", json={"query": QUERY})
+
+    assert error_codes(response) == ["QUERY_NOT_ALLOWED"]
+
+def test_document_cache_evicts_the_least_recently_used():
+    cache = DocumentCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("A", None, "C")
@@ -0,0 +1,35 @@
+# tests/test_profiler.py
+from app.db.profiler import normalize, query_shape, summarize_explain
+
+def test_normalize_keeps_fields_and_operators_only():
+    shape = normalize({"patient_id": {"$in": ["a", "b", "c"]}, "status": "final", "value": {"$gt": "$low"}})
+
+    assert shape == {"patient_id": {"$in": "?"}, "status": "?", "value": {"$gt": "$low"}}
+
+def test_queries_differing_only_in_literals_share_a_shape():
+    first = query_shape("find", {"filter": {"id": "x", "versionKey": {"$lt": 5}}, "sort": {"versionKey": -1}})
+    second = query_shape("find", {"filter": {"id": "y", "versionKey": {"$lt": 9}}, "sort": {"versionKey": -1}})
+
+    assert first == second == {"filter": {"id": "?", "versionKey": {"$lt": "?"}}, "sort": ["versionKey"]}
+
+def test_summarize_explain_flags_scans_and_sorts():
+    explain = {"stages": [{"$cursor": {
+        "queryPlanner": {"winningPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}},
+        "executionStats": {"nReturned": 2, "totalDocsExamined": 1000, "totalKeysExamined": 0}
+    }}]}
+
+    summary = summarize_explain(explain, examined_ratio=10)
+
+    assert summary["stages"] == ["SORT", "COLLSCAN"]
+    assert summary["flags"] == ["COLLSCAN", "HIGH_EXAMINED_RATIO", "IN_MEMORY_SORT"]
+
+def test_summarize_explain_reports_indexes_of_a_clean_plan():
+    explain = {
+        "queryPlanner": {"winningPlan": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "id_1_versionKey_-1"}}},
+        "executionStats": {"nReturned": 5, "totalDocsExamined": 5, "totalKeysExamined": 5}
+    }
+
+    summary = summarize_explain(explain, examined_ratio=10)
+
+    assert summary["indexes"] == ["id_1_versionKey_-1"]
+    assert summary["flags"] == []
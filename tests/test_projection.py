@@ -0,0 +1,40 @@
+# tests/test_projection.py
+import pytest
+from app.fhir.utils.helpers import add_search_fields
+from app.graphql.projection import to_projection
+
+pytestmark = pytest.mark.anyio
+
+def test_projection_drops_paths_under_a_selected_parent():
+    paths = {"id", "code", "code.coding.code", "subject.reference", "subjectId"}
+
+    assert to_projection(paths) == {"code": 1, "id": 1, "subject.reference": 1, "subjectId": 1}
+
+async def test_fragments_and_nested_selections_are_fetched(db, execute, monkeypatch):
+    await db.observations.insert_one(add_search_fields("Observation", {
+        "id": "o1",
+        "resourceType": "Observation",
+        "status": "final",
+        "code": {"coding": [{"system": "http://loinc.org", "code": "85353-1", "display": "Vital signs"}]},
+        "subject": {"reference": "Patient/p1"},
+        "effectiveDateTime": "2024-01-01T10:00:00"
+    }))
+    projections = []
+    # Collections are created on every attribute access, so the spy goes on their class
+    collection = type(db.observations)
+    find_one = collection.find_one
+
+    async def spy(self, filter, projection=None):
+        projections.append(projection)
+        return await find_one(self, filter, projection)
+
+    monkeypatch.setattr(collection, "find_one", spy)
+
+    result = await execute("""
+        query { observation(id: "o1") { ...Status code { coding { code } } } }
+        fragment Status on Observation { status }
+    """)
+
+    assert result.errors is None
+    assert result.data["observation"] == {"status": "final", "code": {"coding": [{"code": "85353-1"}]}}
+    assert projections == [{"_id": 1, "code.coding.code": 1, "id": 1, "status": 1}]
@@ -0,0 +1,122 @@
+# tests/test_references.py
+import pytest
+import app.graphql.loaders as loaders
+from app.config.settings import get_settings
+
+pytestmark = pytest.mark.anyio
+
+QUERY = """
+{
+  searchObservations {
+    edges { node { id device { resource { __typename ... on Observation { id status } } } subject { resource { __typename } } } }
+  }
+}
+"""
+
+PATIENTS_QUERY = """
+{
+  searchObservations(first: 500) {
+    edges { node { id subject { resource { __typename ... on Patient { id gender name { family } } } } } }
+  }
+}
+"""
+
+@pytest.fixture
+def load_calls(monkeypatch):
+    calls = []
+    load_resources = loaders.load_resources
+
+    async def spy(resource_type, paths, ids):
+        calls.append((resource_type, sorted(ids)))
+        return await load_resources(resource_type, paths, ids)
+
+    monkeypatch.setattr(loaders, "load_resources", spy)
+    return calls
+
+@pytest.fixture
+def finds(db, monkeypatch):
+    """Projection of every find sent to the database, by collection"""
+    calls = []
+    # Collections are created on every attribute access, so the spy goes on their class
+    collection = type(db.observations)
+    find = collection.find
+
+    def spy(self, filter=None, projection=None, *args, **kwargs):
+        calls.append((self.name, projection))
+        return find(self, filter, projection, *args, **kwargs)
+
+    monkeypatch.setattr(collection, "find", spy)
+    return calls
+
+async def test_references_resolve_to_typed_resources_in_one_batch(db, execute, load_calls):
+    await db.observations.insert_many([
+        {"id": "panel", "resourceType": "Observation", "status": "final", "effectiveDateTime": "2024-01-01T00:00:00"},
+        *(
+            {
+                "id": f"o{i}",
+                "resourceType": "Observation",
+                "status": "final",
+                "effectiveDateTime": f"2024-01-0{i + 2}T00:00:00",
+                "subject": {"reference": "Patient/unknown"},
+                "device": {"reference": "Observation/panel"}
+            }
+            for i in range(3)
+        )
+    ])
+
+    result = await execute(QUERY)
+
+    assert result.errors is None
+    nodes = [edge["node"] for edge in result.data["searchObservations"]["edges"] if edge["node"]["id"] != "panel"]
+    assert len(nodes) == 3
+    for node in nodes:
+        assert node["device"]["resource"] == {"__typename": "Observation", "id": "panel", "status": "final"}
+        assert node["subject"]["resource"] is None
+    assert sorted(load_calls) == [("Observation", ["panel"]), ("Patient", ["unknown"])]
+
+async def test_observation_subjects_resolve_to_patients_in_two_round_trips(db, execute, finds, monkeypatch):
+    monkeypatch.setattr(get_settings(), "GRAPHQL_MAX_QUERY_COST", 100000)
+    monkeypatch.setattr(get_settings(), "GRAPHQL_COST_BUDGET_PER_MINUTE", 100000)
+    await db.patients.insert_many([
+        {"id": f"p{i}", "resourceType": "Patient", "gender": "female", "name": [{"family": f"Family{i}"}]}
+        for i in range(50)
+    ])
+    await db.observations.insert_many([
+        {
+            "id": f"o{i}",
+            "resourceType": "Observation",
+            "status": "final",
+            "effectiveDateTime": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}",
+            "subject": {"reference": f"Patient/p{i % 50}"}
+        }
+        for i in range(500)
+    ])
+    finds.clear()
+
+    result = await execute(PATIENTS_QUERY)
+
+    assert result.errors is None
+    nodes = [edge["node"] for edge in result.data["searchObservations"]["edges"]]
+    assert len(nodes) == 500
+    for node in nodes:
+        patient = node["subject"]["resource"]
+        assert patient["__typename"] == "Patient"
+        assert patient["id"] == f"p{int(node['id'][1:]) % 50}"
+        assert patient["name"] == [{"family": f"Family{int(node['id'][1:]) % 50}"}]
+    assert [name for name, _ in finds] == ["observations", "patients"]
+    # Only what the query selected on the patient is fetched
+    assert finds[1][1] == {"_id": 0, "gender": 1, "id": 1, "name.family": 1}
+
+async def test_reference_to_missing_resource_is_null(db, execute):
+    await db.observations.insert_one({
+        "id": "o1",
+        "resourceType": "Observation",
+        "status": "final",
+        "effectiveDateTime": "2024-01-01T00:00:00",
+        "device": {"reference": "Observation/gone"}
+    })
+
+    result = await execute(QUERY)
+
+    assert result.errors is None
+    assert result.data["searchObservations"]["edges"][0]["node"]["device"]["resource"] is None
@@ -0,0 +1,68 @@
+# tests/test_risk.py
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.core.constants import LOINC_SYSTEM, VITAL_CODES, VITAL_SIGNS_CATEGORY
+from app.db.risk import RISK_HIGH, VITALS, patient_risk_scores, score_vitals
+from app.fhir.utils.helpers import add_search_fields
+
+pytestmark = pytest.mark.anyio
+
+def row(**vitals):
+    return [vitals.get(name, np.nan) for name in VITALS]
+
+def panel(patient_id, effective, **vitals):
+    return add_search_fields("Observation", {
+        "resourceType": "Observation",
+        "status": "final",
+        "category": [{"coding": [dict(VITAL_SIGNS_CATEGORY)]}],
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "effectiveDateTime": effective.isoformat(),
+        "component": [
+            {
+                "code": {"coding": [{"system": LOINC_SYSTEM, "code": VITAL_CODES[name]["code"]}]},
+                "valueQuantity": {"value": value, "unit": VITAL_CODES[name]["unit"]}
+            }
+            for name, value in vitals.items()
+        ]
+    })
+
+def test_news2_points_and_level():
+    values = np.array([row(
+        respiratory_rate=26,
+        oxygen_saturation=92,
+        blood_pressure_systolic=95,
+        heart_rate=115,
+        body_temperature=39.5
+    )])
+
+    scores = score_vitals(["p1"], values)
+
+    assert scores.total.tolist() == [11]
+    assert scores.level.tolist() == [RISK_HIGH]
+
+def test_unmeasured_vitals_score_nothing():
+    scores = score_vitals(["p1"], np.array([row()]))
+
+    assert scores.total.tolist() == [0]
+    assert not scores.below_range.any() and not scores.above_range.any()
+
+async def test_lookback_ignores_older_vitals(db):
+    now = datetime.utcnow()
+    await db.observations.insert_many([
+        panel("p1", now - timedelta(hours=48), heart_rate=140),
+        panel("p1", now - timedelta(hours=1), respiratory_rate=16),
+        panel("p2", now - timedelta(hours=48), heart_rate=140)
+    ])
+    heart_rate = VITALS.index("heart_rate")
+
+    recent = await patient_risk_scores(db, ["p1", "p2"], lookback_hours=24)
+    everything = await patient_risk_scores(db, ["p1", "p2"])
+
+    assert np.isnan(recent.values[:, heart_rate]).all()
+    assert everything.values[:, heart_rate].tolist() == [140, 140]
+
+async def test_resolver_rejects_non_positive_lookback(db, execute):
+    result = await execute('{ patientRiskScores(patientIds: ["p1"], lookbackHours: 0) { score } }')
+
+    assert result.errors[0].message == "lookbackHours must be positive"
@@ -0,0 +1,74 @@
+# tests/test_timeseries.py
+from datetime import datetime, timezone
+import pytest
+from pymongo.errors import OperationFailure
+from app.config.settings import get_settings
+from app.core.constants import VITAL_SIGNS_CATEGORY
+from app.db.bulk import ingest_bundle
+from app.db.timeseries import _parse_time, vital_points
+
+pytestmark = pytest.mark.anyio
+
+def observation(effective, category=VITAL_SIGNS_CATEGORY):
+    return {
+        "resourceType": "Observation",
+        "status": "final",
+        "category": [{"coding": [dict(category)]}],
+        "code": {"coding": [{"system": "http://loinc.org", "code": "85353-1"}]},
+        "subject": {"reference": "Patient/p1"},
+        "effectiveDateTime": effective,
+        "component": [{
+            "code": {"coding": [{"system": "http://loinc.org", "code": "8867-4"}]},
+            "valueQuantity": {"value": 72, "unit": "/min"}
+        }]
+    }
+
+@pytest.mark.parametrize("value, expected", [
+    ("2023", datetime(2023, 1, 1, tzinfo=timezone.utc)),
+    ("2023-05", datetime(2023, 5, 1, tzinfo=timezone.utc)),
+    ("2023-05-04", datetime(2023, 5, 4, tzinfo=timezone.utc)),
+    ("2023-05-04T10:30:00Z", datetime(2023, 5, 4, 10, 30, tzinfo=timezone.utc)),
+    ("2023-05-04T10:30:00", datetime(2023, 5, 4, 10, 30, tzinfo=timezone.utc))
+])
+def test_parse_time_accepts_every_fhir_precision(value, expected):
+    assert _parse_time(value) == expected
+
+@pytest.mark.parametrize("value", [None, "", "2023-13", "yesterday", 2023])
+def test_parse_time_returns_none_when_unparsable(value):
+    assert _parse_time(value) is None
+
+def test_only_vital_signs_are_mirrored():
+    laboratory = {**VITAL_SIGNS_CATEGORY, "code": "laboratory"}
+    assert len(vital_points(observation("2023-05-04"))) == 1
+    assert vital_points(observation("2023-05-04", category=laboratory)) == []
+
+@pytest.fixture
+def timeseries(monkeypatch):
+    monkeypatch.setattr(get_settings(), "VITALS_TIMESERIES_ENABLED", True)
+    return get_settings().VITALS_TIMESERIES_COLLECTION
+
+async def test_partial_dates_are_mirrored_on_ingest(db, timeseries):
+    bundle = {
+        "resourceType": "Bundle",
+        "type": "batch",
+        "entry": [{"resource": observation(effective)} for effective in ("2023", "2023-05", "2023-05-04T10:30:00Z")]
+    }
+
+    result = await ingest_bundle(db, bundle)
+
+    assert [entry["response"]["status"] for entry in result["entry"]] == ["201 Created"] * 3
+    points = await db[timeseries].find().to_list(length=None)
+    assert sorted(point["ts"].replace(tzinfo=None) for point in points) == [
+        datetime(2023, 1, 1), datetime(2023, 5, 1), datetime(2023, 5, 4, 10, 30)
+    ]
+
+async def test_mirror_failure_does_not_fail_the_write(db, timeseries, monkeypatch):
+    async def fail(*args, **kwargs):
+        raise OperationFailure("time-series insert failed")
+
+    monkeypatch.setattr(type(db[timeseries]), "insert_many", fail)
+
+    result = await ingest_bundle(db, {"resourceType": "Bundle", "type": "batch", "entry": [{"resource": observation("2023")}]})
+
+    assert result["entry"][0]["response"]["status"] == "201 Created"
+    assert await db.observations.count_documents({}) == 1
@@ -0,0 +1,92 @@
+# tests/test_versioning.py
+import pytest
+from app.config.settings import get_settings
+from app.db.collections import history_collection, resource_collection
+from app.db.versioning import VersionConflictError, VersionManager, apply_patch, diff_documents, version_key
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def deltas(monkeypatch):
+    monkeypatch.setattr(get_settings(), "HISTORY_DELTA_ENABLED", True)
+    monkeypatch.setattr(get_settings(), "HISTORY_SNAPSHOT_INTERVAL", 4)
+
+def content(doc):
+    return {key: value for key, value in doc.items() if key not in ("_id", "version", "versionKey", "meta")}
+
+def test_patch_round_trips_a_diff():
+    old = {"a": 1, "b": {"c": [1, 2], "d/e": "x"}, "gone": True}
+    new = {"a": 1, "b": {"c": [1, 3], "d/e": "y"}, "added": {"f": None}}
+
+    assert apply_patch(old, diff_documents(old, new)) == new
+
+async def test_delta_history_rebuilds_every_version(db, deltas):
+    created = await VersionManager.create_versioned_resource(db, "Observation", {"status": "preliminary", "note": "a"})
+    written = {"1.0.0": created}
+    search_params = [{"code": "8867-4", "value": 72}]
+    for index, status in enumerate(["final", "amended", "corrected", "final", "cancelled"]):
+        data = {"status": status, "note": "a" * index}
+        if index > 0:
+            data["search_params"] = search_params
+        doc = await VersionManager.update_versioned_resource(db, "Observation", created["id"], data)
+        written[doc["meta"]["versionId"]] = doc
+        if index == 0:
+            # Backfilled in the live collection only, as a migration would, and
+            # carried by every later update
+            await resource_collection(db, "Observation").update_one(
+                {"id": created["id"]},
+                {"$set": {"search_params": search_params}}
+            )
+
+    stored = await history_collection(db, "Observation").find().to_list(length=None)
+    assert any("delta" in entry for entry in stored)
+    for version, doc in written.items():
+        rebuilt = await VersionManager.get_version(db, "Observation", created["id"], version)
+        assert content(rebuilt) == content(doc)
+    history = await VersionManager.get_resource_history(db, "Observation", created["id"])
+    assert [entry["version"] for entry in history] == list(written)[::-1]
+    assert [content(entry) for entry in history] == [content(doc) for doc in list(written.values())[::-1]]
+
+async def test_update_based_on_a_stale_version_is_rejected(db):
+    created = await VersionManager.create_versioned_resource(db, "Observation", {"status": "preliminary"})
+    await VersionManager.update_versioned_resource(db, "Observation", created["id"], {"status": "final"})
+
+    with pytest.raises(VersionConflictError):
+        await VersionManager.update_versioned_resource(
+            db, "Observation", created["id"], {"status": "amended"}, expected_version="1.0.0"
+        )
+    current = await VersionManager.get_version(db, "Observation", created["id"], "current")
+    assert (current["status"], current["meta"]["versionId"]) == ("final", "1.1.0")
+
+async def test_major_update_resets_minor(db):
+    created = await VersionManager.create_versioned_resource(db, "Observation", {"status": "preliminary"})
+    await VersionManager.update_versioned_resource(db, "Observation", created["id"], {"status": "final"})
+
+    updated = await VersionManager.update_versioned_resource(
+        db, "Observation", created["id"], {"status": "amended"}, is_major_update=True, expected_version="1.1.0"
+    )
+
+    assert updated["meta"]["versionId"] == "2.0.0"
+
+def test_version_keys_sort_numerically():
+    versions = ["1.9.0", "1.10.0", "2.0.0", "1.2", "10.0.0"]
+
+    assert sorted(versions, key=version_key) == ["1.2", "1.9.0", "1.10.0", "2.0.0", "10.0.0"]
+
+@pytest.mark.parametrize("version", ["", "1.x.0", None])
+def test_invalid_versions_are_rejected(version):
+    with pytest.raises(ValueError):
+        version_key(version)
+
+async def test_history_pages_newest_first(db):
+    created = await VersionManager.create_versioned_resource(db, "Observation", {"status": "preliminary"})
+    for _ in range(11):
+        await VersionManager.update_versioned_resource(db, "Observation", created["id"], {"status": "final"})
+
+    first = await VersionManager.get_resource_history(db, "Observation", created["id"], limit=5)
+    second = await VersionManager.get_resource_history(
+        db, "Observation", created["id"], limit=5, before=first[-1]["version"]
+    )
+
+    assert [doc["version"] for doc in first] == ["1.11.0", "1.10.0", "1.9.0", "1.8.0", "1.7.0"]
+    assert [doc["version"] for doc in second] == ["1.6.0", "1.5.0", "1.4.0", "1.3.0", "1.2.0"]
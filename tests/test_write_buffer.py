@@ -0,0 +1,80 @@
+# tests/test_write_buffer.py
+import asyncio
+import pytest
+from bson import ObjectId
+from prometheus_client import REGISTRY
+from pymongo.errors import DuplicateKeyError
+from app.db import write_buffer
+from app.db.write_buffer import WriteBuffer
+
+pytestmark = pytest.mark.anyio
+
+def observations(count):
+    return [{"_id": ObjectId(), "resourceType": "Observation", "status": "final"} for _ in range(count)]
+
+def sample(name):
+    return REGISTRY.get_sample_value(name, {"resource_type": "Observation"}) or 0
+
+async def insert_all(db, buffer, docs):
+    return await asyncio.wait_for(
+        asyncio.gather(*(buffer.insert(db, doc) for doc in docs), return_exceptions=True),
+        timeout=1
+    )
+
+async def test_each_caller_gets_the_outcome_of_its_document(db):
+    docs = observations(3)
+    await db.observations.insert_one(dict(docs[1]))
+    buffer = WriteBuffer("Observation", max_documents=3, max_delay=1)
+
+    results = await insert_all(db, buffer, docs)
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], DuplicateKeyError)
+    assert buffer.stats()["failed"] == 1
+
+async def test_any_write_error_reaches_every_caller(db, monkeypatch):
+    class Broken:
+        async def insert_many(self, docs, ordered):
+            raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(write_buffer, "resource_collection", lambda db, resource_type: Broken())
+    buffer = WriteBuffer("Observation", max_documents=3, max_delay=1)
+
+    results = await insert_all(db, buffer, observations(3))
+
+    assert [type(result) for result in results] == [RuntimeError] * 3
+    assert buffer.stats()["inFlight"] == 0
+
+async def test_failed_mirror_does_not_fail_stored_documents(db, monkeypatch):
+    async def broken_mirror(db, docs):
+        raise RuntimeError("time series unavailable")
+
+    monkeypatch.setattr(write_buffer, "write_vital_points", broken_mirror)
+    buffer = WriteBuffer("Observation", max_documents=3, max_delay=1)
+
+    results = await insert_all(db, buffer, observations(3))
+
+    assert results == [None] * 3
+    assert await db.observations.count_documents({}) == 3
+    assert buffer.stats()["failed"] == 0
+
+async def test_timer_flushes_a_partial_batch(db):
+    buffer = WriteBuffer("Observation", max_documents=100, max_delay=0.01)
+
+    assert await insert_all(db, buffer, observations(2)) == [None, None]
+    assert buffer.stats()["timerFlushes"] == 1
+
+async def test_flushes_are_exported_as_prometheus_metrics(db):
+    buffer = WriteBuffer("Observation", max_documents=3, max_delay=1)
+    flushes, documents, waits = (
+        sample("write_buffer_flush_documents_count"),
+        sample("write_buffer_flush_documents_sum"),
+        sample("write_buffer_wait_seconds_count")
+    )
+
+    await insert_all(db, buffer, observations(3))
+
+    assert sample("write_buffer_flush_documents_count") == flushes + 1
+    assert sample("write_buffer_flush_documents_sum") == documents + 3
+    assert sample("write_buffer_wait_seconds_count") == waits + 3
+    assert sample("write_buffer_queue_depth") == 0